@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Compare ``BetaGeoFitter.conditional_expected_number_of_purchases_up_to_time`` over a grid of
+horizons with the previous implementation.
+
+The previous implementation, kept below as ``both_forms_conditional_expectation``, evaluated
+2F1 in both its direct and Euler-transformed forms for every element and picked one with
+``np.where``, and a grid of horizons took one call per horizon. The current one evaluates
+the Euler form only where the direct one overflows, and scores the whole grid in one call
+with ``t[:, None]``.
+
+Resamples 100k customers from the CDNOW summary and times both over 52 weekly horizons.
+Both must return the same predictions.
+
+The two are also compared per horizon in
+``tests/test_estimation.py::TestBetaGeoFitter::test_conditional_expectation_over_a_grid_of_t``.
+
+Run from the repository root, with btyd installed or on the path::
+
+    python benchmarks/bgnbd_conditional_expectation.py
+"""
+import time
+
+import numpy as np
+from scipy.special import hyp2f1
+
+from btyd import BetaGeoFitter
+from btyd.datasets import load_cdnow_summary
+
+N_CUSTOMERS = 100_000
+N_HORIZONS = 52
+SEED = 20221018
+
+
+def both_forms_conditional_expectation(model, t, frequency, recency, T):
+    """The BG/NBD conditional expectation before 2F1 was evaluated once."""
+
+    x = frequency
+    r, alpha, a, b = model._unload_params("r", "alpha", "a", "b")
+
+    _a = r + x
+    _b = b + x
+    _c = a + b + x - 1
+    _z = t / (alpha + T + t)
+    ln_hyp_term = np.log(hyp2f1(_a, _b, _c, _z))
+    ln_hyp_term_alt = np.log(hyp2f1(_c - _a, _c - _b, _c, _z)) + (_c - _a - _b) * np.log(1 - _z)
+    ln_hyp_term = np.where(np.isinf(ln_hyp_term), ln_hyp_term_alt, ln_hyp_term)
+    first_term = (a + b + x - 1) / (a - 1)
+    second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log((alpha + T) / (alpha + t + T)))
+
+    numerator = first_term * second_term
+    denominator = 1 + (x > 0) * (a / (b + x - 1)) * ((alpha + T) / (alpha + recency)) ** (r + x)
+    return numerator / denominator
+
+
+def main():
+    cdnow = load_cdnow_summary(index_col=[0])
+    model = BetaGeoFitter().fit(cdnow["frequency"], cdnow["recency"], cdnow["T"])
+
+    customers = cdnow.sample(N_CUSTOMERS, replace=True, random_state=SEED)
+    frequency, recency, T = (customers[col].values for col in ("frequency", "recency", "T"))
+    t = np.arange(1.0, N_HORIZONS + 1)
+    print("{:,} customers x {} weekly horizons, seed {}".format(N_CUSTOMERS, N_HORIZONS, SEED))
+
+    start = time.perf_counter()
+    expected = np.array([both_forms_conditional_expectation(model, t_, frequency, recency, T) for t_ in t])
+    looped_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = model.conditional_expected_number_of_purchases_up_to_time(t[:, None], frequency, recency, T)
+    grid_seconds = time.perf_counter() - start
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-10)
+    print(
+        "per-horizon, both 2F1 forms {:6.2f}s -> one grid call {:6.2f}s ({:.1f}x)".format(
+            looped_seconds, grid_seconds, looped_seconds / grid_seconds
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the single-pass ``calibration_and_holdout_data`` with the previous two-pass split.
+
+The previous implementation, kept below as ``two_pass_calibration_and_holdout_data``, built
+the calibration summary with ``summary_data_from_transaction_data`` and the holdout summary
+with separate groupbys. The single-pass version factorizes and sorts the transaction log once
+and derives both summaries from masks over the same arrays.
+
+Builds a synthetic log of 2M transactions from 100k customers with a monetary value column
+and times both. Both must return the same split.
+
+The split is also checked on the CDNOW sample in
+``tests/test_utils.py::test_calibration_and_holdout_data_with_monetary_value``.
+
+Run from the repository root, with btyd installed or on the path::
+
+    python benchmarks/calibration_holdout_split.py
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from btyd.utils import calibration_and_holdout_data, summary_data_from_transaction_data
+
+N_TRANSACTIONS = 2_000_000
+N_CUSTOMERS = 100_000
+SEED = 20221018
+START, END = pd.Timestamp("2020-01-01"), pd.Timestamp("2022-01-01")
+CALIBRATION_PERIOD_END = "2021-06-30"
+OBSERVATION_PERIOD_END = "2021-12-31"
+
+
+def make_transactions(n_transactions=N_TRANSACTIONS, n_customers=N_CUSTOMERS, seed=SEED):
+    rng = np.random.default_rng(seed)
+    seconds = int((END - START).total_seconds())
+    return pd.DataFrame(
+        {
+            "customer_id": rng.integers(n_customers, size=n_transactions),
+            "date": START + pd.to_timedelta(rng.integers(seconds, size=n_transactions), unit="s"),
+            "monetary_value": rng.gamma(2.0, 20.0, size=n_transactions).round(2),
+        }
+    )
+
+
+def two_pass_calibration_and_holdout_data(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    calibration_period_end,
+    observation_period_end,
+    freq="D",
+    monetary_value_col=None,
+):
+    """The calibration/holdout split before it was made single-pass."""
+
+    transaction_cols = [customer_id_col, datetime_col]
+    if monetary_value_col:
+        transaction_cols.append(monetary_value_col)
+    transactions = transactions[transaction_cols].copy()
+
+    transactions[datetime_col] = pd.to_datetime(transactions[datetime_col])
+    observation_period_end = pd.to_datetime(observation_period_end)
+    calibration_period_end = pd.to_datetime(calibration_period_end)
+
+    calibration_transactions = transactions.loc[transactions[datetime_col] <= calibration_period_end]
+    calibration_summary_data = summary_data_from_transaction_data(
+        calibration_transactions,
+        customer_id_col,
+        datetime_col,
+        observation_period_end=calibration_period_end,
+        freq=freq,
+        monetary_value_col=monetary_value_col,
+    )
+    calibration_summary_data.columns = [c + "_cal" for c in calibration_summary_data.columns]
+
+    holdout_transactions = transactions.loc[
+        (observation_period_end >= transactions[datetime_col]) & (transactions[datetime_col] > calibration_period_end)
+    ].copy()
+    holdout_transactions[datetime_col] = holdout_transactions[datetime_col].map(lambda d: d.to_period(freq))
+    holdout_summary_data = (
+        holdout_transactions.groupby([customer_id_col, datetime_col], sort=False)
+        .agg(lambda r: 1)
+        .groupby(level=customer_id_col)
+        .agg(["count"])
+    )
+    holdout_summary_data.columns = ["frequency_holdout"]
+    if monetary_value_col:
+        holdout_summary_data["monetary_value_holdout"] = holdout_transactions.groupby(customer_id_col)[
+            monetary_value_col
+        ].mean()
+
+    combined_data = calibration_summary_data.join(holdout_summary_data, how="left")
+    combined_data.fillna(0, inplace=True)
+    delta_time = (observation_period_end.to_period(freq) - calibration_period_end.to_period(freq)).n
+    combined_data["duration_holdout"] = delta_time
+    return combined_data
+
+
+def main():
+    transactions = make_transactions()
+    print(
+        "{:,} transactions, {:,} customers, seed {}".format(
+            transactions.shape[0], transactions["customer_id"].nunique(), SEED
+        )
+    )
+
+    args = (transactions, "customer_id", "date", CALIBRATION_PERIOD_END, OBSERVATION_PERIOD_END)
+    kwargs = {"monetary_value_col": "monetary_value"}
+
+    start = time.perf_counter()
+    expected = two_pass_calibration_and_holdout_data(*args, **kwargs)
+    two_pass_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = calibration_and_holdout_data(*args, **kwargs)
+    single_pass_seconds = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    print(
+        "two-pass {:6.2f}s -> single-pass {:6.2f}s ({:.1f}x)".format(
+            two_pass_seconds, single_pass_seconds, two_pass_seconds / single_pass_seconds
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Compare ``expected_cumulative_transactions`` with the previous per-period loop.
+
+The previous implementation, kept below as ``looped_expected_cumulative_transactions``,
+called the model's ``expected_number_of_purchases_up_to_time()`` once per period of the
+horizon. The current one evaluates it once on the grid of period lags and convolves the
+result with the first-purchase cohort sizes.
+
+Builds a synthetic log of 100k transactions from 20k customers over five years and times
+both over a 5-year daily horizon with a BG/NBD model at the CDNOW parameters. Both must
+return the same frame.
+
+The two are also compared on the CDNOW sample in
+``tests/test_utils.py::test_expected_cumulative_transactions_equals_r_btyd_walktrough``.
+
+Run from the repository root, with btyd installed or on the path::
+
+    python benchmarks/expected_cumulative_transactions.py
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from btyd import BetaGeoFitter
+from btyd.utils import _find_first_transactions, expected_cumulative_transactions
+
+N_TRANSACTIONS = 100_000
+N_CUSTOMERS = 20_000
+SEED = 20221018
+START = pd.Timestamp("2015-01-01")
+T = 5 * 365
+
+
+def make_transactions(n_transactions=N_TRANSACTIONS, n_customers=N_CUSTOMERS, seed=SEED):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "customer_id": rng.integers(n_customers, size=n_transactions),
+            "date": START + pd.to_timedelta(rng.integers(T, size=n_transactions), unit="D"),
+        }
+    )
+
+
+def make_model():
+    model = BetaGeoFitter()
+    model.params_ = pd.Series({"r": 0.243, "alpha": 4.414, "a": 0.793, "b": 2.426})
+    return model
+
+
+def looped_expected_cumulative_transactions(model, transactions, datetime_col, customer_id_col, t, freq="D"):
+    """expected_cumulative_transactions before it was computed by convolution, with freq_multiplier=1."""
+
+    start_date = pd.to_datetime(transactions[datetime_col]).min()
+    start_period = start_date.to_period(freq)
+    observation_period_end = start_period + t
+
+    repeated_and_first_transactions = _find_first_transactions(
+        transactions, customer_id_col, datetime_col, observation_period_end=observation_period_end, freq=freq
+    )
+    first_trans_mask = repeated_and_first_transactions["first"]
+    repeated_transactions = repeated_and_first_transactions[~first_trans_mask]
+    first_transactions = repeated_and_first_transactions[first_trans_mask]
+
+    date_periods = pd.date_range(start_date, periods=t + 1, freq=freq).to_period(freq)
+    first_trans_size = first_transactions.groupby(datetime_col).size()
+
+    pred_cum_transactions = []
+    for period in date_periods[1:]:
+        times = np.array([d.n for d in period - first_trans_size.index])
+        times = times[times > 0].astype(float)
+        expected_trans_agg = model.expected_number_of_purchases_up_to_time(times)
+        mask = first_trans_size.index < period
+        pred_cum_transactions.append(sum(expected_trans_agg * first_trans_size[mask]))
+
+    act_trans = repeated_transactions.groupby(datetime_col).size()
+    act_tracking_transactions = act_trans.reindex(date_periods, fill_value=0)
+    act_cum_transactions = [sum(act_tracking_transactions.iloc[:j]) for j in range(1, t + 1)]
+
+    return pd.DataFrame({"actual": act_cum_transactions, "predicted": pred_cum_transactions}, index=range(0, t))
+
+
+def main():
+    transactions = make_transactions()
+    model = make_model()
+    print(
+        "{:,} transactions, {:,} customers, {} daily periods, seed {}".format(
+            transactions.shape[0], transactions["customer_id"].nunique(), T, SEED
+        )
+    )
+
+    start = time.perf_counter()
+    expected = looped_expected_cumulative_transactions(model, transactions, "date", "customer_id", T)
+    looped_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = expected_cumulative_transactions(model, transactions, "date", "customer_id", T)
+    convolved_seconds = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False)
+    print(
+        "per-period loop {:6.2f}s -> convolution {:6.2f}s ({:.0f}x)".format(
+            looped_seconds, convolved_seconds, looped_seconds / convolved_seconds
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the 'pandas' and 'numpy' engines of ``summary_data_from_transaction_data``.
+
+Builds a synthetic log of 5M transactions from 200k customers, with second-level
+timestamps over two years, and times both engines with and without a monetary value
+column. Both engines must return the same summary.
+
+The engines are also compared on the CDNOW sample in
+``tests/test_utils.py::test_summary_data_from_transaction_data_numpy_engine_matches_pandas_engine``.
+
+Run from the repository root, with btyd installed or on the path::
+
+    python benchmarks/summary_data_engines.py
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from btyd.utils import summary_data_from_transaction_data
+
+N_TRANSACTIONS = 5_000_000
+N_CUSTOMERS = 200_000
+SEED = 20221018
+START, END = pd.Timestamp("2020-01-01"), pd.Timestamp("2022-01-01")
+OBSERVATION_PERIOD_END = "2021-12-31"
+
+
+def make_transactions(n_transactions=N_TRANSACTIONS, n_customers=N_CUSTOMERS, seed=SEED):
+    rng = np.random.default_rng(seed)
+    seconds = int((END - START).total_seconds())
+    return pd.DataFrame(
+        {
+            "customer_id": rng.integers(n_customers, size=n_transactions),
+            "date": START + pd.to_timedelta(rng.integers(seconds, size=n_transactions), unit="s"),
+            "monetary_value": rng.gamma(2.0, 20.0, size=n_transactions).round(2),
+        }
+    )
+
+
+def time_engine(transactions, engine, monetary_value_col=None):
+    start = time.perf_counter()
+    summary = summary_data_from_transaction_data(
+        transactions,
+        "customer_id",
+        "date",
+        monetary_value_col=monetary_value_col,
+        observation_period_end=OBSERVATION_PERIOD_END,
+        engine=engine,
+    )
+    return summary, time.perf_counter() - start
+
+
+def main():
+    transactions = make_transactions()
+    print(
+        "{:,} transactions, {:,} customers, seed {}".format(
+            transactions.shape[0], transactions["customer_id"].nunique(), SEED
+        )
+    )
+
+    for label, monetary_value_col in (("no monetary value", None), ("with monetary value", "monetary_value")):
+        pandas_summary, pandas_seconds = time_engine(transactions, "pandas", monetary_value_col)
+        numpy_summary, numpy_seconds = time_engine(transactions, "numpy", monetary_value_col)
+        pd.testing.assert_frame_equal(numpy_summary, pandas_summary)
+        print(
+            "{:>20}: pandas {:6.1f}s -> numpy {:6.1f}s ({:.1f}x)".format(
+                label, pandas_seconds, numpy_seconds, pandas_seconds / numpy_seconds
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
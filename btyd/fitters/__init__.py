@@ -70,6 +70,49 @@ class BaseFitter(object):
         with open(path, "rb") as in_file:
             self.__dict__.update(dill.load(in_file).__dict__)
 
+    def _compress(self, columns, weights, compress=True, rounded=(), index=None):
+        """
+        Collapse identical rows into unique patterns weighted by their total weight.
+
+        Parameters
+        ----------
+        columns: list of array_like
+            the per-customer inputs of the fit, each 1D or 2D (covariates) with one row per customer.
+        weights: array_like
+            the weight of each row.
+        compress: bool or float, optional
+            if a number, the columns flagged in ``rounded`` are first rounded to multiples of it.
+        rounded: tuple of bool, optional
+            which columns are rounded when ``compress`` is a number.
+        index: array_like, optional
+            the index of the original rows.
+
+        Returns
+        -------
+        tuple
+            (unique columns, weights). ``compression_index_`` is set to a Series that gives,
+            for every original row, the position of its pattern in the compressed data, so
+            ``values[self.compression_index_]`` maps per-pattern predictions back to customers.
+        """
+        grid = None if compress is True else float(compress)
+        columns = [np.asarray(column) for column in columns]
+
+        keys = []
+        for i, column in enumerate(columns):
+            if grid is not None and i < len(rounded) and rounded[i]:
+                column = np.round(column / grid) * grid
+                columns[i] = column
+            keys.extend(column.reshape(column.shape[0], -1).T)
+
+        codes = pd.DataFrame(dict(enumerate(keys))).groupby(list(range(len(keys))), sort=True).ngroup().values
+        _, first_rows = np.unique(codes, return_index=True)
+        pattern_weights = np.bincount(codes, weights=weights)
+        if np.issubdtype(np.asarray(weights).dtype, np.integer):
+            pattern_weights = pattern_weights.astype(np.int64)
+
+        self.compression_index_ = pd.Series(codes, index=index)
+        return [column[first_rows] for column in columns], pattern_weights
+
     def _compute_variance_matrix(self):
         params_ = self.params_
         return pd.DataFrame(
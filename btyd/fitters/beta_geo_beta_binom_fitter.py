@@ -7,11 +7,11 @@ import warnings
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
 import numpy as np
+import autograd.numpy as anp
 import pandas as pd
 from autograd.numpy import log, exp, logaddexp
 from pandas import DataFrame
-from autograd.scipy.special import gammaln, betaln, beta as betaf
-from scipy.special import binom
+from autograd.scipy.special import gammaln, betaln
 
 from ..utils import _check_inputs
 from . import BaseFitter
@@ -75,14 +75,25 @@ class BetaGeoBetaBinomFitter(BaseFitter):
 
         A = betaln(alpha + x, beta + T - x) - betaln_ab + betaln(gamma, delta + T) - betaln_gd
 
-        B = 1e-15 * np.ones_like(T)
-        recency_T = T - tx - 1
-
-        for j in np.arange(recency_T.max() + 1):
-            ix = recency_T >= j
-            B = B + ix * betaf(alpha + x, beta + tx - x + j) * betaf(gamma + 1, delta + tx + j)
+        # B = sum_{j=0}^{T - tx - 1} Beta(alpha + x, beta + tx - x + j) * Beta(gamma + 1, delta + tx + j).
+        # The summands only depend on (x, tx) and j, so each distinct (x, tx) gets one cumulative
+        # log-sum-exp over j, read off at j = T - tx - 1 for every customer.
+        shape = np.broadcast(x, tx, T).shape
+        x_, tx_, T_ = (np.broadcast_to(np.asarray(arr), shape).ravel() for arr in (x, tx, T))
+        patterns, inverse = np.unique(np.column_stack([x_, tx_]), axis=0, return_inverse=True)
+        n_terms = (T_ - tx_).astype(int)
+        j = np.arange(max(n_terms.max(), 1))
+
+        pattern_x, pattern_tx = patterns[:, :1], patterns[:, 1:]
+        log_terms = betaln(alpha + pattern_x, beta + pattern_tx - pattern_x + j) + betaln(
+            gamma + 1, delta + pattern_tx + j
+        )
+        # Both Beta functions decrease in j, so the first summand is the largest.
+        log_max = log_terms[:, :1]
+        log_cumsum = log(anp.cumsum(exp(log_terms - log_max), axis=1)) + log_max
 
-        B = log(B) - betaln_gd - betaln_ab
+        B = anp.where(n_terms > 0, log_cumsum[inverse.ravel(), np.maximum(n_terms - 1, 0)], -np.inf)
+        B = anp.reshape(B, shape) - betaln_gd - betaln_ab
         return logaddexp(A, B)
 
     @staticmethod
@@ -105,6 +116,7 @@ class BetaGeoBetaBinomFitter(BaseFitter):
         verbose=False,
         tol=1e-7,
         index=None,
+        compress=False,
         **kwargs
     ):
         """
@@ -134,6 +146,11 @@ class BetaGeoBetaBinomFitter(BaseFitter):
             Tolerance for termination of the function minimization process.
         index: array_like, optional
             Index for resulted DataFrame which is accessible via self.data
+        compress: bool, optional
+            If True, identical (frequency, recency, n_periods) rows are fitted once,
+            weighted by their count. ``self.data`` keeps the rows as given; the fitted
+            patterns are in ``compressed_data_`` and ``compression_index_`` maps every
+            row to its pattern.
         kwargs:
             Key word arguments to pass to the scipy.optimize.minimize
             function as options dict
@@ -155,18 +172,27 @@ class BetaGeoBetaBinomFitter(BaseFitter):
 
         _check_inputs(frequency, recency, n_periods)
 
+        customer_data = DataFrame(
+            {"frequency": frequency, "recency": recency, "n_periods": n_periods, "weights": weights}, index=index
+        )
+        if compress:
+            (frequency, recency, n_periods), weights = self._compress(
+                (frequency, recency, n_periods), weights, index=index
+            )
+            self.compressed_data_ = DataFrame(
+                {"frequency": frequency, "recency": recency, "n_periods": n_periods, "weights": weights}
+            )
+
         log_params_, self._negative_log_likelihood_, self._hessian_ = self._fit(
             (frequency, recency, n_periods, weights, self.penalizer_coef), initial_params, 4, verbose, tol, **kwargs
         )
         self.params_ = pd.Series(np.exp(log_params_), index=["alpha", "beta", "gamma", "delta"])
 
-        self.data = DataFrame(
-            {"frequency": frequency, "recency": recency, "n_periods": n_periods, "weights": weights}, index=index
-        )
+        self.data = customer_data
 
         self.generate_new_data = lambda size=1: beta_geometric_beta_binom_model(
             # Making a large array replicating n by n_custs having n.
-            np.array(sum([n_] * n_cust for (n_, n_cust) in zip(n_periods, weights))),
+            np.repeat(customer_data["n_periods"].values, customer_data["weights"].values),
             *self._unload_params("alpha", "beta", "gamma", "delta"),
             size=size
         )
@@ -259,41 +285,50 @@ class BetaGeoBetaBinomFitter(BaseFitter):
 
         Parameters
         ----------
-        n: float
-            number of transaction opportunities
+        n: int or array_like
+            number of transaction opportunities. An array of n gives one
+            column per value.
 
         Returns
         -------
         DataFrame:
-            Predicted values, indexed by x
+            Predicted values, indexed by x. The column is ``model`` for a
+            scalar n, and the values of n otherwise.
 
         """
         params = self._unload_params("alpha", "beta", "gamma", "delta")
         alpha, beta, gamma, delta = params
 
         x_counts = self.data.groupby("frequency")["weights"].sum()
-        x = np.asarray(x_counts.index)
-
-        p1 = binom(n, x) * exp(
-            betaln(alpha + x, beta + n - x) - betaln(alpha, beta) + betaln(gamma, delta + n) - betaln(gamma, delta)
+        x = np.asarray(x_counts.index)[:, None]
+        n_ = np.atleast_1d(n).astype(int)
+
+        def log_binom(N, k):
+            return gammaln(N + 1) - gammaln(k + 1) - gammaln(N - k + 1)
+
+        # Alive through all n opportunities: one term per (x, n).
+        log_p1 = (
+            log_binom(np.maximum(n_, x), x)
+            + betaln(alpha + x, beta + n_ - x)
+            + betaln(gamma, delta + n_)
+            - betaln(alpha, beta)
+            - betaln(gamma, delta)
         )
+        p1 = np.where(n_ >= x, exp(log_p1), 0.0)
+
+        # Dropped out after opportunity i, for x <= i < n: the (x, i) terms do not depend on n,
+        # so a cumulative sum over i serves every horizon at once.
+        i = np.arange(max(n_.max(), 1))
+        log_p2 = (
+            log_binom(np.maximum(i, x), x)
+            + betaln(alpha + x, beta + np.maximum(i - x, 0))
+            + betaln(gamma + 1, delta + i)
+            - betaln(alpha, beta)
+            - betaln(gamma, delta)
+        )
+        p2 = np.cumsum(np.where(i >= x, exp(log_p2), 0.0), axis=1)
+        p2 = np.where(n_ > 0, p2[:, np.maximum(n_ - 1, 0)], 0.0)
 
-        I = np.arange(x.min(), n)
-
-        @np.vectorize
-        def p2(j, x):
-            i = I[int(j) :]
-            return np.sum(
-                binom(i, x)
-                * exp(
-                    betaln(alpha + x, beta + i - x)
-                    - betaln(alpha, beta)
-                    + betaln(gamma + 1, delta + i)
-                    - betaln(gamma, delta)
-                )
-            )
-
-        p1 += np.fromfunction(p2, (x.shape[0],), x=x)
-
-        idx = pd.Index(x, name="frequency")
-        return DataFrame(p1 * x_counts.sum(), index=idx, columns=["model"])
+        idx = pd.Index(x[:, 0], name="frequency")
+        columns = ["model"] if np.ndim(n) == 0 else pd.Index(n_, name="n")
+        return DataFrame((p1 + p2) * x_counts.sum(), index=idx, columns=columns)
@@ -10,7 +10,7 @@ from autograd.scipy.special import gammaln, beta, gamma, logsumexp
 from scipy.special import hyp2f1
 
 from . import BaseFitter
-from ..utils import _scale_time, _check_inputs, _concat2
+from ..utils import _scale_time, _check_inputs, _concat2, _log_hyp2f1
 from ..generate_data import beta_geometric_nbd_model
 
 
@@ -64,6 +64,7 @@ class BetaGeoCovarsFitter(BaseFitter):
         initial_params=None,
         verbose=False, tol=1e-4,
         index=None,
+        compress=False,
         **kwargs
     ):
         """
@@ -104,6 +105,12 @@ class BetaGeoCovarsFitter(BaseFitter):
             tolerance for termination of the function minimization process.
         index: array_like, optional
             index for resulted DataFrame which is accessible via self.data
+        compress: bool or float, optional
+            if True, rows with identical (frequency, recency, T) and covariates are fitted
+            once, weighted by their count. If a number, recency and T are first rounded to
+            multiples of it. ``self.data`` keeps one row per customer; the fitted patterns
+            are in ``compressed_data_`` and ``compression_index_`` maps every customer to
+            its pattern.
         kwargs:
             key word arguments to pass to the scipy.optimize.minimize
             function as options dict
@@ -124,13 +131,27 @@ class BetaGeoCovarsFitter(BaseFitter):
         else:
             weights = np.asarray(weights)
 
+        d_tr_ = X_tr.shape[1]
+        d_do_ = X_do.shape[1]
+        columns = (['frequency', 'recency', 'T'] +
+                   ['x_tr_' + str(d) for d in range(1, (d_tr_ + 1))] +
+                   ['x_do_' + str(d) for d in range(1, (d_do_ + 1))])
+
+        customer_data = pd.DataFrame(_concat2(frequency, recency, T, X_tr, X_do), columns=columns)
+        customer_data['weights'] = weights
+        if index is not None:
+            customer_data.index = index
+        if compress:
+            (frequency, recency, T, X_tr, X_do), weights = self._compress(
+                (frequency, recency, T, X_tr, X_do), weights, compress, rounded=(False, True, True), index=index
+            )
+            self.compressed_data_ = pd.DataFrame(_concat2(frequency, recency, T, X_tr, X_do), columns=columns)
+            self.compressed_data_['weights'] = weights
+
         self._scale = _scale_time(T)
         scaled_recency = recency * self._scale
         scaled_T = T * self._scale
 
-        d_tr_ = X_tr.shape[1]
-        d_do_ = X_do.shape[1]
-
         log_params_, self._negative_log_likelihood_, self._hessian_ = self._fit(
             (frequency, scaled_recency, scaled_T, X_tr, X_do, weights, self.penalizer_coef),
             initial_params,
@@ -148,15 +169,10 @@ class BetaGeoCovarsFitter(BaseFitter):
         self.params_ = pd.Series(params_dict)
         self.params_['alpha0'] /= self._scale
 
-        self.data = pd.DataFrame(_concat2(frequency, recency, T, X_tr, X_do),
-                                 columns=['frequency', 'recency', 'T'] +
-                                         ['x_tr_' + str(d) for d in range(1, (d_tr_ + 1))] +
-                                         ['x_do_' + str(d) for d in range(1, (d_do_ + 1))])
-        if index is not None:
-            self.data.index = index
+        self.data = customer_data
 
         self.generate_new_data = lambda size=1: beta_geometric_nbd_model(
-            T, *self._unload_params('r', 'alpha0', 'a0', 'b0'), size=size)
+            customer_data['T'].values, *self._unload_params('r', 'alpha0', 'a0', 'b0'), size=size)
 
         self.predict = self.conditional_expected_number_of_purchases_up_to_time
         return self
@@ -248,16 +264,10 @@ class BetaGeoCovarsFitter(BaseFitter):
         _b = b + x
         _c = a + b + x - 1
         _z = t / (alpha + T + t)
-        ln_hyp_term = np.log(hyp2f1(_a, _b, _c, _z))
-
-        # if the value is inf, we are using a different but equivalent
-        # formula to compute the function evaluation.
-        ln_hyp_term_alt = np.log(hyp2f1(_c - _a, _c - _b, _c, _z)) + \
-                          (_c - _a - _b) * np.log(1 - _z)
-        ln_hyp_term = np.where(np.isinf(ln_hyp_term), ln_hyp_term_alt, ln_hyp_term)
+        ln_hyp_term = _log_hyp2f1(_a, _b, _c, _z)
         first_term = (a + b + x - 1) / (a - 1)
-        second_term = (1 - np.exp(ln_hyp_term + (r + x) *
-                               np.log((alpha + T) / (alpha + t + T))))
+        # (alpha + T) / (alpha + t + T) == 1 - _z
+        second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log1p(-_z))
 
         numerator = first_term * second_term
         denominator = 1 + (x > 0) * (a / (b + x - 1)) * \
@@ -11,7 +11,7 @@ from autograd.scipy.special import gammaln, beta, gamma
 from scipy.special import hyp2f1
 from scipy.special import expit
 from . import BaseFitter
-from ..utils import _scale_time, _check_inputs
+from ..utils import _scale_time, _check_inputs, _log_hyp2f1
 from ..generate_data import beta_geometric_nbd_model
 
 
@@ -77,6 +77,7 @@ class BetaGeoFitter(BaseFitter):
         verbose=False, 
         tol=1e-7, 
         index=None, 
+        compress=False,
         **kwargs
     ):
         """
@@ -110,6 +111,11 @@ class BetaGeoFitter(BaseFitter):
             tolerance for termination of the function minimization process.
         index: array_like, optional
             index for resulted DataFrame which is accessible via self.data
+        compress: bool or float, optional
+            if True, identical (frequency, recency, T) rows are fitted once, weighted by
+            their count. If a number, recency and T are first rounded to multiples of it.
+            ``self.data`` keeps one row per customer; the fitted patterns are in
+            ``compressed_data_`` and ``compression_index_`` maps every customer to its pattern.
         kwargs:
             key word arguments to pass to the scipy.optimize.minimize
             function as options dict
@@ -130,6 +136,17 @@ class BetaGeoFitter(BaseFitter):
         else:
             weights = np.asarray(weights)
 
+        customer_data = pd.DataFrame(
+            {"frequency": frequency, "recency": recency, "T": T, "weights": weights}, index=index
+        )
+        if compress:
+            (frequency, recency, T), weights = self._compress(
+                (frequency, recency, T), weights, compress, rounded=(False, True, True), index=index
+            )
+            self.compressed_data_ = pd.DataFrame(
+                {"frequency": frequency, "recency": recency, "T": T, "weights": weights}
+            )
+
         self._scale = _scale_time(T)
         scaled_recency = recency * self._scale
         scaled_T = T * self._scale
@@ -146,10 +163,10 @@ class BetaGeoFitter(BaseFitter):
         self.params_ = pd.Series(np.exp(log_params_), index=["r", "alpha", "a", "b"])
         self.params_["alpha"] /= self._scale
 
-        self.data = pd.DataFrame({"frequency": frequency, "recency": recency, "T": T, "weights": weights}, index=index)
+        self.data = customer_data
 
         self.generate_new_data = lambda size=1: beta_geometric_nbd_model(
-            T, *self._unload_params("r", "alpha", "a", "b"), size=size
+            customer_data["T"].values, *self._unload_params("r", "alpha", "a", "b"), size=size
         )
 
         self.predict = self.conditional_expected_number_of_purchases_up_to_time
@@ -217,7 +234,9 @@ class BetaGeoFitter(BaseFitter):
         Parameters
         ----------
         t: array_like
-            times to calculate the expectation for.
+            times to calculate the expectation for. Give it a leading axis of horizons
+            (e.g. ``t[:, None]``) to score every customer over a grid of t; the terms
+            that do not depend on t are then computed once per customer.
         frequency: array_like
             historical frequency of customer.
         recency: array_like
@@ -243,14 +262,10 @@ class BetaGeoFitter(BaseFitter):
         _b = b + x
         _c = a + b + x - 1
         _z = t / (alpha + T + t)
-        ln_hyp_term = np.log(hyp2f1(_a, _b, _c, _z))
-
-        # if the value is inf, we are using a different but equivalent
-        # formula to compute the function evaluation.
-        ln_hyp_term_alt = np.log(hyp2f1(_c - _a, _c - _b, _c, _z)) + (_c - _a - _b) * np.log(1 - _z)
-        ln_hyp_term = np.where(np.isinf(ln_hyp_term), ln_hyp_term_alt, ln_hyp_term)
+        ln_hyp_term = _log_hyp2f1(_a, _b, _c, _z)
         first_term = (a + b + x - 1) / (a - 1)
-        second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log((alpha + T) / (alpha + t + T)))
+        # (alpha + T) / (alpha + t + T) == 1 - _z
+        second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log1p(-_z))
 
         numerator = first_term * second_term
         denominator = 1 + (x > 0) * (a / (b + x - 1)) * ((alpha + T) / (alpha + recency)) ** (r + x)
@@ -167,6 +167,7 @@ class GammaGammaFitter(BaseFitter):
         tol=1e-7,
         index=None,
         q_constraint=False,
+        compress=False,
         **kwargs
     ):
         """
@@ -201,6 +202,11 @@ class GammaGammaFitter(BaseFitter):
         q_constraint: bool, optional
             when q < 1, population mean will result in a negative value
             leading to negative CLV outputs. If True, we penalize negative values of q to avoid this issue.
+        compress: bool or float, optional
+            if True, identical (frequency, monetary_value) rows are fitted once, weighted
+            by their count. If a number, monetary_value is first rounded to multiples of it.
+            ``self.data`` keeps one row per customer; the fitted patterns are in
+            ``compressed_data_`` and ``compression_index_`` maps every customer to its pattern.
         kwargs:
             key word arguments to pass to the scipy.optimize.minimize
             function as options dict
@@ -221,6 +227,17 @@ class GammaGammaFitter(BaseFitter):
         else:
             weights = np.asarray(weights)
 
+        customer_data = DataFrame(
+            {"monetary_value": monetary_value, "frequency": frequency, "weights": weights}, index=index
+        )
+        if compress:
+            (frequency, monetary_value), weights = self._compress(
+                (frequency, monetary_value), weights, compress, rounded=(False, True), index=index
+            )
+            self.compressed_data_ = DataFrame(
+                {"monetary_value": monetary_value, "frequency": frequency, "weights": weights}
+            )
+
         log_params, self._negative_log_likelihood_, self._hessian_ = self._fit(
             (frequency, monetary_value, weights, self.penalizer_coef),
             initial_params,
@@ -231,9 +248,7 @@ class GammaGammaFitter(BaseFitter):
             **kwargs
         )
 
-        self.data = DataFrame(
-            {"monetary_value": monetary_value, "frequency": frequency, "weights": weights}, index=index
-        )
+        self.data = customer_data
 
         self.params_ = pd.Series(np.exp(log_params), index=["p", "q", "v"])
 
@@ -252,7 +267,8 @@ class GammaGammaFitter(BaseFitter):
         monetary_value, 
         time=12, 
         discount_rate=0.01, 
-        freq="D"
+        freq="D",
+        chunksize=None
     ):
         """
         Return customer lifetime value.
@@ -277,10 +293,14 @@ class GammaGammaFitter(BaseFitter):
             (denoted m in literature).
         time: float, optional
             the lifetime expected for the user in months. Default: 12
-        discount_rate: float, optional
-            the monthly adjusted discount rate. Default: 0.01
+        discount_rate: float or array_like, optional
+            the monthly adjusted discount rate, or one rate per month for an
+            arbitrary discount schedule. Default: 0.01
         freq: string, optional
             {"D", "H", "M", "W"} for day, hour, month, week. This represents what unit of time your T is measure in.
+        chunksize: int, optional
+            number of customers evaluated at a time, to bound memory. Default
+            is all customers at once.
 
         Returns
         -------
@@ -293,5 +313,13 @@ class GammaGammaFitter(BaseFitter):
         adjusted_monetary_value = self.conditional_expected_average_profit(frequency, monetary_value)
 
         return _customer_lifetime_value(
-            transaction_prediction_model, frequency, recency, T, adjusted_monetary_value, time, discount_rate, freq=freq
+            transaction_prediction_model,
+            frequency,
+            recency,
+            T,
+            adjusted_monetary_value,
+            time,
+            discount_rate,
+            freq=freq,
+            chunksize=chunksize,
         )
@@ -8,8 +8,8 @@ from autograd.numpy import log, logaddexp
 from autograd.scipy.special import gammaln, beta, gamma
 from scipy.special import hyp2f1
 
-from lifetimes import BetaGeoFitter
-from lifetimes.generate_data import modified_beta_geometric_nbd_model
+from .beta_geo_fitter import BetaGeoFitter
+from ..generate_data import modified_beta_geometric_nbd_model
 
 
 class ModifiedBetaGeoFitter(BetaGeoFitter):
@@ -56,7 +56,17 @@ class ModifiedBetaGeoFitter(BetaGeoFitter):
         super(ModifiedBetaGeoFitter, self).__init__(penalizer_coef)
 
     def fit(
-        self, frequency, recency, T, weights=None, initial_params=None, verbose=False, tol=1e-7, index=None, **kwargs
+        self,
+        frequency,
+        recency,
+        T,
+        weights=None,
+        initial_params=None,
+        verbose=False,
+        tol=1e-7,
+        index=None,
+        compress=False,
+        **kwargs
     ):
         """
         Fit the data to the MBG/NBD model.
@@ -87,6 +97,11 @@ class ModifiedBetaGeoFitter(BetaGeoFitter):
             tolerance for termination of the function minimization process.
         index: array_like, optional
             index for resulted DataFrame which is accessible via self.data
+        compress: bool or float, optional
+            if True, identical (frequency, recency, T) rows are fitted once, weighted by
+            their count. If a number, recency and T are first rounded to multiples of it.
+            ``self.data`` keeps one row per customer; the fitted patterns are in
+            ``compressed_data_`` and ``compression_index_`` maps every customer to its pattern.
         kwargs:
             key word arguments to pass to the scipy.optimize.minimize
             function as options dict
@@ -100,7 +115,7 @@ class ModifiedBetaGeoFitter(BetaGeoFitter):
         # although the parent method is called, this class's
         # _negative_log_likelihood is referenced
         super(ModifiedBetaGeoFitter, self).fit(
-            frequency, recency, T, weights, initial_params, verbose, tol, index=index, **kwargs
+            frequency, recency, T, weights, initial_params, verbose, tol, index=index, compress=compress, **kwargs
         )
         # this needs to be reassigned from the parent method
         self.generate_new_data = lambda size=1: modified_beta_geometric_nbd_model(
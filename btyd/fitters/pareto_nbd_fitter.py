@@ -4,17 +4,33 @@
 from __future__ import print_function
 from __future__ import division
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import pandas as pd
 import numpy as np
+import autograd.numpy as anp
+from autograd import value_and_grad, hessian
+from autograd.scipy.special import gammaln as anp_gammaln
 from numpy import log, exp, logaddexp, asarray, any as npany
 from pandas import DataFrame
 from scipy.special import gammaln, hyp2f1, betaln
 from scipy.special import logsumexp
 from scipy.optimize import minimize
 
-from lifetimes.fitters import BaseFitter
-from lifetimes.utils import _check_inputs, _scale_time
-from lifetimes.generate_data import pareto_nbd_model
+from . import BaseFitter
+from ..utils import _check_inputs, _scale_time
+from ..generate_data import pareto_nbd_model
+
+# optimizers that do not use derivatives, lowercased since scipy matches method names in any case;
+# every other scipy method is given autograd gradients.
+DERIVATIVE_FREE_METHODS = ("nelder-mead", "powell", "cobyla")
+
+# Gauss-Legendre rule on [0, 1] and the number of panels used by ``_log_A_0_quadrature``.
+_QUADRATURE_NODES, _QUADRATURE_WEIGHTS = np.polynomial.legendre.leggauss(8)
+_QUADRATURE_NODES = ((_QUADRATURE_NODES + 1.0) / 2.0)[:, None]
+_QUADRATURE_WEIGHTS = _QUADRATURE_WEIGHTS / 2.0
+_QUADRATURE_PANELS = 4
 
 
 class ParetoNBDFitter(BaseFitter):
@@ -65,6 +81,9 @@ class ParetoNBDFitter(BaseFitter):
         index=None,
         fit_method="Nelder-Mead",
         maxiter=2000,
+        n_jobs=1,
+        executor=None,
+        compress=False,
         **kwargs
     ):
         """
@@ -101,10 +120,23 @@ class ParetoNBDFitter(BaseFitter):
         index: array_like, optional
             index for resulted DataFrame which is accessible via self.data
         fit_method : string, optional
-            fit_method to passing to scipy.optimize.minimize
+            fit_method to passing to scipy.optimize.minimize. Gradient-based methods,
+            e.g. "L-BFGS-B" or "BFGS", optimize the log-parameters with autograd
+            derivatives of a quadrature form of the likelihood and usually need far
+            fewer likelihood evaluations than the default Nelder-Mead.
         maxiter : int, optional
             max iterations for optimizer in scipy.optimize.minimize will be
             overwritten if set in kwargs.
+        n_jobs : int, optional
+            number of processes to spread the iterative_fitting restarts over.
+            -1 uses all cores. Ignored if ``executor`` is given.
+        executor : concurrent.futures.Executor, optional
+            executor to run the restarts on, e.g. an existing process pool.
+        compress : bool or float, optional
+            if True, identical (frequency, recency, T) rows are fitted once, weighted by
+            their count. If a number, recency and T are first rounded to multiples of it.
+            ``self.data`` keeps one row per customer; the fitted patterns are in
+            ``compressed_data_`` and ``compression_index_`` maps every customer to its pattern.
         kwargs:
             key word arguments to pass to the scipy.optimize.minimize
             function as options dict
@@ -112,7 +144,10 @@ class ParetoNBDFitter(BaseFitter):
         Returns
         -------
         ParetoNBDFitter
-            with additional properties like ``params_`` and methods like ``predict``
+            with additional properties like ``params_`` and methods like ``predict``.
+            ``fit_diagnostics_`` holds the parameters and negative log-likelihood
+            reached by every restart. Its iteration count is NaN for methods that
+            do not report one, like COBYLA.
         """
 
         frequency = asarray(frequency).astype(int)
@@ -126,6 +161,17 @@ class ParetoNBDFitter(BaseFitter):
 
         _check_inputs(frequency, recency, T)
 
+        customer_data = DataFrame(
+            {"frequency": frequency, "recency": recency, "T": T, "weights": weights}, index=index
+        )
+        if compress:
+            (frequency, recency, T), weights = self._compress(
+                (frequency, recency, T), weights, compress, rounded=(False, True, True), index=index
+            )
+            self.compressed_data_ = DataFrame(
+                {"frequency": frequency, "recency": recency, "T": T, "weights": weights}
+            )
+
         self._scale = _scale_time(T)
         scaled_recency = recency * self._scale
         scaled_T = T * self._scale
@@ -139,16 +185,31 @@ class ParetoNBDFitter(BaseFitter):
             tol,
             fit_method,
             maxiter,
+            n_jobs,
+            executor,
             **kwargs
         )
-        self._hessian_ = None
+        # the Hessian of the log-parameters, per unit weight like the other fitters; it does not
+        # change when alpha and beta are rescaled back to the original time units.
+        self._hessian_ = hessian(self._negative_log_likelihood_autograd)(
+            log(params), frequency, scaled_recency, scaled_T, weights, self.penalizer_coef
+        ) / weights.shape[0]
         self.params_ = pd.Series(*(params, ["r", "alpha", "s", "beta"]))
         self.params_["alpha"] /= self._scale
         self.params_["beta"] /= self._scale
+        self.fit_diagnostics_["alpha"] /= self._scale
+        self.fit_diagnostics_["beta"] /= self._scale
 
-        self.data = DataFrame({"frequency": frequency, "recency": recency, "T": T, "weights": weights}, index=index)
+        self.data = customer_data
+        try:
+            self.variance_matrix_ = self._compute_variance_matrix()
+        except np.linalg.LinAlgError:
+            # a singular Hessian leaves the standard errors undefined, not the fit.
+            self.variance_matrix_ = DataFrame(np.nan, index=self.params_.index, columns=self.params_.index)
+        self.standard_errors_ = self._compute_standard_errors()
+        self.confidence_intervals_ = self._compute_confidence_intervals()
         self.generate_new_data = lambda size=1: pareto_nbd_model(
-            T, *self._unload_params("r", "alpha", "s", "beta"), size=size
+            customer_data["T"].values, *self._unload_params("r", "alpha", "s", "beta"), size=size
         )
 
         self.predict = self.conditional_expected_number_of_purchases_up_to_time
@@ -183,11 +244,7 @@ class ParetoNBDFitter(BaseFitter):
         p_2 = hyp2f1(rsf, t, rsf + 1.0, abs_alpha_beta / (max_of_alpha_beta + age))
         q_2 = max_of_alpha_beta + age
 
-        try:
-            size = len(freq)
-            sign = np.ones(size)
-        except TypeError:
-            sign = 1
+        sign = np.ones(np.broadcast(p_1, q_1, p_2, q_2).shape)
 
         return logsumexp([log(p_1) + rsf * log(q_2), log(p_2) + rsf * log(q_1)], axis=0, b=[sign, -sign]) - rsf * log(
             q_1 * q_2
@@ -239,6 +296,114 @@ class ParetoNBDFitter(BaseFitter):
 
         return -(weights * conditional_log_likelihood).sum() / weights.mean() + penalizer_term
 
+    @staticmethod
+    def _log_A_0_quadrature(
+        params,
+        freq,
+        recency,
+        age
+    ):
+        """
+        log_A_0 by quadrature, differentiable with autograd.
+
+        Uses (s / (r + s + x)) * A_0 = s * int_{t_x}^{T} (alpha + tau)^-(r + x) (beta + tau)^-(s + 1) dtau,
+        i.e. the likelihood of dying between the last purchase and T. The interval is
+        split into panels evenly spaced in log(min(alpha, beta) + tau).
+        """
+
+        r, alpha, s, beta = params
+        a, b = r + freq, s + 1.0
+
+        # customers with recency == T have A_0 = 0; give them a dummy interval and mask the result.
+        has_interval = age > recency
+        lower = anp.where(has_interval, recency, 0.0)
+        upper = anp.where(has_interval, age, 1.0)
+
+        offset = anp.minimum(alpha, beta)
+        log_lower, log_upper = anp.log(offset + lower), anp.log(offset + upper)
+        edges = (
+            [lower]
+            + [
+                anp.exp(log_lower + (log_upper - log_lower) * j / _QUADRATURE_PANELS) - offset
+                for j in range(1, _QUADRATURE_PANELS)
+            ]
+            + [upper]
+        )
+
+        log_integral = ParetoNBDFitter._log_quadrature_panel(a, alpha, b, beta, edges[0], edges[1])
+        for lo, hi in zip(edges[1:-1], edges[2:]):
+            log_integral = anp.logaddexp(
+                log_integral, ParetoNBDFitter._log_quadrature_panel(a, alpha, b, beta, lo, hi)
+            )
+
+        return anp.where(has_interval, log_integral + anp.log(r + s + freq), -anp.inf)
+
+    @staticmethod
+    def _log_quadrature_panel(
+        a,
+        alpha,
+        b,
+        beta,
+        lower,
+        upper
+    ):
+        """
+        Log of int_lower^upper (alpha + tau)^-a (beta + tau)^-b dtau.
+
+        Substitutes w = ((c + lower) / (c + tau))^p, where the power law (c + tau)^-(p + 1)
+        has the integrand's log-slope at both ends, so the integrand left for the
+        Gauss-Legendre rule is nearly flat.
+        """
+
+        slope_lower = a / (alpha + lower) + b / (beta + lower)
+        slope_upper = a / (alpha + upper) + b / (beta + upper)
+        length = upper - lower
+
+        c_lower = slope_upper * length / anp.maximum(slope_lower - slope_upper, 1e-12 * slope_lower)
+        p = anp.maximum(slope_lower * c_lower - 1.0, 1e-3)
+        q = anp.exp(p * (anp.log(c_lower) - anp.log(c_lower + length)))
+
+        w = q + (1.0 - q) * _QUADRATURE_NODES
+        c_tau = c_lower * anp.exp(-anp.log(w) / p)
+        tau = c_tau - c_lower + lower
+        log_integrand = -a * anp.log(alpha + tau) - b * anp.log(beta + tau) + (p + 1.0) * anp.log(c_tau / c_lower)
+
+        max_log_integrand = anp.max(log_integrand, axis=0)
+        return (
+            max_log_integrand
+            + anp.log(anp.dot(_QUADRATURE_WEIGHTS, anp.exp(log_integrand - max_log_integrand)))
+            + anp.log(c_lower)
+            + anp.log1p(-q)
+            - anp.log(p)
+        )
+
+    @staticmethod
+    def _negative_log_likelihood_autograd(
+        log_params,
+        freq,
+        rec,
+        T,
+        weights,
+        penalizer_coef
+    ):
+        """
+        ``_negative_log_likelihood`` of the log-parameters, with ``_log_A_0_quadrature`` in
+        place of the hyp2f1 form so autograd can differentiate it.
+        """
+
+        params = anp.exp(log_params)
+        r, alpha, s, beta = params
+        x = freq
+
+        A_1 = anp_gammaln(r + x) - anp_gammaln(r) + r * anp.log(alpha) + s * anp.log(beta)
+        log_A_0 = ParetoNBDFitter._log_A_0_quadrature(params, x, rec, T)
+        A_2 = anp.logaddexp(
+            -(r + x) * anp.log(alpha + T) - s * anp.log(beta + T), anp.log(s) + log_A_0 - anp.log(r + s + x)
+        )
+
+        penalizer_term = penalizer_coef * anp.sum(params ** 2)
+        return -(weights * (A_1 + A_2)).sum() / weights.mean() + penalizer_term
+
     def conditional_expected_number_of_purchases_up_to_time(
         self, 
         t, 
@@ -325,12 +490,14 @@ class ParetoNBDFitter(BaseFitter):
     def conditional_probability_alive_matrix(
         self, 
         max_frequency=None, 
-        max_recency=None
+        max_recency=None,
+        chunksize=None
     ):
         """
         Compute the probability alive matrix. 
         
-        Builds on the ``conditional_probability_alive()`` method.
+        Builds on the ``conditional_probability_alive()`` method, evaluated on
+        the broadcast (recency, frequency) grid.
 
         Parameters
         ----------
@@ -339,6 +506,9 @@ class ParetoNBDFitter(BaseFitter):
         max_recency: float, optional
             the maximum recency to plot. This also determines the age of the
             customer. Default to max observed age.
+        chunksize: int, optional
+            number of recency rows evaluated at a time, to bound the memory of
+            intermediate arrays. Default is all rows at once.
 
         Returns
         -------
@@ -348,11 +518,15 @@ class ParetoNBDFitter(BaseFitter):
 
         max_frequency = max_frequency or int(self.data["frequency"].max())
         max_recency = max_recency or int(self.data["T"].max())
+        chunksize = chunksize or max_recency + 1
+
+        frequency = np.arange(max_frequency + 1)[None, :]
+        recency = np.arange(max_recency + 1)[:, None]
 
         Z = np.zeros((max_recency + 1, max_frequency + 1))
-        for i, recency in enumerate(np.arange(max_recency + 1)):
-            for j, frequency in enumerate(np.arange(max_frequency + 1)):
-                Z[i, j] = self.conditional_probability_alive(frequency, recency, max_recency)
+        for start in range(0, max_recency + 1, chunksize):
+            rows = slice(start, start + chunksize)
+            Z[rows] = self.conditional_probability_alive(frequency, recency[rows], max_recency)
 
         return Z
 
@@ -492,6 +666,8 @@ class ParetoNBDFitter(BaseFitter):
         tol=1e-6,
         fit_method="Nelder-Mead",
         maxiter=2000,
+        n_jobs=1,
+        executor=None,
         **kwargs
     ):
         """
@@ -500,9 +676,6 @@ class ParetoNBDFitter(BaseFitter):
         Minimizer Callback for this fitters class.
         """
 
-        ll = []
-        sols = []
-
         if iterative_fitting <= 0:
             raise ValueError("iterative_fitting parameter should be greater than 0 as of lifetimes v0.2.1")
 
@@ -517,27 +690,62 @@ class ParetoNBDFitter(BaseFitter):
         minimize_options["maxiter"] = maxiter
         minimize_options.update(kwargs)
 
-        total_count = 0
-        while total_count < iterative_fitting:
-            current_init_params = (
-                np.random.normal(1.0, scale=0.05, size=params_size) if initial_params is None else initial_params
-            )
-            if minimize_options["disp"]:
-                print("Optimize function with {}".format(fit_method))
-
-            output = minimize(
-                self._negative_log_likelihood,
-                method=fit_method,
-                tol=tol,
-                x0=current_init_params,
-                args=minimizing_function_args,
-                options=minimize_options,
-            )
-            sols.append(output.x)
-            ll.append(output.fun)
+        # starting points are drawn up front so results do not depend on how restarts are scheduled.
+        initial_params_list = [
+            np.random.normal(1.0, scale=0.05, size=params_size) if initial_params is None else initial_params
+            for _ in range(iterative_fitting)
+        ]
+        if minimize_options["disp"]:
+            print("Optimize function with {}".format(fit_method))
+
+        gradient_based = fit_method.lower() not in DERIVATIVE_FREE_METHODS
+        if gradient_based:
+            initial_params_list = [log(x0) for x0 in initial_params_list]
+
+        restart = partial(
+            _minimize_restart,
+            self._negative_log_likelihood_autograd if gradient_based else self._negative_log_likelihood,
+            args=minimizing_function_args,
+            method=fit_method,
+            tol=tol,
+            options=minimize_options,
+            gradient_based=gradient_based,
+        )
+        if executor is not None:
+            outputs = list(executor.map(restart, initial_params_list))
+        elif n_jobs != 1 and iterative_fitting > 1:
+            with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as pool:
+                outputs = list(pool.map(restart, initial_params_list))
+        else:
+            outputs = [restart(x0) for x0 in initial_params_list]
+
+        solutions = [exp(output.x) if gradient_based else output.x for output in outputs]
+        self.fit_diagnostics_ = DataFrame(
+            [
+                list(solution) + [output.fun, output.success, getattr(output, "nit", np.nan), output.nfev]
+                for solution, output in zip(solutions, outputs)
+            ],
+            columns=[
+                "r",
+                "alpha",
+                "s",
+                "beta",
+                "negative_log_likelihood",
+                "success",
+                "iterations",
+                "function_evaluations",
+            ],
+        )
+        self.fit_diagnostics_.index.name = "restart"
+
+        argmin_ll = int(self.fit_diagnostics_["negative_log_likelihood"].values.argmin())
+        return solutions[argmin_ll], outputs[argmin_ll].fun
 
-            total_count += 1
-        argmin_ll, min_ll = min(enumerate(ll), key=lambda x: x[1])
-        minimizing_params = sols[argmin_ll]
 
-        return minimizing_params, min_ll
\ No newline at end of file
+def _minimize_restart(negative_log_likelihood, x0, args, method, tol, options, gradient_based=False):
+    """One optimizer run; module level so process pools can pickle it."""
+    if gradient_based:
+        return minimize(
+            value_and_grad(negative_log_likelihood), jac=True, method=method, tol=tol, x0=x0, args=args, options=options
+        )
+    return minimize(negative_log_likelihood, method=method, tol=tol, x0=x0, args=args, options=options)
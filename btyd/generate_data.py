@@ -7,7 +7,7 @@ from numpy import random
 import pandas as pd
 
 
-def beta_geometric_nbd_model(T, r, alpha, a, b, size=1):
+def beta_geometric_nbd_model(T, r, alpha, a, b, size=1, random_state=None):
     """
     Generate artificial data according to the BG/NBD model.
 
@@ -21,6 +21,9 @@ def beta_geometric_nbd_model(T, r, alpha, a, b, size=1):
         Parameters in the model. See [1]_
     size: int, optional
         The number of customers to generate
+    random_state: None, int, or numpy random generator, optional
+        Source of randomness. None uses the global ``numpy.random`` state, an int seeds
+        a new ``np.random.Generator``.
 
     Returns
     -------
@@ -34,45 +37,30 @@ def beta_geometric_nbd_model(T, r, alpha, a, b, size=1):
        (http://brucehardie.com/papers/bgnbd_2004-04-20.pdf)
 
     """
-    if type(T) in [float, int]:
-        T = T * np.ones(size)
-    else:
-        T = np.asarray(T)
-
-    probability_of_post_purchase_death = random.beta(a, b, size=size)
-    lambda_ = random.gamma(r, scale=1.0 / alpha, size=size)
-
-    columns = ["frequency", "recency", "T", "lambda", "p", "alive", "customer_id"]
-    df = pd.DataFrame(np.zeros((size, len(columns))), columns=columns)
-
-    for i in range(size):
-        p = probability_of_post_purchase_death[i]
-        l = lambda_[i]
-
-        # hacky until I can find something better
-        times = []
-        next_purchase_in = random.exponential(scale=1.0 / l)
-        alive = True
-        while (np.sum(times) + next_purchase_in < T[i]) and alive:
-            times.append(next_purchase_in)
-            next_purchase_in = random.exponential(scale=1.0 / l)
-            alive = random.random() > p
-
-        times = np.array(times).cumsum()
-        df.iloc[i] = (
-            np.unique(np.array(times).astype(int)).shape[0],
-            np.max(times if times.shape[0] > 0 else 0),
-            T[i],
-            l,
-            p,
-            alive,
-            i,
-        )
+    T = _check_customer_ages(T, size)
+
+    random_state = _check_random_state(random_state)
+    p, lambda_, alive, customers, times = _beta_geometric_nbd_purchases(T, r, alpha, a, b, size, random_state)
+
+    df = pd.DataFrame(
+        {
+            "frequency": _distinct_purchase_periods(customers, times, size),
+            "recency": _last_purchase_times(customers, times, size),
+            "T": T,
+            "lambda": lambda_,
+            "p": p,
+            "alive": alive,
+            "customer_id": np.arange(size),
+        },
+        dtype=float,
+    )
 
     return df.set_index("customer_id")
 
 
-def beta_geometric_nbd_model_transactional_data(T, r, alpha, a, b, observation_period_end="2019-1-1", freq="D", size=1):
+def beta_geometric_nbd_model_transactional_data(
+    T, r, alpha, a, b, observation_period_end="2019-1-1", freq="D", size=1, random_state=None, chunksize=None
+):
     """
     Generate artificial transactional data according to the BG/NBD model.
 
@@ -90,10 +78,16 @@ def beta_geometric_nbd_model_transactional_data(T, r, alpha, a, b, observation_p
         Default 'D' for days, 'W' for weeks, 'h' for hours
     size: int, optional
         The number of customers to generate
+    random_state: None, int, or numpy random generator, optional
+        Source of randomness. None uses the global ``numpy.random`` state, an int seeds
+        a new ``np.random.Generator``.
+    chunksize: int, optional
+        If given, return a generator of DataFrames with the transactions of at most
+        ``chunksize`` customers each, so logs larger than memory can be streamed.
 
     Returns
     -------
-    DataFrame
+    DataFrame or generator of DataFrames
         The following columns:
         'customer_id', 'date'
 
@@ -105,40 +99,46 @@ def beta_geometric_nbd_model_transactional_data(T, r, alpha, a, b, observation_p
     """
     observation_period_end = pd.to_datetime(observation_period_end)
 
-    if type(T) in [float, int]:
-        start_date = [observation_period_end - pd.Timedelta(T - 1, unit=freq)] * size
-        T = T * np.ones(size)
-    else:
-        start_date = [observation_period_end - pd.Timedelta(T[i] - 1, unit=freq) for i in range(size)]
-        T = np.asarray(T)
+    T = _check_customer_ages(T, size)
 
-    probability_of_post_purchase_death = random.beta(a, b, size=size)
-    lambda_ = random.gamma(r, scale=1.0 / alpha, size=size)
+    random_state = _check_random_state(random_state)
+    if chunksize is None:
+        return _beta_geometric_nbd_transactions(T, r, alpha, a, b, observation_period_end, freq, random_state)
 
-    columns = ["customer_id", "date"]
-    df = pd.DataFrame(columns=columns)
+    return (
+        _beta_geometric_nbd_transactions(
+            T[start : start + chunksize], r, alpha, a, b, observation_period_end, freq, random_state, start
+        )
+        for start in range(0, size, chunksize)
+    )
 
-    for i in range(size):
-        s = start_date[i]
-        p = probability_of_post_purchase_death[i]
-        l = lambda_[i]
-        age = T[i]
 
-        purchases = [[i, s - pd.Timedelta(1, unit=freq)]]
-        next_purchase_in = random.exponential(scale=1.0 / l)
-        alive = True
+def _beta_geometric_nbd_transactions(
+    T, r, alpha, a, b, observation_period_end, freq, random_state, first_customer_id=0
+):
+    """
+    Transactions of ``len(T)`` BG/NBD customers, numbered from ``first_customer_id``.
+    """
+    size = T.shape[0]
+    _, _, _, customers, times = _beta_geometric_nbd_purchases(T, r, alpha, a, b, size, random_state)
 
-        while next_purchase_in < age and alive:
-            purchases.append([i, s + pd.Timedelta(next_purchase_in, unit=freq)])
-            next_purchase_in += random.exponential(scale=1.0 / l)
-            alive = random.random() > p
+    # every customer makes a first purchase one time unit before their start date,
+    # followed by the repeat purchases at their sampled times. Purchases come sorted by
+    # customer, so each customer's rows start at the cumulative count of earlier rows.
+    rows_per_customer = np.bincount(customers, minlength=size) + 1
+    is_first = np.zeros(rows_per_customer.sum(), dtype=bool)
+    is_first[np.cumsum(rows_per_customer) - rows_per_customer] = True
 
-        df = df.append(pd.DataFrame(purchases, columns=columns))
+    start_date = observation_period_end - pd.to_timedelta(T - 1, unit=freq)
+    date = np.empty(is_first.shape[0], dtype="datetime64[ns]")
+    date[is_first] = start_date - pd.Timedelta(1, unit=freq)
+    date[~is_first] = start_date[customers] + pd.to_timedelta(times, unit=freq)
 
-    return df.reset_index(drop=True)
+    customer_id = np.repeat(np.arange(first_customer_id, first_customer_id + size), rows_per_customer)
+    return pd.DataFrame({"customer_id": customer_id, "date": date})
 
 
-def pareto_nbd_model(T, r, alpha, s, beta, size=1):
+def pareto_nbd_model(T, r, alpha, s, beta, size=1, random_state=None):
     """
     Generate artificial data according to the Pareto/NBD model.
 
@@ -152,6 +152,9 @@ def pareto_nbd_model(T, r, alpha, s, beta, size=1):
         Parameters in the model. See [1]_
     size: int, optional
         The number of customers to generate
+    random_state: None, int, or numpy random generator, optional
+        Source of randomness. None uses the global ``numpy.random`` state, an int seeds
+        a new ``np.random.Generator``.
 
     Returns
     -------
@@ -165,44 +168,35 @@ def pareto_nbd_model(T, r, alpha, s, beta, size=1):
        and Related Expressions," <http://brucehardie.com/notes/009/>.
 
     """
-    if type(T) in [float, int]:
-        T = T * np.ones(size)
-    else:
-        T = np.asarray(T)
-
-    lambda_ = random.gamma(r, scale=1.0 / alpha, size=size)
-    mus = random.gamma(s, scale=1.0 / beta, size=size)
-
-    columns = ["frequency", "recency", "T", "lambda", "mu", "alive", "customer_id"]
-    df = pd.DataFrame(np.zeros((size, len(columns))), columns=columns)
-
-    for i in range(size):
-        l = lambda_[i]
-        mu = mus[i]
-        time_of_death = random.exponential(scale=1.0 / mu)
-
-        # hacky until I can find something better
-        times = []
-        next_purchase_in = random.exponential(scale=1.0 / l)
-        while np.sum(times) + next_purchase_in < min(time_of_death, T[i]):
-            times.append(next_purchase_in)
-            next_purchase_in = random.exponential(scale=1.0 / l)
-
-        times = np.array(times).cumsum()
-        df.iloc[i] = (
-            np.unique(np.array(times).astype(int)).shape[0],
-            np.max(times if times.shape[0] > 0 else 0),
-            T[i],
-            l,
-            mu,
-            time_of_death > T[i],
-            i,
-        )
+    T = _check_customer_ages(T, size)
+
+    random_state = _check_random_state(random_state)
+    lambda_ = random_state.gamma(r, scale=1.0 / alpha, size=size)
+    mus = random_state.gamma(s, scale=1.0 / beta, size=size)
+    time_of_death = random_state.exponential(scale=1.0 / mus)
+
+    # purchases form a Poisson process that stops at death or at the end of observation.
+    horizon = np.minimum(time_of_death, T)
+    n_purchases = random_state.poisson(lambda_ * horizon)
+    customers, times = _purchase_times(horizon, n_purchases, n_purchases, random_state)
+
+    df = pd.DataFrame(
+        {
+            "frequency": _distinct_purchase_periods(customers, times, size),
+            "recency": _last_purchase_times(customers, times, size),
+            "T": T,
+            "lambda": lambda_,
+            "mu": mus,
+            "alive": time_of_death > T,
+            "customer_id": np.arange(size),
+        },
+        dtype=float,
+    )
 
     return df.set_index("customer_id")
 
 
-def modified_beta_geometric_nbd_model(T, r, alpha, a, b, size=1):
+def modified_beta_geometric_nbd_model(T, r, alpha, a, b, size=1, random_state=None):
     """
     Generate artificial data according to the MBG/NBD model.
 
@@ -216,6 +210,9 @@ def modified_beta_geometric_nbd_model(T, r, alpha, a, b, size=1):
         Parameters in the model. See [1]_
     size: int, optional
         The number of customers to generate
+    random_state: None, int, or numpy random generator, optional
+        Source of randomness. None uses the global ``numpy.random`` state, an int seeds
+        a new ``np.random.Generator``.
 
     Returns
     -------
@@ -232,45 +229,30 @@ def modified_beta_geometric_nbd_model(T, r, alpha, a, b, size=1):
        International Journal of Research in Marketing, 24 (3), 201-209.
 
     """
-    if type(T) in [float, int]:
-        T = T * np.ones(size)
-    else:
-        T = np.asarray(T)
-
-    probability_of_post_purchase_death = random.beta(a, b, size=size)
-    lambda_ = random.gamma(r, scale=1.0 / alpha, size=size)
-
-    columns = ["frequency", "recency", "T", "lambda", "p", "alive", "customer_id"]
-    df = pd.DataFrame(np.zeros((size, len(columns))), columns=columns)
-
-    for i in range(size):
-        p = probability_of_post_purchase_death[i]
-        l = lambda_[i]
-
-        # hacky until I can find something better
-        times = []
-        next_purchase_in = random.exponential(scale=1.0 / l)
-        alive = random.random() > p  # essentially the difference between this model and BG/NBD
-        while (np.sum(times) + next_purchase_in < T[i]) and alive:
-            times.append(next_purchase_in)
-            next_purchase_in = random.exponential(scale=1.0 / l)
-            alive = random.random() > p
-
-        times = np.array(times).cumsum()
-        df.iloc[i] = (
-            np.unique(np.array(times).astype(int)).shape[0],
-            np.max(times if times.shape[0] > 0 else 0),
-            T[i],
-            l,
-            p,
-            alive,
-            i,
-        )
+    T = _check_customer_ages(T, size)
+
+    random_state = _check_random_state(random_state)
+    p, lambda_, alive, customers, times = _beta_geometric_nbd_purchases(
+        T, r, alpha, a, b, size, random_state, modified=True
+    )
+
+    df = pd.DataFrame(
+        {
+            "frequency": _distinct_purchase_periods(customers, times, size),
+            "recency": _last_purchase_times(customers, times, size),
+            "T": T,
+            "lambda": lambda_,
+            "p": p,
+            "alive": alive,
+            "customer_id": np.arange(size),
+        },
+        dtype=float,
+    )
 
     return df.set_index("customer_id")
 
 
-def beta_geometric_beta_binom_model(N, alpha, beta, gamma, delta, size=1):
+def beta_geometric_beta_binom_model(N, alpha, beta, gamma, delta, size=1, random_state=None):
     """
     Generate artificial data according to the Beta-Geometric/Beta-Binomial
     Model.
@@ -288,6 +270,9 @@ def beta_geometric_beta_binom_model(N, alpha, beta, gamma, delta, size=1):
         Parameters in the model. See [1]_
     size: int, optional
         The number of customers to generate
+    random_state: None, int, or numpy random generator, optional
+        Source of randomness. None uses the global ``numpy.random`` state, an int seeds
+        a new ``np.random.Generator``.
 
     Returns
     -------
@@ -303,31 +288,135 @@ def beta_geometric_beta_binom_model(N, alpha, beta, gamma, delta, size=1):
 
     """
 
-    if type(N) in [float, int, np.int64]:
-        N = N * np.ones(size)
-    else:
-        N = np.asarray(N)
-
-    probability_of_post_purchase_death = random.beta(a=alpha, b=beta, size=size)
-    thetas = random.beta(a=gamma, b=delta, size=size)
-
-    columns = ["frequency", "recency", "n_periods", "p", "theta", "alive", "customer_id"]
-    df = pd.DataFrame(np.zeros((size, len(columns))), columns=columns)
-    for i in range(size):
-        p = probability_of_post_purchase_death[i]
-        theta = thetas[i]
-
-        # hacky until I can find something better
-        current_t = 0
-        alive = True
-        times = []
-        while current_t < N[i] and alive:
-            alive = random.binomial(1, theta) == 0
-            if alive and random.binomial(1, p) == 1:
-                times.append(current_t)
-            current_t += 1
-        # adding in final death opportunity to agree with [1]
-        if alive:
-            alive = random.binomial(1, theta) == 0
-        df.iloc[i] = len(times), times[-1] + 1 if len(times) != 0 else 0, N[i], p, theta, alive, i
-    return df
+    N = _check_customer_ages(N, size, name="N")
+
+    random_state = _check_random_state(random_state)
+    probability_of_post_purchase_death = random_state.beta(a=alpha, b=beta, size=size)
+    thetas = random_state.beta(a=gamma, b=delta, size=size)
+
+    # a customer faces a death opportunity before each of the N transaction opportunities
+    # and one final one, and transacts with probability p at each opportunity survived.
+    death_opportunity = random_state.geometric(thetas)
+    opportunities_alive = np.minimum(death_opportunity - 1, N).astype(int)
+
+    # the last purchase is found from the run of non-purchases at the end; the purchases
+    # before it are binomial over the earlier opportunities.
+    trailing_non_purchases = np.minimum(
+        random_state.geometric(probability_of_post_purchase_death) - 1, opportunities_alive
+    )
+    recency = opportunities_alive - trailing_non_purchases
+    frequency = np.where(
+        recency > 0,
+        1 + random_state.binomial(np.maximum(recency - 1, 0), probability_of_post_purchase_death),
+        0,
+    )
+
+    return pd.DataFrame(
+        {
+            "frequency": frequency,
+            "recency": recency,
+            "n_periods": N,
+            "p": probability_of_post_purchase_death,
+            "theta": thetas,
+            "alive": death_opportunity > N + 1,
+            "customer_id": np.arange(size),
+        },
+        dtype=float,
+    )
+
+
+def _check_customer_ages(T, size, name="T"):
+    """
+    Return ``size`` customer ages: a scalar is repeated, an array gives its first ``size`` values.
+    """
+    if np.ndim(T) == 0:
+        return float(T) * np.ones(size)
+    T = np.asarray(T, dtype=float)
+    if T.shape[0] < size:
+        raise ValueError("{} has {} values, fewer than size={}.".format(name, T.shape[0], size))
+    return T[:size]
+
+
+def _check_random_state(random_state):
+    """
+    Turn ``random_state`` into an object with numpy's sampling methods.
+
+    None returns the global ``numpy.random`` module, so ``np.random.seed`` keeps working,
+    and an int seeds a new ``np.random.Generator``.
+    """
+    if random_state is None:
+        return random
+    if isinstance(random_state, (int, np.integer)):
+        return np.random.default_rng(random_state)
+    return random_state
+
+
+def _beta_geometric_nbd_purchases(T, r, alpha, a, b, size, random_state, modified=False):
+    """
+    Sample BG/NBD (or MBG/NBD) customers and the times of their repeat purchases.
+
+    A customer buys at the arrivals of a Poisson process on ``[0, T)`` until dying, with
+    probability p, after a purchase (and, for the MBG/NBD model, also at time 0).
+
+    Returns
+    -------
+    tuple
+        (p, lambda, alive) per customer, and (customer, time) per repeat purchase, sorted
+        by customer then time.
+    """
+    probability_of_post_purchase_death = random_state.beta(a, b, size=size)
+    lambda_ = random_state.gamma(r, scale=1.0 / alpha, size=size)
+
+    n_arrivals = random_state.poisson(lambda_ * T)
+    purchases_until_death = random_state.geometric(probability_of_post_purchase_death)
+    if modified:
+        purchases_until_death = purchases_until_death - 1
+    n_purchases = np.minimum(n_arrivals, purchases_until_death)
+    alive = n_arrivals < purchases_until_death
+
+    customers, times = _purchase_times(T, n_arrivals, n_purchases, random_state)
+    return probability_of_post_purchase_death, lambda_, alive, customers, times
+
+
+def _purchase_times(horizon, n_arrivals, n_purchases, random_state):
+    """
+    Sample the first ``n_purchases`` of ``n_arrivals`` Poisson arrival times on ``[0, horizon)``.
+
+    Given their count, Poisson arrival times are uniform order statistics, so the last
+    purchase is at ``horizon * Beta(n_purchases, n_arrivals - n_purchases + 1)`` and the
+    earlier purchases are uniform on ``[0, last)``.
+
+    Returns
+    -------
+    tuple
+        (customer, time) per purchase, sorted by customer then time.
+    """
+    buyers = np.flatnonzero(n_purchases > 0)
+    last = horizon[buyers] * random_state.beta(
+        n_purchases[buyers], n_arrivals[buyers] - n_purchases[buyers] + 1
+    )
+
+    earlier = np.repeat(np.arange(buyers.shape[0]), n_purchases[buyers] - 1)
+    earlier_times = last[earlier] * random_state.random(earlier.shape[0])
+
+    customers = np.concatenate((buyers, buyers[earlier]))
+    times = np.concatenate((last, earlier_times))
+    order = np.lexsort((times, customers))
+    return customers[order], times[order]
+
+
+def _distinct_purchase_periods(customers, times, size):
+    """Count each customer's distinct whole time units with a purchase."""
+    periods = times.astype(int)
+    is_new = np.ones(customers.shape[0], dtype=bool)
+    is_new[1:] = (customers[1:] != customers[:-1]) | (periods[1:] != periods[:-1])
+    return np.bincount(customers[is_new], minlength=size)
+
+
+def _last_purchase_times(customers, times, size):
+    """Each customer's latest purchase time, 0 without purchases."""
+    is_last = np.ones(customers.shape[0], dtype=bool)
+    is_last[:-1] = customers[1:] != customers[:-1]
+    recency = np.zeros(size)
+    recency[customers[is_last]] = times[is_last]
+    return recency
@@ -4,12 +4,15 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 import warnings
 import json
+import time
 from typing import Union, Tuple, TypeVar, Generic
 
 import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
 import pymc as pm
+from pymc.blocking import DictToArrayBijection, RaveledVars
 import aesara.tensor as at
 import arviz as az
 import xarray as xr
@@ -24,6 +27,15 @@ class BaseModel(ABC, Generic[SELF]):
     # This attribute must be defined in model subclasses.
     _quantities_of_interest: dict
 
+    _sampling_methods = ("nuts", "numpyro", "blackjax", "advi", "fullrank_advi", "minibatch_advi", "map")
+
+    # Quantities of interest computed per customer, which predict_summary() can reduce over posterior draws.
+    _customer_quantities = ("cond_prob_alive", "cond_n_prchs_to_time")
+
+    # Set by fit() when the log-likelihood is estimated from random subsets of RFM patterns.
+    _batch_size = None
+    _random_seed = None
+
     @abstractmethod
     def __init__(self) -> SELF:
         """ self._param_list must be instantiated here, as well as model hyperpriors."""
@@ -46,7 +58,7 @@ class BaseModel(ABC, Generic[SELF]):
         """Representation of BTYD model object."""
         classname = self.__class__.__name__
         try:
-            row_str = f"estimated with {self._frequency.shape[0]} customers."
+            row_str = f"estimated with {self._patterns[3].sum():.0f} customers."
         except AttributeError:
             row_str = ""
 
@@ -57,7 +69,22 @@ class BaseModel(ABC, Generic[SELF]):
         except AttributeError:
             return f"<btyd.{classname}>"
     
-    def fit(self, rfm_df: pd.DataFrame, tune: int = 1200, draws: int = 1200) -> SELF:
+    def fit(
+        self,
+        rfm_df: pd.DataFrame,
+        tune: int = 1200,
+        draws: int = 1200,
+        weights: npt.ArrayLike = None,
+        compress: bool = True,
+        method: str = "nuts",
+        chains: int = 4,
+        cores: int = 4,
+        target_accept: float = 0.95,
+        random_seed: int = None,
+        batch_size: int = 1000,
+        laplace: bool = True,
+        **kwargs,
+        ) -> SELF:
         """
         Fit a custom pymc model with parameter prior definitions to observed RFM data.
 
@@ -67,31 +94,209 @@ class BaseModel(ABC, Generic[SELF]):
             Pandas dataframe containing customer ids, frequency, recency, T and monetary value columns.
         tune: int
             Number of beginning 'burn-in' samples for posterior parameter distribution convergence. These are discarded after model is fit.
+            Ignored by the variational methods.
         draws: int
             Number of samples from posterior parameter distrutions after tune period. These are retained for model usage.
+        weights: array_like, optional
+            Number of customers represented by each row of ``rfm_df``. Defaults to 1 per row.
+        compress: bool
+            If True, identical (frequency, recency, T) rows are collapsed into weighted patterns so the
+            log-likelihood is evaluated once per distinct pattern rather than once per customer.
+        method: str
+            Posterior estimation backend. One of:
+
+            - 'nuts': pymc's NUTS sampler.
+            - 'numpyro' or 'blackjax': NUTS compiled with JAX. Requires the ``jax`` and ``numpyro``/``blackjax`` packages.
+            - 'advi' or 'fullrank_advi': variational approximation fitted with ``pm.fit``, from which ``draws`` samples are taken.
+              Much faster than sampling, at the cost of an approximate posterior.
+            - 'minibatch_advi': ADVI where each iteration evaluates the log-likelihood on ``batch_size`` randomly
+              drawn RFM patterns, rescaled to the full customer base. Iteration cost no longer grows with the data.
+            - 'map': maximum a posteriori point estimate from ``pm.find_MAP``, optionally widened into ``draws``
+              pseudo-posterior samples by a Laplace approximation. The fastest option, suited to frequent refits.
+        chains: int
+            Number of MCMC chains. Ignored by the variational methods.
+        cores: int
+            Number of chains run in parallel by the 'nuts' backend. The JAX backends run all chains in parallel.
+        target_accept: float
+            Target acceptance rate of NUTS step size adaptation.
+        random_seed: int, optional
+            Seed for reproducible sampling.
+        batch_size: int
+            Number of RFM patterns per 'minibatch_advi' iteration.
+        laplace: bool
+            If True, 'map' fits draw samples from a Laplace approximation around the mode.
+            Otherwise the posterior holds the single MAP point.
+        kwargs:
+            Additional keyword arguments for ``pm.sample``, the JAX sampler, ``pm.fit`` or ``pm.find_MAP``
+            (e.g. ``n`` for the number of ADVI iterations).
         
         Returns
         -------
         self
-            with ``_idata`` attribute for model evaluation and predictions.
+            with ``_idata`` attribute for model evaluation and predictions, and ``_sampling_stats``
+            containing the wall-clock time and effective samples per second of the fit.
         """
 
+        # Reset before validating, so a failed refit cannot leave an earlier fit's minibatch likelihood behind.
+        self._batch_size = None
+
+        if method not in self._sampling_methods:
+            raise ValueError(f"method must be one of {self._sampling_methods}, got '{method}'.")
+
         self._frequency, self._recency, self._T, self._monetary_value, _ = self._dataframe_parser(rfm_df)
+        self._compress_rfm(weights, compress)
+        if method == "minibatch_advi":
+            self._batch_size = batch_size
+        self._random_seed = random_seed
 
+        start = time.perf_counter()
         with self._model():
-            self._idata = pm.sample(
-                tune=tune,
-                draws=draws,
-                chains=4,
-                cores=4, 
-                target_accept=0.95,
-                return_inferencedata=True
-            )
+            if method == "nuts":
+                self._idata = pm.sample(
+                    tune=tune,
+                    draws=draws,
+                    chains=chains,
+                    cores=cores,
+                    target_accept=target_accept,
+                    random_seed=random_seed,
+                    return_inferencedata=True,
+                    **kwargs
+                )
+            elif method in ("numpyro", "blackjax"):
+                try:
+                    from pymc.sampling import jax as pm_jax
+                except ImportError:
+                    raise ImportError(f"The '{method}' sampler requires the jax and {method} packages.")
+                sampler = pm_jax.sample_numpyro_nuts if method == "numpyro" else pm_jax.sample_blackjax_nuts
+                self._idata = sampler(
+                    tune=tune,
+                    draws=draws,
+                    chains=chains,
+                    target_accept=target_accept,
+                    random_seed=random_seed,
+                    **kwargs
+                )
+            elif method == "map":
+                map_point = pm.find_MAP(seed=random_seed, **kwargs)
+                self._idata = self._laplace_approximation(map_point, draws if laplace else 0, random_seed)
+            else:
+                vi_method = "advi" if method == "minibatch_advi" else method
+                approximation = pm.fit(method=vi_method, random_seed=random_seed, **kwargs)
+                self._idata = approximation.sample(draws, random_seed=random_seed, return_inferencedata=True)
+        wall_time = time.perf_counter() - start
+
+        ess = az.ess(self._idata, var_names=[f"{self.__class__.__name__}::{var}" for var in self._param_list])
+        min_ess = float(min(ess[var].values for var in ess.data_vars))
+        self._sampling_stats = pd.Series(
+            {
+                "method": method,
+                "chains": self._idata.posterior.dims["chain"],
+                "draws": self._idata.posterior.dims["draw"],
+                "wall_time": wall_time,
+                "min_ess": min_ess,
+                "ess_per_second": min_ess / wall_time,
+            }
+        )
         
         return self
     
-    def _unload_params(self, posterior: bool = False, n_samples: int = 100) -> Union[Tuple[np.ndarray],Tuple[np.ndarray]]:
-        """Extract parameter posteriors from _idata InferenceData attribute of fitted model."""
+    def _compress_rfm(self, weights: npt.ArrayLike = None, compress: bool = True) -> None:
+        """Collapse the training RFM arrays into the weighted patterns used by the log-likelihood in _model()."""
+
+        if weights is None:
+            weights = np.ones_like(self._frequency, dtype=float)
+        else:
+            weights = np.asarray(weights, dtype=float)
+
+        if compress:
+            patterns, inverse = np.unique(
+                np.column_stack([self._frequency, self._recency, self._T]), axis=0, return_inverse=True
+            )
+            weights = np.bincount(inverse.ravel(), weights=weights, minlength=len(patterns))
+            self._patterns = (patterns[:, 0], patterns[:, 1], patterns[:, 2], weights)
+        else:
+            self._patterns = (self._frequency, self._recency, self._T, weights)
+
+    def _laplace_approximation(self, map_point: dict, draws: int, random_seed: int = None) -> az.InferenceData:
+        """
+        Build InferenceData from a MAP estimate of self.model.
+
+        With ``draws`` > 0 the posterior is approximated by a multivariate normal in the unconstrained
+        parameter space, centred on the mode with the inverse negative Hessian as covariance. The Hessian is
+        a central difference of the compiled log-probability gradient. Each draw is mapped back through the
+        model's transforms and deterministics, so the layout matches that of ``pm.sample``.
+        """
+
+        value_vars = self.model.value_vars
+        mode = DictToArrayBijection.map({var.name: map_point[var.name] for var in value_vars})
+        constrained = self.model.compile_fn(
+            self.model.unobserved_value_vars, inputs=value_vars, on_unused_input="ignore", point_fn=False
+        )
+        names = [var.name for var in self.model.unobserved_value_vars]
+
+        if draws == 0:
+            samples = mode.data[None, :]
+        else:
+            # find_MAP optimises the density without the transform Jacobians, so the Hessian must too.
+            dlogp = self.model.compile_dlogp(vars=self.model.free_RVs, jacobian=False)
+            gradient = lambda x: dlogp(DictToArrayBijection.rmap(RaveledVars(x, mode.point_map_info)))
+            steps = 1e-5 * np.maximum(1.0, np.abs(mode.data))
+            hessian = np.column_stack(
+                [(gradient(mode.data + step) - gradient(mode.data - step)) / (2 * h) for step, h in zip(np.diag(steps), steps)]
+            )
+            covariance = np.linalg.inv(-(hessian + hessian.T) / 2)
+            rng = np.random.default_rng(random_seed)
+            samples = rng.multivariate_normal(mode.data, covariance, size=draws)
+
+        points = [DictToArrayBijection.rmap(RaveledVars(sample, mode.point_map_info)) for sample in samples]
+        values = [constrained(*[point[var.name] for var in value_vars]) for point in points]
+        posterior = {
+            name: np.stack([value[i] for value in values])[None, ...]
+            for i, name in enumerate(names)
+            if not name.endswith("__")
+        }
+        return az.from_dict(posterior=posterior)
+
+    def _likelihood_data(self) -> Tuple[Union[np.ndarray, at.TensorVariable]]:
+        """
+        Return the (frequency, recency, T, weights) the log-likelihood in _model() is evaluated on.
+
+        For 'minibatch_advi' fits these are ``pm.Minibatch`` tensors drawing ``_batch_size`` patterns per
+        iteration, with weights scaled up so the summed log-likelihood stays an unbiased estimate of the total.
+        """
+
+        n_patterns = len(self._patterns[0])
+        if self._batch_size is None or self._batch_size >= n_patterns:
+            return self._patterns
+
+        seed = 42 if self._random_seed is None else self._random_seed
+        batch = pm.Minibatch(np.column_stack(self._patterns), batch_size=self._batch_size, random_seed=seed)
+        scale = n_patterns / self._batch_size
+        return batch[:, 0], batch[:, 1], batch[:, 2], batch[:, 3] * scale
+
+    @property
+    def _idata(self) -> az.InferenceData:
+        """InferenceData of the fitted or loaded model. Assigning it invalidates the parameter cache."""
+        try:
+            return self._inference_data
+        except AttributeError:
+            raise AttributeError(f"{self.__class__.__name__} has not been fitted or loaded.") from None
+
+    @_idata.setter
+    def _idata(self, idata: az.InferenceData) -> None:
+        self._inference_data = idata
+        self._param_cache = {}
+
+    def _unload_params(
+        self, posterior: bool = False, n_samples: int = 100, random_seed: int = None
+        ) -> Union[Tuple[np.ndarray],Tuple[np.ndarray]]:
+        """
+        Extract parameter posteriors from _idata InferenceData attribute of fitted model.
+
+        Flattened posterior draws, posterior means and the latest seeded subsample are cached until ``_idata`` is
+        reassigned.
+        Subsamples take the same draws for every parameter, preserving their posterior correlation.
+        """
 
         # BETA TODO: Raise BTYDException.
          # if dict(filter(lambda item: self.__class__.__name__ not in item[0], self._idata.posterior.get('data_vars').items()))
@@ -100,23 +305,34 @@ class BaseModel(ABC, Generic[SELF]):
         # test param exception (need another saved model and additions to self._unload_params())
         # test prediction exception if attempting to run predictions on instantiated model without RFM data.
 
-        if posterior:
-            return tuple(
-                [
-                    self._sample(
-                    self._idata.posterior.get(f'{self.__class__.__name__}::{var}').values.flatten(),
-                     n_samples) 
-                     for var in self._param_list
-                    ]
-                )
-
-        else:
-            return tuple(
-                [
-                    self._idata.posterior.get(f'{self.__class__.__name__}::{var}').mean().to_numpy()
-                    for var in self._param_list
-                    ]
-                )
+        posterior_data = self._idata.posterior
+        cache = self._param_cache
+        if 'draws' not in cache:
+            draws = [
+                np.ascontiguousarray(posterior_data.get(f'{self.__class__.__name__}::{var}').values.ravel())
+                for var in self._param_list
+                ]
+            for param_draws in draws:
+                param_draws.setflags(write=False)
+            cache['draws'] = tuple(draws)
+            cache['mean'] = tuple(np.asarray(param_draws.mean()) for param_draws in draws)
+
+        if not posterior:
+            return cache['mean']
+
+        key = (n_samples, random_seed)
+        if random_seed is not None and cache.get('sample_key') == key:
+            return cache['sample']
+
+        draw_idx = self._sample(np.arange(len(cache['draws'][0])), n_samples, random_seed)
+        samples = tuple(param_draws[draw_idx] for param_draws in cache['draws'])
+        # Unseeded subsamples must stay random between calls. Only the latest seeded subsample is kept,
+        # so scoring with a new seed every call does not grow the cache.
+        if random_seed is not None:
+            for param_samples in samples:
+                param_samples.setflags(write=False)
+            cache['sample_key'], cache['sample'] = key, samples
+        return samples
 
     def predict(self, 
         method:str,
@@ -125,17 +341,21 @@ class BaseModel(ABC, Generic[SELF]):
         sample_posterior: bool =  False,
         posterior_draws: int = 100,
         rfm_df: pd.DataFrame = None,
-        join_df = False 
+        join_df = False,
+        random_seed: int = None,
         ) -> np.ndarray:
         """
         Predictive API.
+
+        ``random_seed`` fixes the posterior draws used when ``sample_posterior`` is True; seeded draws are
+        cached, so repeated predictions with the same seed skip resampling.
         """
 
         if rfm_df is None:
             self._frequency, self._recency, self._T, self._monetary_value, _ = self._dataframe_parser(rfm_df)
 
         # TODO: Add exception handling for method argument.
-        predictions = self._quantities_of_interest.get(method)(self,t,n,sample_posterior,posterior_draws)
+        predictions = self._quantities_of_interest.get(method)(self,t,n,sample_posterior,posterior_draws,random_seed=random_seed)
 
         # TODO: Add arg to automatically merge to RFM dataframe?
         if join_df:
@@ -147,6 +367,80 @@ class BaseModel(ABC, Generic[SELF]):
         
         return predictions
     
+    def predict_summary(
+        self,
+        method: str,
+        t: int = None,
+        posterior_draws: int = 100,
+        rfm_df: pd.DataFrame = None,
+        quantiles: Tuple[float] = (0.025, 0.5, 0.975),
+        hdi_prob: float = 0.94,
+        max_bytes: int = 2**27,
+        random_seed: int = None,
+        ) -> pd.DataFrame:
+        """
+        Summarize the posterior distribution of a per-customer quantity of interest.
+
+        Customers are scored in chunks so that no (posterior_draws x customers) block exceeds ``max_bytes``.
+        Each chunk is reduced to its mean, quantiles and highest density interval before the next is
+        computed. Every chunk uses the same posterior draws.
+
+        Parameters
+        ----------
+        method: str
+            'cond_prob_alive' or 'cond_n_prchs_to_time'.
+        t: int, optional
+            Time periods for 'cond_n_prchs_to_time'.
+        posterior_draws: int
+            Number of posterior draws to evaluate for every customer.
+        rfm_df: pandas.DataFrame, optional
+            RFM data of the customers to score. Defaults to the data the model was fitted on.
+        quantiles: tuple of float
+            Quantiles of the posterior predictive distribution to report.
+        hdi_prob: float
+            Probability mass of the highest density interval.
+        max_bytes: int
+            Memory budget for the block of draws held at any one time.
+        random_seed: int, optional
+            Seed for the posterior draws.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by customer, with 'mean', one 'quantile_<q>' column per quantile, 'hdi_lower' and 'hdi_upper'.
+        """
+
+        if method not in self._customer_quantities:
+            raise ValueError(f"method must be one of {self._customer_quantities}, got '{method}'.")
+
+        if rfm_df is None:
+            frequency, recency, T = self._frequency, self._recency, self._T
+            customer = np.arange(np.size(frequency))
+        else:
+            frequency, recency, T, _, customer = self._dataframe_parser(rfm_df)
+        frequency, recency, T = np.atleast_1d(frequency), np.atleast_1d(recency), np.atleast_1d(T)
+
+        if random_seed is None:
+            random_seed = int(np.random.default_rng().integers(2**32))
+
+        quantity = self._quantities_of_interest.get(method)
+        chunksize = max(1, max_bytes // (8 * posterior_draws))
+        summaries = []
+        for start in range(0, len(frequency), chunksize):
+            chunk = slice(start, start + chunksize)
+            samples = quantity(
+                self, t, None, True, posterior_draws, frequency[chunk], recency[chunk], T[chunk], random_seed=random_seed
+            )
+            # Sorting once serves both the quantiles and the HDI.
+            samples.sort(axis=0)
+            hdi_lower, hdi_upper = self._hdi(samples, hdi_prob)
+            summaries.append(
+                np.column_stack([samples.mean(axis=0), self._sorted_quantiles(samples, quantiles).T, hdi_lower, hdi_upper])
+            )
+
+        columns = ["mean"] + [f"quantile_{q:g}" for q in quantiles] + ["hdi_lower", "hdi_upper"]
+        return pd.DataFrame(np.concatenate(summaries), index=customer, columns=columns)
+
     def save(self, filename: str) -> None:
         """
         Dump InferenceData from fitted model into a JSON or CSV file. Format is inferred from the filename.
@@ -216,9 +510,34 @@ class BaseModel(ABC, Generic[SELF]):
         return frequency, recency, T, monetary_value, customer
 
     @staticmethod
-    def _sample(param_array: array_like, n_samples: int) -> np.ndarray:
+    def _draws_by_customers(params: Tuple[np.ndarray], *arrays: np.ndarray) -> Tuple[np.ndarray]:
+        """Append axes to 1-D posterior draw arrays so they broadcast against all other operands (customer arrays, t, n) into (draws, ...) results."""
+        ndim = np.broadcast(*arrays).ndim
+        return tuple(np.reshape(param, np.shape(param) + (1,) * ndim) for param in params)
+
+    @staticmethod
+    def _sorted_quantiles(sorted_samples: np.ndarray, quantiles: Tuple[float]) -> np.ndarray:
+        """Linearly interpolated quantiles along the first axis of draws already sorted along it, as ``np.quantile``."""
+        position = np.asarray(quantiles) * (len(sorted_samples) - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, len(sorted_samples) - 1)
+        fraction = (position - lower)[:, None]
+        return sorted_samples[lower] + fraction * (sorted_samples[upper] - sorted_samples[lower])
+
+    @staticmethod
+    def _hdi(sorted_samples: np.ndarray, prob: float) -> Tuple[np.ndarray]:
+        """Narrowest interval containing ``prob`` of the draws already sorted along the first axis, for every column."""
+        n_draws = len(sorted_samples)
+        interval = int(np.floor(prob * n_draws))
+        widths = sorted_samples[interval:] - sorted_samples[: n_draws - interval]
+        lower_idx = widths.argmin(axis=0)
+        columns = np.arange(sorted_samples.shape[1])
+        return sorted_samples[lower_idx, columns], sorted_samples[lower_idx + interval, columns]
+
+    @staticmethod
+    def _sample(param_array: array_like, n_samples: int, random_seed: int = None) -> np.ndarray:
         """Utility function for sampling from parameter posteriors."""
-        rng = np.random.default_rng()
+        rng = np.random.default_rng(random_seed)
         return rng.choice(param_array, n_samples, replace=True)
 
 
@@ -234,7 +553,8 @@ class PredictMixin(ABC, Generic[SELF]):
         t: float = None, 
         n: int = None, 
         sample_posterior: bool = False,
-        posterior_draws: int = 100
+        posterior_draws: int = 100,
+        random_seed: int = None,
         ) -> None:
         pass
     
@@ -244,7 +564,8 @@ class PredictMixin(ABC, Generic[SELF]):
         t: float = None, 
         n: int = None, 
         sample_posterior: bool = False,
-        posterior_draws: int = 100
+        posterior_draws: int = 100,
+        random_seed: int = None,
         ) -> None:
         pass
     
@@ -254,7 +575,8 @@ class PredictMixin(ABC, Generic[SELF]):
         t: float = None, 
         n: int = None, 
         sample_posterior: bool = False,
-        posterior_draws: int = 100
+        posterior_draws: int = 100,
+        random_seed: int = None,
         ) -> None:
         pass
     
@@ -264,7 +586,8 @@ class PredictMixin(ABC, Generic[SELF]):
         t: float = None, 
         n: int = None, 
         sample_posterior: bool = False,
-        posterior_draws: int = 100
+        posterior_draws: int = 100,
+        random_seed: int = None,
         ) -> None:
         pass
     
@@ -11,12 +11,12 @@ import numpy.typing as npt
 import pymc as pm
 import aesara.tensor as at
 
-from scipy.special import gammaln, beta, gamma
+from scipy.special import gammaln, betaln, betainc, xlogy
 from scipy.special import hyp2f1
 from scipy.special import expit
 
 from . import BaseModel, PredictMixin
-from ..utils import _scale_time, _check_inputs
+from ..utils import _scale_time, _check_inputs, _log_hyp2f1
 from ..generate_data import beta_geometric_nbd_model
 
 
@@ -102,7 +102,9 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
             a = pm.Deterministic("a", phi_prior*kappa_prior)
             b = pm.Deterministic("b", (1.0-phi_prior)*kappa_prior)
 
-            logp = pm.Potential('loglike', self._log_likelihood(self._frequency, self._recency, self._T, a, b, alpha_prior, r_prior))
+            # Each distinct RFM pattern contributes its log-likelihood once per customer sharing it.
+            frequency, recency, T, weights = self._likelihood_data()
+            logp = pm.Potential('loglike', weights * self._log_likelihood(frequency, recency, T, a, b, alpha_prior, r_prior))
         
         return self.model
 
@@ -187,7 +189,8 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         posterior_draws: int = 100,
         frequency:npt.ArrayLike = None,
         recency:npt.ArrayLike = None,
-        T:npt.ArrayLike = None
+        T:npt.ArrayLike = None,
+        random_seed: int = None,
         ) -> Union[float,np.ndarray]:
         """
         Conditional expected number of purchases up to time.
@@ -201,7 +204,9 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         Parameters
         ----------
         t: array_like
-            times to calculate the expectation for.
+            times to calculate the expectation for. Give it a leading axis of horizons
+            (e.g. ``t[:, None]``) to score every customer over a grid of t; the terms
+            that do not depend on t are then computed once per customer.
         frequency: array_like
             historical frequency of customer.
         recency: array_like
@@ -211,7 +216,9 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
 
         Returns
         -------
-        float
+        float or array
+            With ``posterior``, an array of shape (posterior_draws, customers), or
+            (posterior_draws, horizons, customers) over a grid of t.
 
         References
         ----------
@@ -230,25 +237,25 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         if T is None:
             T = self._T
         
-        self._alpha, self._r, self._a, self._b = self._unload_params(posterior,posterior_draws)
+        self._alpha, self._r, self._a, self._b = self._unload_params(posterior,posterior_draws,random_seed)
 
         alpha = self._alpha
         r = self._r
         a = self._a
         b = self._b
+
+        if posterior:
+            x, recency, T = np.asarray(x), np.asarray(recency), np.asarray(T)
+            alpha, r, a, b = self._draws_by_customers((alpha, r, a, b), x, recency, T, t)
         
         _a = r + x
         _b = b + x
         _c = a + b + x - 1
         _z = t / (alpha + T + t)
-        ln_hyp_term = np.log(hyp2f1(_a, _b, _c, _z))
-
-        # if the value is inf, we are using a different but equivalent
-        # formula to compute the function evaluation.
-        ln_hyp_term_alt = np.log(hyp2f1(_c - _a, _c - _b, _c, _z)) + (_c - _a - _b) * np.log(1 - _z)
-        ln_hyp_term = np.where(np.isinf(ln_hyp_term), ln_hyp_term_alt, ln_hyp_term)
+        ln_hyp_term = _log_hyp2f1(_a, _b, _c, _z)
         first_term = (a + b + x - 1) / (a - 1)
-        second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log((alpha + T) / (alpha + t + T)))
+        # (alpha + T) / (alpha + t + T) == 1 - _z
+        second_term = 1 - np.exp(ln_hyp_term + (r + x) * np.log1p(-_z))
 
         numerator = first_term * second_term
         denominator = 1 + (x > 0) * (a / (b + x - 1)) * ((alpha + T) / (alpha + recency)) ** (r + x)
@@ -263,7 +270,8 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         posterior_draws: int = 100,
         frequency:npt.ArrayLike = None,
         recency:npt.ArrayLike = None,
-        T:npt.ArrayLike = None
+        T:npt.ArrayLike = None,
+        random_seed: int = None,
         ) -> np.ndarray:
         """
         Compute conditional probability alive.
@@ -285,7 +293,7 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         Returns
         -------
         array
-            value representing a probability
+            value representing a probability. With ``posterior``, of shape (posterior_draws, customers).
         """
 
         # To get rid of these arguments and IF statements, the pertinent unit test must be refactored.
@@ -296,13 +304,17 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         if T is None:
             T = self._T
 
-        self._alpha, self._r, self._a, self._b = self._unload_params(posterior,posterior_draws)
+        self._alpha, self._r, self._a, self._b = self._unload_params(posterior,posterior_draws,random_seed)
 
         alpha = self._alpha
         r = self._r
         a = self._a
         b = self._b
 
+        if posterior:
+            frequency, recency, T = np.asarray(frequency), np.asarray(recency), np.asarray(T)
+            alpha, r, a, b = self._draws_by_customers((alpha, r, a, b), frequency, recency, T)
+
         log_div = (r + frequency) * np.log((alpha + T) / (alpha + recency)) + np.log(
             a / (b + np.maximum(frequency, 1) - 1)
         )
@@ -315,6 +327,7 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         n: int = None,
         posterior: bool = False,
         posterior_draws: int = 100,
+        random_seed: int = None,
         ) -> Union[float,np.ndarray]:
         """
         Calculate the expected number of repeat purchases up to time t.
@@ -340,7 +353,7 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         Pareto/NBD Model," Marketing Science, 24 (2), 275-84.
         """
 
-        self._alpha, self._r, self._a, self._b = self._unload_params(posterior,posterior_draws)
+        self._alpha, self._r, self._a, self._b = self._unload_params(posterior,posterior_draws,random_seed)
 
         alpha = self._alpha
         r = self._r
@@ -357,6 +370,7 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         n: int = None,
         posterior: bool = False,
         posterior_draws: int = 100,
+        random_seed: int = None,
         ) -> Union[np.ndarray,float]:
         """
         Compute the probability of n purchases.
@@ -370,15 +384,16 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
 
         Parameters
         ----------
-        t: float
+        t: float or array_like
             number units of time
-        n: int
+        n: int or array_like
             number of purchases
 
         Returns
         -------
-        float:
-            Probability to have n purchases up to t units of time
+        array:
+            Probability to have n purchases up to t units of time, of shape
+            (draws,) + n.shape + t.shape, with a single draw for the posterior mean.
 
         References
         ----------
@@ -387,45 +402,36 @@ class BetaGeoModel(PredictMixin['BetaGeoModel'], BaseModel['BetaGeoModel']):
         Pareto/NBD Model," Marketing Science, 24 (2), 275-84.
         """
 
-        # _alpha, _r, _a, _b = self._unload_params(posterior,posterior_draws)
-        # Repeat param arrays for len n.
-        # alpha, r, a, b = [np.tile(_param,(1,n)) for _param in [alpha, r, a, b]]
-
-        param_arrays = self._unload_params(posterior,posterior_draws)
-        
-        if not posterior:
-            param_arrays = [np.array(_param).reshape(1,) for _param in param_arrays]
-
-        prob_n_purchases = []
-
-        for alpha, r, a, b in zip(param_arrays[0], param_arrays[1], param_arrays[2], param_arrays[3]):
+        alpha, r, a, b = (np.atleast_1d(param) for param in self._unload_params(posterior,posterior_draws,random_seed))
+
+        # Evaluate on a (draws, *n.shape, *t.shape) grid.
+        t = np.asarray(t, dtype=float)
+        n = np.asarray(n)
+        n = n.reshape(n.shape + (1,) * t.ndim)
+        alpha, r, a, b = self._draws_by_customers((alpha, r, a, b), n, t)
+
+        z = t / (alpha + t)
+        log_first_term = (
+            betaln(a, b + n)
+            - betaln(a, b)
+            + gammaln(r + n)
+            - gammaln(r)
+            - gammaln(n + 1)
+            + r * np.log1p(-z)
+            + xlogy(n, z)
+        )
 
-            first_term = (
-                beta(a, b + n)
-                / beta(a, b)
-                * gamma(r + n)
-                / gamma(r)
-                / gamma(n + 1)
-                * (alpha / (alpha + t)) ** r
-                * (t / (alpha + t)) ** n
+        # 1 - (alpha / (alpha + t))**r * sum_{j<n} gamma(r + j) / gamma(r) / j! * z**j is the upper tail
+        # of a negative binomial, i.e. the regularized incomplete beta function I_z(n, r).
+        n_positive = np.maximum(n, 1)
+        with np.errstate(divide="ignore"):
+            log_second_term = np.where(
+                n > 0,
+                betaln(a + 1, b + n_positive - 1) - betaln(a, b) + np.log(betainc(n_positive, r, z)),
+                -np.inf,
             )
 
-            if n > 0:
-                # create array of len(n) and transpose.
-                # n_range = np.arange(0, n).T 
-                j = np.arange(0, n)
-                # repeat n_range array for len of posterior draws.
-                # j = np.tile(n_range,(posterior_draws,1))  
-                finite_sum = (gamma(r + j) / gamma(r) / gamma(j + 1) * (t / (alpha + t)) ** j).sum()
-                second_term = beta(a + 1, b + n - 1) / beta(a, b) * (1 - (alpha / (alpha + t)) ** r * finite_sum)
-            else:
-                second_term = 0
-        
-            prob_n_purchase = first_term + second_term
-
-            prob_n_purchases.append(prob_n_purchase)
-
-        return np.array(prob_n_purchases)
+        return np.exp(np.logaddexp(log_first_term, log_second_term))
     
     # BETA TODO: this attribute can be removed after the attribute resolution order issue of PredictMixin is resolved.
     _quantities_of_interest = {
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 import pandas as pd
-from btyd.utils import calculate_alive_path, expected_cumulative_transactions
+from btyd.utils import calculate_alive_path, expected_cumulative_transactions, frequency_recency_matrix
 from scipy import stats
 
 __all__ = [
@@ -175,16 +175,7 @@ def plot_frequency_recency_matrix(
     """
     from matplotlib import pyplot as plt
 
-    if max_frequency is None:
-        max_frequency = int(model.data["frequency"].max())
-
-    if max_recency is None:
-        max_recency = int(model.data["T"].max())
-
-    Z = np.zeros((max_recency + 1, max_frequency + 1))
-    for i, recency in enumerate(np.arange(max_recency + 1)):
-        for j, frequency in enumerate(np.arange(max_frequency + 1)):
-            Z[i, j] = model.conditional_expected_number_of_purchases_up_to_time(T, frequency, recency, max_recency)
+    Z = frequency_recency_matrix(model, T, max_frequency, max_recency)
 
     interpolation = kwargs.pop("interpolation", "none")
 
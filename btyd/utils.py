@@ -1,11 +1,16 @@
 from __future__ import division
 
+import os
+from collections import OrderedDict
+
 import autograd.numpy as np
 import pandas as pd
 import dill
 
 import numpy
 import numpy.typing as npt
+from scipy.signal import convolve
+from scipy.special import hyp2f1
 from scipy.stats import wasserstein_distance
 
 
@@ -13,8 +18,16 @@ pd.options.mode.chained_assignment = None
 
 __all__ = [
     "calibration_and_holdout_data",
+    "calibration_and_holdout_splits",
+    "rolling_calibration_holdout",
     "summary_data_from_transaction_data",
+    "summary_data_from_transaction_chunks",
+    "calibration_and_holdout_data_from_chunks",
+    "RFMState",
     "calculate_alive_path",
+    "calculate_alive_paths",
+    "frequency_recency_matrix",
+    "clear_frequency_recency_matrix_cache",
     "expected_cumulative_transactions",
     ]
 
@@ -86,183 +99,1169 @@ def calibration_and_holdout_data(
         monetary_value_holdout.
     """
 
-    def to_period(d):
-        return d.to_period(freq)
+    codes, customers, datetimes, periods, values = _sorted_transaction_arrays(
+        transactions, customer_id_col, datetime_col, monetary_value_col, datetime_format, freq
+    )
 
     if observation_period_end is None:
-        observation_period_end = transactions[datetime_col].max()
-
-    transaction_cols = [customer_id_col, datetime_col]
-    if monetary_value_col:
-        transaction_cols.append(monetary_value_col)
-    transactions = transactions[transaction_cols].copy()
-
-    transactions[datetime_col] = pd.to_datetime(transactions[datetime_col], format=datetime_format)
+        observation_period_end = pd.Timestamp(datetimes.max())
     observation_period_end = pd.to_datetime(observation_period_end, format=datetime_format)
     calibration_period_end = pd.to_datetime(calibration_period_end, format=datetime_format)
 
-    # create calibration dataset
-    calibration_transactions = transactions.loc[transactions[datetime_col] <= calibration_period_end]
-    calibration_summary_data = summary_data_from_transaction_data(
-        calibration_transactions,
+    return _calibration_and_holdout_split(
+        codes,
+        customers,
+        datetimes,
+        periods,
+        values,
+        calibration_period_end,
+        observation_period_end,
+        freq=freq,
+        freq_multiplier=freq_multiplier,
+        include_first_transaction=include_first_transaction,
+    )
+
+
+def calibration_and_holdout_splits(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    calibration_period_ends,
+    observation_period_end=None,
+    freq="D",
+    freq_multiplier=1,
+    datetime_format=None,
+    monetary_value_col=None,
+    include_first_transaction=False,
+):
+    """
+    Create calibration and holdout summaries for several calibration cutoffs.
+
+    Equivalent to calling ``calibration_and_holdout_data`` once per cutoff, but the
+    transactions are parsed and sorted only once, which makes backtesting over many
+    cutoffs much cheaper.
+
+    Parameters
+    ----------
+    transactions: :obj: DataFrame
+        a Pandas DataFrame that contains the customer_id col and the datetime col.
+    customer_id_col: string
+        the column in transactions DataFrame that denotes the customer_id
+    datetime_col:  string
+        the column in transactions that denotes the datetime the purchase was made.
+    calibration_period_ends: list
+        the calibration cutoffs (inclusive), as strings or datetimes.
+    observation_period_end: :obj: datetime or list, optional
+         a string or datetime to denote the final date of the study, or one per cutoff.
+         Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    freq_multiplier: int, optional
+        Default: 1. Useful for getting exact recency & T.
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    monetary_value_col: string, optional
+        the column in transactions that denotes the monetary value of the transaction.
+    include_first_transaction: bool, optional
+        Default: False
+        By default the first transaction is not included while calculating frequency and
+        monetary_value. Can be set to True to include it.
+
+    Returns
+    -------
+    dict
+        mapping each calibration cutoff (as a Timestamp) to the DataFrame that
+        ``calibration_and_holdout_data`` returns for it.
+    """
+
+    codes, customers, datetimes, periods, values = _sorted_transaction_arrays(
+        transactions, customer_id_col, datetime_col, monetary_value_col, datetime_format, freq
+    )
+
+    calibration_period_ends, observation_period_ends = _calibration_cutoffs(
+        calibration_period_ends, observation_period_end, datetimes, datetime_format
+    )
+
+    return {
+        calibration_period_end: _calibration_and_holdout_split(
+            codes,
+            customers,
+            datetimes,
+            periods,
+            values,
+            calibration_period_end,
+            end,
+            freq=freq,
+            freq_multiplier=freq_multiplier,
+            include_first_transaction=include_first_transaction,
+        )
+        for calibration_period_end, end in zip(calibration_period_ends, observation_period_ends)
+    }
+
+
+def rolling_calibration_holdout(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    cutoffs,
+    observation_period_end=None,
+    freq="D",
+    freq_multiplier=1,
+    datetime_format=None,
+    monetary_value_col=None,
+    include_first_transaction=False,
+):
+    """
+    Rolling-origin calibration and holdout summaries in long format.
+
+    For every cutoff, each customer's calibration and holdout statistics are read off
+    cumulative arrays over the customer's sorted transactions, using one searchsorted
+    per cutoff. The log is sorted once, so many cutoffs cost little more than one.
+
+    Parameters
+    ----------
+    transactions: :obj: DataFrame
+        a Pandas DataFrame that contains the customer_id col and the datetime col.
+    customer_id_col: string
+        the column in transactions DataFrame that denotes the customer_id
+    datetime_col:  string
+        the column in transactions that denotes the datetime the purchase was made.
+    cutoffs: list
+        the calibration cutoffs (inclusive), as strings or datetimes.
+    observation_period_end: :obj: datetime or list, optional
+         a string or datetime to denote the final date of the study, or one per cutoff.
+         Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    freq_multiplier: int, optional
+        Default: 1. Useful for getting exact recency & T.
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    monetary_value_col: string, optional
+        the column in transactions that denotes the monetary value of the transaction.
+    include_first_transaction: bool, optional
+        Default: False
+        By default the first transaction is not included while calculating frequency and
+        monetary_value. Can be set to True to include it.
+
+    Returns
+    -------
+    :obj: DataFrame
+        A dataframe indexed by (cutoff, customer_id_col) with the columns returned by
+        ``calibration_and_holdout_data``. A customer appears under a cutoff only if
+        they purchased on or before it.
+    """
+
+    codes, customers, datetimes, periods, values = _sorted_transaction_arrays(
+        transactions, customer_id_col, datetime_col, monetary_value_col, datetime_format, freq
+    )
+    cutoffs, observation_period_ends = _calibration_cutoffs(
+        cutoffs, observation_period_end, datetimes, datetime_format
+    )
+
+    n = codes.shape[0]
+    customer_starts = numpy.flatnonzero(numpy.diff(codes, prepend=-1))
+    customer_ends = numpy.append(customer_starts[1:], n)
+    customer_codes = codes[customer_starts]
+
+    # a row opens a new purchase period if it is the customer's first row or its period differs
+    # from the previous row; prefix sums of that flag count distinct periods in any row range.
+    is_new_period = numpy.ones(n, dtype=bool)
+    is_new_period[1:] = (codes[1:] != codes[:-1]) | (periods[1:] != periods[:-1])
+    new_periods = numpy.concatenate(([0], numpy.cumsum(is_new_period)))
+    new_period_rows = numpy.append(numpy.flatnonzero(is_new_period), n)
+    first_period_ends = new_period_rows[numpy.searchsorted(new_period_rows, customer_starts, side="right")]
+    if values is not None:
+        value_sums = numpy.concatenate(([0.0], numpy.cumsum(values)))
+
+    # rank datetimes so that (customer, datetime) fits in one sortable int64 key.
+    unique_datetimes = numpy.unique(datetimes)
+    keys = codes * (unique_datetimes.shape[0] + 1) + numpy.searchsorted(unique_datetimes, datetimes)
+    customer_keys = customer_codes * (unique_datetimes.shape[0] + 1)
+
+    def rows_up_to(end):
+        rank = numpy.searchsorted(unique_datetimes, end.value, side="right")
+        return numpy.searchsorted(keys, customer_keys + rank)
+
+    frames = []
+    for cutoff, end in zip(cutoffs, observation_period_ends):
+        calibration_ends = rows_up_to(cutoff)
+        holdout_ends = numpy.maximum(rows_up_to(end), calibration_ends)
+        if (holdout_ends == calibration_ends).all():
+            raise ValueError(
+                "There is no data available. Check the `observation_period_end` and  `calibration_period_end` and confirm that values in `transactions` occur prior to those dates."
+            )
+
+        active = calibration_ends > customer_starts
+        starts, calibration_ends, holdout_ends = (
+            customer_starts[active],
+            calibration_ends[active],
+            holdout_ends[active],
+        )
+
+        state = pd.DataFrame(
+            {
+                "first": periods[starts],
+                "last": periods[calibration_ends - 1],
+                "periods": new_periods[calibration_ends] - new_periods[starts],
+            },
+            index=customers.take(customer_codes[active]),
+        )
+        if values is not None:
+            first_values = value_sums[numpy.minimum(calibration_ends, first_period_ends[active])] - value_sums[starts]
+            state["first_value"] = first_values
+            state["repeat_value"] = value_sums[calibration_ends] - value_sums[starts] - first_values
+
+        summary = _summary_data_from_period_state(
+            state,
+            cutoff.to_period(freq).ordinal,
+            freq_multiplier=freq_multiplier,
+            include_first_transaction=include_first_transaction,
+        )
+        summary.columns = [c + "_cal" for c in summary.columns]
+
+        n_holdout = holdout_ends - calibration_ends
+        has_holdout = n_holdout > 0
+        # the first holdout row may continue the last calibration period, in which case it
+        # does not carry the new-period flag but still counts as a holdout period.
+        continues_period = has_holdout & ~is_new_period[numpy.minimum(calibration_ends, n - 1)]
+        summary["frequency_holdout"] = (
+            new_periods[holdout_ends] - new_periods[calibration_ends] + continues_period
+        ).astype(float)
+        if values is not None:
+            summary["monetary_value_holdout"] = numpy.where(
+                has_holdout,
+                (value_sums[holdout_ends] - value_sums[calibration_ends]) / numpy.maximum(n_holdout, 1),
+                0.0,
+            )
+        summary["duration_holdout"] = (end.to_period(freq) - cutoff.to_period(freq)).n / freq_multiplier
+        frames.append(summary)
+
+    return pd.concat(frames, keys=cutoffs, names=["cutoff", customer_id_col])
+
+
+def _calibration_cutoffs(calibration_period_ends, observation_period_end, datetimes, datetime_format=None):
+    """
+    Parse calibration cutoffs and pair each with its observation period end.
+
+    ``observation_period_end`` may be a single date, one date per cutoff, or None for the
+    latest of ``datetimes`` (int64 nanoseconds).
+    """
+
+    calibration_period_ends = [pd.to_datetime(end, format=datetime_format) for end in calibration_period_ends]
+    if observation_period_end is None:
+        observation_period_end = pd.Timestamp(datetimes.max())
+    if pd.api.types.is_list_like(observation_period_end):
+        observation_period_ends = [pd.to_datetime(end, format=datetime_format) for end in observation_period_end]
+        if len(observation_period_ends) != len(calibration_period_ends):
+            raise ValueError("observation_period_end must be a single date or one date per calibration cutoff.")
+    else:
+        observation_period_ends = [pd.to_datetime(observation_period_end, format=datetime_format)] * len(
+            calibration_period_ends
+        )
+    return calibration_period_ends, observation_period_ends
+
+
+def _sorted_transaction_arrays(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    monetary_value_col=None,
+    datetime_format=None,
+    freq="D",
+):
+    """
+    Convert a transaction log to columnar arrays sorted by customer, then datetime.
+
+    The arrays come from ``_factorize_transactions``, so rows are dropped the same way.
+
+    Returns
+    -------
+    tuple
+        (codes, customers, datetimes, periods, values), where ``datetimes`` are int64
+        nanoseconds since the epoch and ``periods`` the matching period ordinals.
+    """
+
+    codes, customers, periods, values, datetimes = _factorize_transactions(
+        transactions,
         customer_id_col,
         datetime_col,
+        monetary_value_col=monetary_value_col,
         datetime_format=datetime_format,
-        observation_period_end=calibration_period_end,
         freq=freq,
-        freq_multiplier=freq_multiplier,
-        monetary_value_col=monetary_value_col,
-        include_first_transaction=include_first_transaction,
+        return_datetimes=True,
     )
-    calibration_summary_data.columns = [c + "_cal" for c in calibration_summary_data.columns]
 
-    # create holdout dataset
-    holdout_transactions = transactions.loc[
-        (observation_period_end >= transactions[datetime_col]) & (transactions[datetime_col] > calibration_period_end)
-    ]
+    order = numpy.lexsort((datetimes, codes))
+    codes, datetimes, periods = codes[order], datetimes[order], periods[order]
+    if values is not None:
+        values = values[order]
+
+    return codes, customers, datetimes, periods, values
+
+
+def _calibration_and_holdout_split(
+    codes,
+    customers,
+    datetimes,
+    periods,
+    values,
+    calibration_period_end,
+    observation_period_end,
+    freq="D",
+    freq_multiplier=1,
+    include_first_transaction=False,
+):
+    """
+    Compute calibration and holdout statistics from arrays sorted by ``_sorted_transaction_arrays``.
 
-    if holdout_transactions.empty:
+    Both sides are masks over the same sorted arrays, so no further sorting or grouping
+    is needed.
+    """
+
+    in_calibration = datetimes <= calibration_period_end.value
+    in_holdout = ~in_calibration & (datetimes <= observation_period_end.value)
+
+    if not in_holdout.any():
         raise ValueError(
             "There is no data available. Check the `observation_period_end` and  `calibration_period_end` and confirm that values in `transactions` occur prior to those dates."
         )
 
-    holdout_transactions[datetime_col] = holdout_transactions[datetime_col].map(to_period)
-    holdout_summary_data = (
-        holdout_transactions.groupby([customer_id_col, datetime_col], sort=False)
-        .agg(lambda r: 1)
-        .groupby(level=customer_id_col)
-        .agg(["count"])
+    calibration_state = _period_state(
+        codes[in_calibration],
+        customers,
+        periods[in_calibration],
+        None if values is None else values[in_calibration],
+        presorted=True,
     )
-    holdout_summary_data.columns = ["frequency_holdout"]
-    if monetary_value_col:
-        holdout_summary_data["monetary_value_holdout"] = holdout_transactions.groupby(customer_id_col)[
-            monetary_value_col
-        ].mean()
+    calibration_summary_data = _summary_data_from_period_state(
+        calibration_state,
+        calibration_period_end.to_period(freq).ordinal,
+        freq_multiplier=freq_multiplier,
+        include_first_transaction=include_first_transaction,
+    )
+    calibration_summary_data.columns = [c + "_cal" for c in calibration_summary_data.columns]
+
+    holdout_codes = codes[in_holdout]
+    period_codes, _, _, customer_starts = _customer_period_segments(
+        holdout_codes, periods[in_holdout], presorted=True
+    )
+    holdout_customers = period_codes[customer_starts]
+    holdout_summary_data = pd.DataFrame(
+        {"frequency_holdout": numpy.diff(numpy.append(customer_starts, period_codes.shape[0]))},
+        index=customers.take(holdout_customers),
+    )
+    if values is not None:
+        # holdout spend is averaged over transactions, not purchase periods.
+        value_sums = numpy.bincount(holdout_codes, weights=values[in_holdout], minlength=len(customers))
+        transaction_counts = numpy.bincount(holdout_codes, minlength=len(customers))
+        holdout_summary_data["monetary_value_holdout"] = (
+            value_sums[holdout_customers] / transaction_counts[holdout_customers]
+        )
 
     combined_data = calibration_summary_data.join(holdout_summary_data, how="left")
     combined_data.fillna(0, inplace=True)
 
-    delta_time = (to_period(observation_period_end) - to_period(calibration_period_end)).n
+    delta_time = (observation_period_end.to_period(freq) - calibration_period_end.to_period(freq)).n
     combined_data["duration_holdout"] = delta_time / freq_multiplier
 
     return combined_data
 
 
-def _find_first_transactions(
+def _find_first_transactions(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    monetary_value_col=None,
+    datetime_format=None,
+    observation_period_end=None,
+    freq="D",
+):
+    """
+    Return dataframe with first transactions.
+
+    This takes a DataFrame of transaction data of the form:
+        customer_id, datetime [, monetary_value]
+    and appends a column named 'repeated' to the transaction log which indicates which rows
+    are repeated transactions for that customer_id.
+
+    Parameters
+    ----------
+    transactions: :obj: DataFrame
+        a Pandas DataFrame that contains the customer_id col and the datetime col.
+    customer_id_col: string
+        the column in transactions DataFrame that denotes the customer_id
+    datetime_col:  string
+        the column in transactions that denotes the datetime the purchase was made.
+    monetary_value_col: string, optional
+        the column in transactions that denotes the monetary value of the transaction.
+        Optional, only needed for customer lifetime value estimation models.
+    observation_period_end: :obj: datetime
+        a string or datetime to denote the final date of the study.
+        Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    """
+
+    if observation_period_end is None:
+        observation_period_end = transactions[datetime_col].max()
+
+    if type(observation_period_end) == pd.Period:
+        observation_period_end = observation_period_end.to_timestamp()
+
+    select_columns = [customer_id_col, datetime_col]
+
+    if monetary_value_col:
+        select_columns.append(monetary_value_col)
+
+    transactions = transactions[select_columns].sort_values(select_columns).copy()
+
+    # make sure the date column uses datetime objects, and use Pandas' DateTimeIndex.to_period()
+    # to convert the column to a PeriodIndex which is useful for time-wise grouping and truncating
+    transactions[datetime_col] = pd.to_datetime(transactions[datetime_col], format=datetime_format)
+    transactions = transactions.set_index(datetime_col).to_period(freq).to_timestamp()
+
+    transactions = transactions.loc[(transactions.index <= observation_period_end)].reset_index()
+
+    period_groupby = transactions.groupby([datetime_col, customer_id_col], sort=False, as_index=False)
+
+    if monetary_value_col:
+        # when we have a monetary column, make sure to sum together any values in the same period
+        period_transactions = period_groupby.sum()
+    else:
+        # by calling head() on the groupby object, the datetime_col and customer_id_col columns
+        # will be reduced
+        period_transactions = period_groupby.head(1)
+
+    # initialize a new column where we will indicate which are the first transactions
+    period_transactions["first"] = False
+    # find all of the initial transactions and store as an index
+    first_transactions = period_transactions.groupby(customer_id_col, sort=True, as_index=False).head(1).index
+    # mark the initial transactions as True
+    period_transactions.loc[first_transactions, "first"] = True
+    select_columns.append("first")
+    # reset datetime_col to period
+    period_transactions[datetime_col] = pd.Index(period_transactions[datetime_col]).to_period(freq)
+
+    return period_transactions[select_columns]
+
+
+def _period_ordinals(
+    datetimes,
+    freq="D",
+    datetime_format=None
+):
+    """
+    Bin datetimes into integer period ordinals.
+
+    Parameters
+    ----------
+    datetimes: array_like
+        datetimes (or strings parseable as datetimes) to bin.
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+
+    Returns
+    -------
+    :obj: ndarray
+        int64 array with the ordinal of the period each datetime falls in. Missing
+        datetimes are mapped to ``pd.NaT.value``.
+    """
+
+    datetimes = pd.DatetimeIndex(pd.to_datetime(datetimes, format=datetime_format))
+    return datetimes.to_period(freq).asi8
+
+
+def _factorize_transactions(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    monetary_value_col=None,
+    datetime_format=None,
+    freq="D",
+    return_datetimes=False,
+):
+    """
+    Convert a transaction log to columnar integer arrays.
+
+    Customer ids are factorized once into dense integer codes, and datetimes are binned
+    into integer period ordinals. Rows with a missing customer id or datetime are dropped,
+    mirroring the groupby semantics of ``_find_first_transactions``.
+
+    Returns
+    -------
+    tuple
+        (codes, customers, periods, values), where ``customers`` is the sorted Index of
+        customer ids that ``codes`` refer to, and ``values`` is None if no
+        ``monetary_value_col`` was given; missing monetary values are read as 0. With ``return_datetimes=True`` the int64
+        nanosecond datetimes of the kept rows are appended.
+    """
+
+    codes, customers = pd.factorize(transactions[customer_id_col], sort=True)
+    customers = pd.Index(customers, name=customer_id_col)
+    datetimes = pd.DatetimeIndex(pd.to_datetime(transactions[datetime_col], format=datetime_format))
+    periods = _period_ordinals(datetimes, freq)
+    datetimes = datetimes.asi8
+
+    values = None
+    if monetary_value_col:
+        # missing values add nothing to a period's spend, as in groupby().sum().
+        values = numpy.asarray(transactions[monetary_value_col], dtype=float)
+        values = numpy.where(numpy.isnan(values), 0.0, values)
+
+    valid = (codes >= 0) & (periods != pd.NaT.value)
+    if not valid.all():
+        codes, periods, datetimes = codes[valid], periods[valid], datetimes[valid]
+        if values is not None:
+            values = values[valid]
+
+    if return_datetimes:
+        return codes, customers, periods, values, datetimes
+    return codes, customers, periods, values
+
+
+def _customer_period_segments(
+    codes,
+    periods,
+    values=None,
+    presorted=False
+):
+    """
+    Reduce transactions to one row per (customer, period), sorted by customer then period.
+
+    Transactions falling in the same period are collapsed into a single purchase, and
+    their monetary values are summed, matching ``_find_first_transactions``. Pass
+    ``presorted=True`` if the inputs are already sorted by customer then period to skip
+    the sort.
+
+    Returns
+    -------
+    tuple
+        (period_codes, period_ordinals, period_values, customer_starts), where
+        ``customer_starts`` holds the offset of each customer's first period row.
+    """
+
+    if codes.shape[0] == 0:
+        empty = numpy.array([], dtype=numpy.int64)
+        return empty, empty, None if values is None else numpy.array([], dtype=float), empty
+
+    min_period = periods.min()
+    span = numpy.int64(periods.max() - min_period + 1)
+    offsets = periods - min_period
+
+    # a single int64 key sorts far faster than a lexsort over two columns.
+    if not presorted and codes.max() < numpy.iinfo(numpy.int64).max // span:
+        keys = codes.astype(numpy.int64) * span + offsets
+        if values is None:
+            keys = numpy.sort(keys)
+        else:
+            order = numpy.argsort(keys, kind="stable")
+            keys, values = keys[order], values[order]
+        period_start = numpy.empty(keys.shape[0], dtype=bool)
+        period_start[0] = True
+        numpy.not_equal(keys[1:], keys[:-1], out=period_start[1:])
+        period_rows = numpy.flatnonzero(period_start)
+        period_codes = keys[period_rows] // span
+        period_ordinals = keys[period_rows] % span + min_period
+    else:
+        if not presorted:
+            order = numpy.lexsort((offsets, codes))
+            codes, periods = codes[order], periods[order]
+            if values is not None:
+                values = values[order]
+        period_start = numpy.empty(codes.shape[0], dtype=bool)
+        period_start[0] = True
+        period_start[1:] = (codes[1:] != codes[:-1]) | (periods[1:] != periods[:-1])
+        period_rows = numpy.flatnonzero(period_start)
+        period_codes = codes[period_rows].astype(numpy.int64)
+        period_ordinals = periods[period_rows]
+
+    period_values = None if values is None else numpy.add.reduceat(values, period_rows)
+
+    customer_start = numpy.empty(period_codes.shape[0], dtype=bool)
+    customer_start[0] = True
+    numpy.not_equal(period_codes[1:], period_codes[:-1], out=customer_start[1:])
+
+    return period_codes, period_ordinals, period_values, numpy.flatnonzero(customer_start)
+
+
+def _period_state(
+    codes,
+    customers,
+    periods,
+    values=None,
+    presorted=False
+):
+    """
+    Build the per-customer running state from columnar transactions.
+
+    The state is a DataFrame indexed by customer id with the integer ordinals of the
+    ``first`` and ``last`` purchase periods and the number of distinct purchase
+    ``periods``. If ``values`` are given, it also holds the spend in the first purchase
+    period (``first_value``) and the summed spend of all later periods (``repeat_value``).
+    This is everything needed to produce a summary, and states of disjoint time ranges
+    can be merged with ``_merge_period_states``.
+    """
+
+    period_codes, period_ordinals, period_values, customer_starts = _customer_period_segments(
+        codes, periods, values, presorted
+    )
+    customer_ends = numpy.append(customer_starts, period_codes.shape[0])[1:] - 1
+
+    state = pd.DataFrame(index=customers.take(period_codes[customer_starts]))
+    state["first"] = period_ordinals[customer_starts]
+    state["last"] = period_ordinals[customer_ends]
+    state["periods"] = numpy.diff(numpy.append(customer_starts, period_codes.shape[0]))
+
+    if values is not None:
+        state["first_value"] = period_values[customer_starts]
+        # exclude the first purchase of every customer from the repeat spend.
+        period_values[customer_starts] = 0.0
+        state["repeat_value"] = (
+            numpy.add.reduceat(period_values, customer_starts) if period_values.shape[0] else period_values
+        )
+
+    return state
+
+
+def _merge_period_states(
+    state,
+    update
+):
+    """
+    Merge the state of a later batch of transactions into an existing state.
+
+    Purchases of a customer in ``update`` must not fall in a period before the last
+    purchase period already recorded in ``state``. A purchase in that same last period
+    is not counted twice.
+    """
+
+    if state is None or state.empty:
+        return update
+    if update.empty:
+        return state
+
+    positions = state.index.get_indexer(update.index)
+    is_new = positions < 0
+    seen = positions[~is_new]
+    returning = update[~is_new]
+
+    first = state["first"].to_numpy()
+    last = state["last"].to_numpy().copy()
+    periods = state["periods"].to_numpy().copy()
+
+    if numpy.any(returning["first"].to_numpy() < last[seen]):
+        raise ValueError(
+            "Transactions must be passed in chronological order: some customers have purchases "
+            "in a period before their last recorded purchase."
+        )
+
+    shared_period = returning["first"].to_numpy() == last[seen]
+    periods[seen] += returning["periods"].to_numpy() - shared_period
+    last[seen] = returning["last"].to_numpy()
+
+    merged = pd.DataFrame({"first": first, "last": last, "periods": periods}, index=state.index)
+
+    if "first_value" in state.columns:
+        first_value = state["first_value"].to_numpy().copy()
+        repeat_value = state["repeat_value"].to_numpy().copy()
+        # spend in the update's first period belongs to the customer's first period only if
+        # that period is shared with, and is, the customer's first purchase period.
+        into_first = shared_period & (first[seen] == state["last"].to_numpy()[seen])
+        first_value[seen] += numpy.where(into_first, returning["first_value"].to_numpy(), 0.0)
+        repeat_value[seen] += returning["repeat_value"].to_numpy() + numpy.where(
+            into_first, 0.0, returning["first_value"].to_numpy()
+        )
+        merged["first_value"] = first_value
+        merged["repeat_value"] = repeat_value
+
+    return pd.concat([merged, update[is_new]])
+
+
+def _summary_data_from_period_state(
+    state,
+    observation_period_end,
+    freq_multiplier=1,
+    include_first_transaction=False,
+):
+    """
+    Turn a per-customer period state into the summary returned by ``summary_data_from_transaction_data``.
+
+    ``observation_period_end`` is an integer period ordinal.
+    """
+
+    state = state.sort_index()
+    first = state["first"].to_numpy()
+    periods = state["periods"].to_numpy()
+
+    summary = pd.DataFrame(index=state.index)
+    summary["frequency"] = periods if include_first_transaction else periods - 1
+    summary["recency"] = (state["last"].to_numpy() - first) / freq_multiplier
+    summary["T"] = (observation_period_end - first) / freq_multiplier
+
+    if "first_value" in state.columns:
+        value_sums = state["repeat_value"].to_numpy()
+        if include_first_transaction:
+            value_sums = value_sums + state["first_value"].to_numpy()
+        n_valued = summary["frequency"].to_numpy()
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            summary["monetary_value"] = numpy.where(n_valued > 0, value_sums / numpy.maximum(n_valued, 1), 0.0)
+
+    return summary.astype(float)
+
+
+def _summary_data_from_period_ordinals(
+    codes,
+    customers,
+    periods,
+    values,
+    observation_period_end,
+    freq_multiplier=1,
+    include_first_transaction=False,
+):
+    """
+    Columnar engine behind ``summary_data_from_transaction_data(engine="numpy")``.
+
+    ``observation_period_end`` is an integer period ordinal; ``codes`` index into
+    ``customers``. Frequency, recency, T and monetary value are computed with segment
+    reductions over the customer/period sorted arrays.
+    """
+
+    in_window = periods <= observation_period_end
+    if not in_window.all():
+        codes, periods = codes[in_window], periods[in_window]
+        if values is not None:
+            values = values[in_window]
+
+    return _summary_data_from_period_state(
+        _period_state(codes, customers, periods, values),
+        observation_period_end,
+        freq_multiplier=freq_multiplier,
+        include_first_transaction=include_first_transaction,
+    )
+
+
+def summary_data_from_transaction_data(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    monetary_value_col=None,
+    datetime_format=None,
+    observation_period_end=None,
+    freq="D",
+    freq_multiplier=1,
+    include_first_transaction=False,
+    engine="pandas",
+):
+    """
+    Return summary data from transactions.
+
+    This transforms a DataFrame of transaction data of the form:
+        customer_id, datetime [, monetary_value]
+    to a DataFrame of the form:
+        customer_id, frequency, recency, T [, monetary_value]
+
+    Parameters
+    ----------
+    transactions: :obj: DataFrame
+        a Pandas DataFrame that contains the customer_id col and the datetime col.
+    customer_id_col: string
+        the column in transactions DataFrame that denotes the customer_id
+    datetime_col:  string
+        the column in transactions that denotes the datetime the purchase was made.
+    monetary_value_col: string, optional
+        the columns in the transactions that denotes the monetary value of the transaction.
+        Optional, only needed for customer lifetime value estimation models.
+    observation_period_end: datetime, optional
+         a string or datetime to denote the final date of the study.
+         Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    freq_multiplier: int, optional
+        Default: 1. Useful for getting exact recency & T. Example:
+        With freq='D' and freq_multiplier=1, we get recency=591 and T=632
+        With freq='h' and freq_multiplier=24, we get recency=590.125 and T=631.375
+    include_first_transaction: bool, optional
+        Default: False
+        By default the first transaction is not included while calculating frequency and
+        monetary_value. Can be set to True to include it.
+        Should be False if you are going to use this data with any fitters in BTYD package
+    engine: string, optional
+        Default: 'pandas'. Set to 'numpy' to use the columnar engine, which factorizes
+        customer ids once, bins datetimes into integer periods and computes all statistics
+        in a single pass over the sorted arrays. Both engines return the same summary (up to
+        floating point summation order in monetary_value), but 'numpy' is considerably
+        faster and lighter on memory for large transaction logs.
+
+    Returns
+    -------
+    :obj: DataFrame:
+        customer_id, frequency, recency, T [, monetary_value]
+    """
+
+    if engine == "numpy":
+        codes, customers, periods, values = _factorize_transactions(
+            transactions, customer_id_col, datetime_col, monetary_value_col, datetime_format, freq
+        )
+        if observation_period_end is None:
+            observation_period_end = periods.max()
+        else:
+            observation_period_end = _period_ordinals([observation_period_end], freq, datetime_format)[0]
+        return _summary_data_from_period_ordinals(
+            codes,
+            customers,
+            periods,
+            values,
+            observation_period_end,
+            freq_multiplier=freq_multiplier,
+            include_first_transaction=include_first_transaction,
+        )
+    elif engine != "pandas":
+        raise ValueError("engine must be one of 'pandas' or 'numpy', got {!r}.".format(engine))
+
+    if observation_period_end is None:
+        observation_period_end = (
+            pd.to_datetime(transactions[datetime_col].max(), format=datetime_format).to_period(freq).to_timestamp()
+        )
+    else:
+        observation_period_end = (
+            pd.to_datetime(observation_period_end, format=datetime_format).to_period(freq).to_timestamp()
+        )
+
+    # label all of the repeated transactions
+    repeated_transactions = _find_first_transactions(
+        transactions, customer_id_col, datetime_col, monetary_value_col, datetime_format, observation_period_end, freq
+    )
+    # reset datetime_col to timestamp
+    repeated_transactions[datetime_col] = pd.Index(repeated_transactions[datetime_col]).to_timestamp()
+
+    # count all orders by customer.
+    customers = repeated_transactions.groupby(customer_id_col, sort=False)[datetime_col].agg(["min", "max", "count"])
+
+    if not include_first_transaction:
+        # subtract 1 from count, as we ignore their first order.
+        customers["frequency"] = customers["count"] - 1
+    else:
+        customers["frequency"] = customers["count"]
+
+    customers["T"] = (observation_period_end - customers["min"]) / np.timedelta64(1, freq) / freq_multiplier
+    customers["recency"] = (customers["max"] - customers["min"]) / np.timedelta64(1, freq) / freq_multiplier
+
+    summary_columns = ["frequency", "recency", "T"]
+
+    if monetary_value_col:
+        if not include_first_transaction:
+            # create an index of all the first purchases
+            first_purchases = repeated_transactions[repeated_transactions["first"]].index
+            # by setting the monetary_value cells of all the first purchases to NaN,
+            # those values will be excluded from the mean value calculation
+            repeated_transactions.loc[first_purchases, monetary_value_col] = np.nan
+        customers["monetary_value"] = (
+            repeated_transactions.groupby(customer_id_col)[monetary_value_col].mean().fillna(0)
+        )
+        summary_columns.append("monetary_value")
+
+    return customers[summary_columns].astype(float)
+
+
+def _iter_transaction_chunks(
+    transactions,
+    columns,
+    chunksize=1000000
+):
+    """
+    Yield DataFrame chunks with ``columns`` from a DataFrame, an iterable of DataFrames or a file path.
+
+    Paths ending in '.parquet' or '.pq' are read in record batches with pyarrow; any other
+    path is read as CSV with ``pandas.read_csv``.
+    """
+
+    if isinstance(transactions, pd.DataFrame):
+        yield transactions[columns]
+    elif isinstance(transactions, (str, os.PathLike)):
+        path = os.fspath(transactions)
+        if path.endswith((".parquet", ".pq")):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Reading transactions from a parquet file requires the pyarrow package.")
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+                yield chunk[columns]
+    else:
+        for chunk in transactions:
+            yield chunk[columns]
+
+
+def summary_data_from_transaction_chunks(
+    transactions,
+    customer_id_col,
+    datetime_col,
+    monetary_value_col=None,
+    datetime_format=None,
+    observation_period_end=None,
+    freq="D",
+    freq_multiplier=1,
+    include_first_transaction=False,
+    chunksize=1000000,
+):
+    """
+    Return summary data from transactions that are read one chunk at a time.
+
+    Streaming counterpart of ``summary_data_from_transaction_data``: only a running state
+    per customer (first and last purchase period, number of purchase periods and
+    monetary sums) is kept between chunks, so memory is bounded by the number of
+    customers rather than the number of transactions.
+
+    Chunks must be in chronological order per customer, i.e. no chunk may contain a
+    purchase of a customer in a period before that customer's last purchase period in an
+    earlier chunk. Logs that are appended to over time satisfy this naturally.
+
+    Parameters
+    ----------
+    transactions: iterable of DataFrame, DataFrame or string
+        an iterable of Pandas DataFrames, or a path to a CSV or parquet (.parquet, .pq)
+        file. Parquet files require pyarrow.
+    customer_id_col: string
+        the column in transactions DataFrame that denotes the customer_id
+    datetime_col:  string
+        the column in transactions that denotes the datetime the purchase was made.
+    monetary_value_col: string, optional
+        the columns in the transactions that denotes the monetary value of the transaction.
+        Optional, only needed for customer lifetime value estimation models.
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    observation_period_end: datetime, optional
+         a string or datetime to denote the final date of the study.
+         Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    freq_multiplier: int, optional
+        Default: 1. Useful for getting exact recency & T. Example:
+        With freq='D' and freq_multiplier=1, we get recency=591 and T=632
+        With freq='h' and freq_multiplier=24, we get recency=590.125 and T=631.375
+    include_first_transaction: bool, optional
+        Default: False
+        By default the first transaction is not included while calculating frequency and
+        monetary_value. Can be set to True to include it.
+        Should be False if you are going to use this data with any fitters in BTYD package
+    chunksize: int, optional
+        Default: 1000000. Number of rows per chunk when reading from a file path.
+
+    Returns
+    -------
+    :obj: DataFrame:
+        customer_id, frequency, recency, T [, monetary_value]
+    """
+
+    columns = [customer_id_col, datetime_col]
+    if monetary_value_col:
+        columns.append(monetary_value_col)
+
+    if observation_period_end is not None:
+        observation_period_end = _period_ordinals([observation_period_end], freq, datetime_format)[0]
+
+    state = None
+    for chunk in _iter_transaction_chunks(transactions, columns, chunksize):
+        codes, customers, periods, values = _factorize_transactions(
+            chunk, customer_id_col, datetime_col, monetary_value_col, datetime_format, freq
+        )
+        if observation_period_end is not None:
+            in_window = periods <= observation_period_end
+            codes, periods = codes[in_window], periods[in_window]
+            if values is not None:
+                values = values[in_window]
+        state = _merge_period_states(state, _period_state(codes, customers, periods, values))
+
+    if state is None or state.empty:
+        raise ValueError("There is no data available in `transactions` up to `observation_period_end`.")
+
+    if observation_period_end is None:
+        observation_period_end = state["last"].max()
+
+    return _summary_data_from_period_state(
+        state,
+        observation_period_end,
+        freq_multiplier=freq_multiplier,
+        include_first_transaction=include_first_transaction,
+    )
+
+
+def calibration_and_holdout_data_from_chunks(
     transactions,
     customer_id_col,
     datetime_col,
-    monetary_value_col=None,
-    datetime_format=None,
+    calibration_period_end,
     observation_period_end=None,
     freq="D",
+    freq_multiplier=1,
+    datetime_format=None,
+    monetary_value_col=None,
+    include_first_transaction=False,
+    chunksize=1000000,
 ):
     """
-    Return dataframe with first transactions.
+    Create a calibration and holdout summary from transactions that are read one chunk at a time.
 
-    This takes a DataFrame of transaction data of the form:
-        customer_id, datetime [, monetary_value]
-    and appends a column named 'repeated' to the transaction log which indicates which rows
-    are repeated transactions for that customer_id.
+    Streaming counterpart of ``calibration_and_holdout_data``, with the same chunk ordering
+    requirements as ``summary_data_from_transaction_chunks``. Memory is bounded by the
+    number of customers rather than the number of transactions.
 
     Parameters
     ----------
-    transactions: :obj: DataFrame
-        a Pandas DataFrame that contains the customer_id col and the datetime col.
+    transactions: iterable of DataFrame, DataFrame or string
+        an iterable of Pandas DataFrames, or a path to a CSV or parquet (.parquet, .pq)
+        file. Parquet files require pyarrow.
     customer_id_col: string
         the column in transactions DataFrame that denotes the customer_id
     datetime_col:  string
         the column in transactions that denotes the datetime the purchase was made.
-    monetary_value_col: string, optional
-        the column in transactions that denotes the monetary value of the transaction.
-        Optional, only needed for customer lifetime value estimation models.
-    observation_period_end: :obj: datetime
-        a string or datetime to denote the final date of the study.
-        Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
-    datetime_format: string, optional
-        a string that represents the timestamp format. Useful if Pandas can't understand
-        the provided format.
+    calibration_period_end: :obj: datetime
+        a period to limit the calibration to, inclusive.
+    observation_period_end: :obj: datetime, optional
+         a string or datetime to denote the final date of the study.
+         Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
     freq: string, optional
         Default: 'D' for days. Possible values listed here:
         https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
-    """
-
-    if observation_period_end is None:
-        observation_period_end = transactions[datetime_col].max()
-
-    if type(observation_period_end) == pd.Period:
-        observation_period_end = observation_period_end.to_timestamp()
+    freq_multiplier: int, optional
+        Default: 1. Useful for getting exact recency & T.
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    monetary_value_col: string, optional
+        the column in transactions that denotes the monetary value of the transaction.
+    include_first_transaction: bool, optional
+        Default: False
+        By default the first transaction is not included while calculating frequency and
+        monetary_value. Can be set to True to include it.
+    chunksize: int, optional
+        Default: 1000000. Number of rows per chunk when reading from a file path.
 
-    select_columns = [customer_id_col, datetime_col]
+    Returns
+    -------
+    :obj: DataFrame
+        A dataframe with columns frequency_cal, recency_cal, T_cal, frequency_holdout, duration_holdout
+        If monetary_value_col isn't None, the dataframe will also have the columns monetary_value_cal and
+        monetary_value_holdout.
+    """
 
+    columns = [customer_id_col, datetime_col]
     if monetary_value_col:
-        select_columns.append(monetary_value_col)
+        columns.append(monetary_value_col)
 
-    transactions = transactions[select_columns].sort_values(select_columns).copy()
+    calibration_period_end = pd.to_datetime(calibration_period_end, format=datetime_format)
+    if observation_period_end is not None:
+        observation_period_end = pd.to_datetime(observation_period_end, format=datetime_format)
+
+    calibration_state = None
+    holdout_state = None
+    holdout_values = None
+    max_datetime = None
+    for chunk in _iter_transaction_chunks(transactions, columns, chunksize):
+        chunk = chunk.copy()
+        chunk[datetime_col] = pd.to_datetime(chunk[datetime_col], format=datetime_format)
+        chunk_max = chunk[datetime_col].max()
+        max_datetime = chunk_max if max_datetime is None else max(max_datetime, chunk_max)
+
+        in_calibration = chunk[datetime_col] <= calibration_period_end
+        in_holdout = ~in_calibration
+        if observation_period_end is not None:
+            in_holdout &= chunk[datetime_col] <= observation_period_end
+
+        for mask, is_holdout in ((in_calibration, False), (in_holdout, True)):
+            codes, customers, periods, values = _factorize_transactions(
+                chunk[mask.to_numpy()], customer_id_col, datetime_col, monetary_value_col, None, freq
+            )
+            update = _period_state(codes, customers, periods, None if is_holdout else values)
+            if not is_holdout:
+                calibration_state = _merge_period_states(calibration_state, update)
+                continue
+            holdout_state = _merge_period_states(holdout_state, update)
+            if values is not None:
+                # holdout spend is averaged over transactions, not purchase periods.
+                totals = pd.DataFrame(
+                    {
+                        "value": numpy.bincount(codes, weights=values, minlength=len(customers)),
+                        "transactions": numpy.bincount(codes, minlength=len(customers)),
+                    },
+                    index=customers,
+                )
+                totals = totals[totals["transactions"] > 0]
+                holdout_values = totals if holdout_values is None else holdout_values.add(totals, fill_value=0)
 
-    # make sure the date column uses datetime objects, and use Pandas' DateTimeIndex.to_period()
-    # to convert the column to a PeriodIndex which is useful for time-wise grouping and truncating
-    transactions[datetime_col] = pd.to_datetime(transactions[datetime_col], format=datetime_format)
-    transactions = transactions.set_index(datetime_col).to_period(freq).to_timestamp()
+    if observation_period_end is None:
+        observation_period_end = max_datetime
 
-    transactions = transactions.loc[(transactions.index <= observation_period_end)].reset_index()
+    if calibration_state is None or calibration_state.empty:
+        raise ValueError("There is no data available in `transactions` up to `calibration_period_end`.")
 
-    period_groupby = transactions.groupby([datetime_col, customer_id_col], sort=False, as_index=False)
+    if holdout_state is None or holdout_state.empty:
+        raise ValueError(
+            "There is no data available. Check the `observation_period_end` and  `calibration_period_end` and confirm that values in `transactions` occur prior to those dates."
+        )
+
+    calibration_summary_data = _summary_data_from_period_state(
+        calibration_state,
+        calibration_period_end.to_period(freq).ordinal,
+        freq_multiplier=freq_multiplier,
+        include_first_transaction=include_first_transaction,
+    )
+    calibration_summary_data.columns = [c + "_cal" for c in calibration_summary_data.columns]
 
+    holdout_summary_data = pd.DataFrame({"frequency_holdout": holdout_state["periods"]})
     if monetary_value_col:
-        # when we have a monetary column, make sure to sum together any values in the same period
-        period_transactions = period_groupby.sum()
-    else:
-        # by calling head() on the groupby object, the datetime_col and customer_id_col columns
-        # will be reduced
-        period_transactions = period_groupby.head(1)
+        holdout_summary_data["monetary_value_holdout"] = holdout_values["value"] / holdout_values["transactions"]
 
-    # initialize a new column where we will indicate which are the first transactions
-    period_transactions["first"] = False
-    # find all of the initial transactions and store as an index
-    first_transactions = period_transactions.groupby(customer_id_col, sort=True, as_index=False).head(1).index
-    # mark the initial transactions as True
-    period_transactions.loc[first_transactions, "first"] = True
-    select_columns.append("first")
-    # reset datetime_col to period
-    period_transactions[datetime_col] = pd.Index(period_transactions[datetime_col]).to_period(freq)
+    combined_data = calibration_summary_data.join(holdout_summary_data, how="left")
+    combined_data.fillna(0, inplace=True)
 
-    return period_transactions[select_columns]
+    delta_time = (observation_period_end.to_period(freq) - calibration_period_end.to_period(freq)).n
+    combined_data["duration_holdout"] = delta_time / freq_multiplier
 
+    return combined_data
 
-def summary_data_from_transaction_data(
-    transactions,
-    customer_id_col,
-    datetime_col,
-    monetary_value_col=None,
-    datetime_format=None,
-    observation_period_end=None,
-    freq="D",
-    freq_multiplier=1,
-    include_first_transaction=False,
-):
+
+class RFMState(object):
     """
-    Return summary data from transactions.
+    Incrementally updatable RFM summary of a transaction log.
 
-    This transforms a DataFrame of transaction data of the form:
-        customer_id, datetime [, monetary_value]
-    to a DataFrame of the form:
-        customer_id, frequency, recency, T [, monetary_value]
+    Keeps the per-customer quantities that ``summary_data_from_transaction_data`` is built
+    from (first and last purchase period, number of distinct purchase periods and
+    monetary sums), so new batches of transactions can be folded in without reprocessing
+    the full history. An update costs O(new transactions + customers).
+
+    Batches must be passed in chronological order per customer, as described in
+    ``summary_data_from_transaction_chunks``.
 
     Parameters
     ----------
-    transactions: :obj: DataFrame
-        a Pandas DataFrame that contains the customer_id col and the datetime col.
     customer_id_col: string
         the column in transactions DataFrame that denotes the customer_id
     datetime_col:  string
         the column in transactions that denotes the datetime the purchase was made.
     monetary_value_col: string, optional
         the columns in the transactions that denotes the monetary value of the transaction.
-        Optional, only needed for customer lifetime value estimation models.
-    observation_period_end: datetime, optional
-         a string or datetime to denote the final date of the study.
-         Events after this date are truncated. If not given, defaults to the max 'datetime_col'.
     datetime_format: string, optional
         a string that represents the timestamp format. Useful if Pandas can't understand
         the provided format.
@@ -270,64 +1269,196 @@ def summary_data_from_transaction_data(
         Default: 'D' for days. Possible values listed here:
         https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
     freq_multiplier: int, optional
-        Default: 1. Useful for getting exact recency & T. Example:
-        With freq='D' and freq_multiplier=1, we get recency=591 and T=632
-        With freq='h' and freq_multiplier=24, we get recency=590.125 and T=631.375
+        Default: 1. Useful for getting exact recency & T.
     include_first_transaction: bool, optional
-        Default: False
-        By default the first transaction is not included while calculating frequency and
-        monetary_value. Can be set to True to include it.
-        Should be False if you are going to use this data with any fitters in BTYD package
+        Default: False. Whether to include the first transaction in frequency and
+        monetary_value.
 
-    Returns
-    -------
-    :obj: DataFrame:
-        customer_id, frequency, recency, T [, monetary_value]
+    Attributes
+    ----------
+    state: :obj: DataFrame
+        per-customer running state, indexed by customer id.
+    observation_period_end: :obj: Period
+        end of the observation period used for T. Defaults to the latest purchase period
+        seen, and can be moved forward with ``advance_to``.
+
+    Examples
+    --------
+    >>> rfm = RFMState("id", "date").update(history)
+    >>> rfm.update(todays_transactions).advance_to("2015-02-07").to_frame()
     """
 
-    if observation_period_end is None:
-        observation_period_end = (
-            pd.to_datetime(transactions[datetime_col].max(), format=datetime_format).to_period(freq).to_timestamp()
+    def __init__(
+        self,
+        customer_id_col,
+        datetime_col,
+        monetary_value_col=None,
+        datetime_format=None,
+        freq="D",
+        freq_multiplier=1,
+        include_first_transaction=False,
+    ):
+        self.customer_id_col = customer_id_col
+        self.datetime_col = datetime_col
+        self.monetary_value_col = monetary_value_col
+        self.datetime_format = datetime_format
+        self.freq = freq
+        self.freq_multiplier = freq_multiplier
+        self.include_first_transaction = include_first_transaction
+        self.state = None
+        self._observation_period_end = None
+
+    def __repr__(self):
+        """Representation of RFM state."""
+        n_customers = 0 if self.state is None else self.state.shape[0]
+        return "<btyd.RFMState: {:d} customers, observation_period_end: {}>".format(
+            n_customers, self.observation_period_end
         )
-    else:
-        observation_period_end = (
-            pd.to_datetime(observation_period_end, format=datetime_format).to_period(freq).to_timestamp()
+
+    @property
+    def observation_period_end(self):
+        if self._observation_period_end is None:
+            return None
+        return pd.Period(ordinal=self._observation_period_end, freq=self.freq)
+
+    def update(self, transactions, chunksize=1000000):
+        """
+        Fold a new batch of transactions into the state.
+
+        The observation period is extended to the latest purchase period if the batch
+        contains later purchases.
+
+        Parameters
+        ----------
+        transactions: DataFrame, iterable of DataFrame or string
+            new transactions, as a DataFrame, an iterable of DataFrame chunks or a path to a
+            CSV or parquet file.
+        chunksize: int, optional
+            Default: 1000000. Number of rows per chunk when reading from a file path.
+
+        Returns
+        -------
+        self
+        """
+
+        columns = [self.customer_id_col, self.datetime_col]
+        if self.monetary_value_col:
+            columns.append(self.monetary_value_col)
+
+        for chunk in _iter_transaction_chunks(transactions, columns, chunksize):
+            codes, customers, periods, values = _factorize_transactions(
+                chunk, self.customer_id_col, self.datetime_col, self.monetary_value_col, self.datetime_format, self.freq
+            )
+            self.state = _merge_period_states(self.state, _period_state(codes, customers, periods, values))
+
+        if self.state is not None and not self.state.empty:
+            latest = self.state["last"].max()
+            if self._observation_period_end is None or latest > self._observation_period_end:
+                self._observation_period_end = latest
+
+        return self
+
+    def advance_to(self, observation_period_end):
+        """
+        Move the end of the observation period forward.
+
+        Parameters
+        ----------
+        observation_period_end: datetime
+            a string or datetime to denote the new final date of the study.
+
+        Returns
+        -------
+        self
+        """
+
+        ordinal = _period_ordinals([observation_period_end], self.freq, self.datetime_format)[0]
+        if self._observation_period_end is not None and ordinal < self._observation_period_end:
+            raise ValueError(
+                "observation_period_end can only be moved forward: {} is before {}.".format(
+                    observation_period_end, self.observation_period_end
+                )
+            )
+        self._observation_period_end = ordinal
+        return self
+
+    def merge(self, other):
+        """
+        Merge the state of a later, non-overlapping range of transactions into this one.
+
+        Parameters
+        ----------
+        other: RFMState
+            state built with the same settings from transactions that follow the ones
+            summarized by this state.
+
+        Returns
+        -------
+        self
+        """
+
+        settings = ("monetary_value_col", "freq", "freq_multiplier", "include_first_transaction")
+        if any(getattr(self, attr) != getattr(other, attr) for attr in settings):
+            raise ValueError("Only RFMState objects with the same settings can be merged.")
+
+        self.state = _merge_period_states(self.state, other.state)
+        ends = [end for end in (self._observation_period_end, other._observation_period_end) if end is not None]
+        self._observation_period_end = max(ends) if ends else None
+        return self
+
+    def to_frame(self):
+        """
+        Return the current summary.
+
+        Returns
+        -------
+        :obj: DataFrame:
+            customer_id, frequency, recency, T [, monetary_value], as returned by
+            ``summary_data_from_transaction_data``.
+        """
+
+        if self.state is None or self.state.empty:
+            raise ValueError("No transactions have been added to the RFM state yet.")
+
+        summary = _summary_data_from_period_state(
+            self.state,
+            self._observation_period_end,
+            freq_multiplier=self.freq_multiplier,
+            include_first_transaction=self.include_first_transaction,
         )
+        summary.index.name = self.customer_id_col
+        return summary
 
-    # label all of the repeated transactions
-    repeated_transactions = _find_first_transactions(
-        transactions, customer_id_col, datetime_col, monetary_value_col, datetime_format, observation_period_end, freq
-    )
-    # reset datetime_col to timestamp
-    repeated_transactions[datetime_col] = pd.Index(repeated_transactions[datetime_col]).to_timestamp()
+    def save(self, path):
+        """
+        Save the state with dill.
 
-    # count all orders by customer.
-    customers = repeated_transactions.groupby(customer_id_col, sort=False)[datetime_col].agg(["min", "max", "count"])
+        Parameters
+        ----------
+        path: str
+            Path where to save the state.
+        """
 
-    if not include_first_transaction:
-        # subtract 1 from count, as we ignore their first order.
-        customers["frequency"] = customers["count"] - 1
-    else:
-        customers["frequency"] = customers["count"]
+        with open(path, "wb") as out_file:
+            dill.dump(self, out_file)
 
-    customers["T"] = (observation_period_end - customers["min"]) / np.timedelta64(1, freq) / freq_multiplier
-    customers["recency"] = (customers["max"] - customers["min"]) / np.timedelta64(1, freq) / freq_multiplier
+    def load(self, path):
+        """
+        Load a state saved with ``save``.
 
-    summary_columns = ["frequency", "recency", "T"]
+        Parameters
+        ----------
+        path: str
+            Path of the saved state.
 
-    if monetary_value_col:
-        if not include_first_transaction:
-            # create an index of all the first purchases
-            first_purchases = repeated_transactions[repeated_transactions["first"]].index
-            # by setting the monetary_value cells of all the first purchases to NaN,
-            # those values will be excluded from the mean value calculation
-            repeated_transactions.loc[first_purchases, monetary_value_col] = np.nan
-        customers["monetary_value"] = (
-            repeated_transactions.groupby(customer_id_col)[monetary_value_col].mean().fillna(0)
-        )
-        summary_columns.append("monetary_value")
+        Returns
+        -------
+        self
+        """
 
-    return customers[summary_columns].astype(float)
+        with open(path, "rb") as in_file:
+            self.__dict__.update(dill.load(in_file).__dict__)
+        return self
 
 
 def calculate_alive_path(
@@ -373,21 +1504,183 @@ def calculate_alive_path(
     purchase_history = customer_history.resample(freq).sum().replace(np.nan, 0)["transactions"].values
 
     extra_columns = t + 1 - len(purchase_history)
-    customer_history = pd.DataFrame(np.append(purchase_history, [0] * extra_columns), columns=["transactions"])
-    # add T column
-    customer_history["T"] = np.arange(customer_history.shape[0])
-    # add cumulative transactions column
-    customer_history["transactions"] = customer_history["transactions"].apply(lambda t: int(t > 0))
-    customer_history["frequency"] = customer_history["transactions"].cumsum() - 1  # first purchase is ignored
-    # Add t_x column
-    customer_history["recency"] = customer_history.apply(
-        lambda row: row["T"] if row["transactions"] != 0 else np.nan, axis=1
+    purchased = numpy.append(purchase_history, [0] * extra_columns) > 0
+    frequency, recency, T = _alive_path_trajectories(purchased[numpy.newaxis, :])
+
+    return pd.Series(numpy.ravel(model.conditional_probability_alive(frequency[0], recency[0], T[0])))
+
+
+def calculate_alive_paths(
+    model,
+    transactions,
+    customer_id_col,
+    datetime_col,
+    t,
+    freq="D",
+    datetime_format=None,
+    chunksize=100000,
+):
+    """
+    Calculate the alive paths of every customer in a transaction log.
+
+    Batched version of ``calculate_alive_path``: the frequency, recency and T trajectories
+    are built for all customers at once as (customers x periods) arrays, and the model's
+    ``conditional_probability_alive()`` is called once per chunk of customers.
+
+    Parameters
+    ----------
+    model:
+        A fitted BTYD model
+    transactions: DataFrame
+        a Pandas DataFrame that contains the customer_id col and the datetime col.
+    customer_id_col: string
+        the column in transactions DataFrame that denotes the customer_id
+    datetime_col: string
+        the column in the transactions that denotes the datetime the purchase was made
+    t: int
+        the number of time units since the birth for which we want to draw the p_alive
+    freq: string, optional
+        Default: 'D' for days. Possible values listed here:
+        https://numpy.org/devdocs/reference/arrays.datetime.html#datetime-units
+    datetime_format: string, optional
+        a string that represents the timestamp format. Useful if Pandas can't understand
+        the provided format.
+    chunksize: int, optional
+        number of customers evaluated per model call, bounding memory to
+        ``chunksize * (t + 1)`` values.
+
+    Returns
+    -------
+    :obj: DataFrame
+        A dataframe indexed by customer_id with one column per time unit since the
+        customer's first purchase (0 to t), holding p_alive.
+    """
+
+    codes, customers, periods, _ = _factorize_transactions(
+        transactions, customer_id_col, datetime_col, datetime_format=datetime_format, freq=freq
+    )
+    period_codes, period_ordinals, _, customer_starts = _customer_period_segments(codes, periods)
+
+    segment_lengths = numpy.diff(numpy.append(customer_starts, period_codes.shape[0]))
+    rows = numpy.repeat(numpy.arange(customer_starts.shape[0]), segment_lengths)
+    ages = period_ordinals - numpy.repeat(period_ordinals[customer_starts], segment_lengths)
+    rows, ages = rows[ages <= t], ages[ages <= t]
+
+    n_customers = customer_starts.shape[0]
+    paths = numpy.empty((n_customers, t + 1))
+    for start in range(0, n_customers, chunksize):
+        stop = min(start + chunksize, n_customers)
+        # rows are sorted by customer, so each chunk's rows are a contiguous slice.
+        lo, hi = numpy.searchsorted(rows, [start, stop])
+        purchased = numpy.zeros((stop - start, t + 1), dtype=bool)
+        purchased[rows[lo:hi] - start, ages[lo:hi]] = True
+
+        frequency, recency, T = _alive_path_trajectories(purchased)
+        p_alive = model.conditional_probability_alive(frequency.ravel(), recency.ravel(), T.ravel())
+        paths[start:stop] = numpy.reshape(p_alive, purchased.shape)
+
+    return pd.DataFrame(
+        paths,
+        index=customers.take(period_codes[customer_starts]),
+        columns=pd.RangeIndex(t + 1, name="T"),
     )
-    customer_history["recency"] = customer_history["recency"].fillna(method="ffill").fillna(0)
 
-    return customer_history.apply(
-        lambda row: model.conditional_probability_alive(row["frequency"], row["recency"], row["T"]), axis=1
+
+def _alive_path_trajectories(purchased):
+    """
+    Frequency, recency and T after each period for a (customers x periods) purchase indicator.
+
+    Column 0 is each customer's first purchase period, which is not counted in frequency.
+    """
+
+    T = numpy.broadcast_to(numpy.arange(purchased.shape[1], dtype=float), purchased.shape)
+    frequency = numpy.cumsum(purchased, axis=1) - 1.0
+    recency = numpy.maximum.accumulate(numpy.where(purchased, T, 0.0), axis=1)
+    return frequency, recency, T
+
+
+def frequency_recency_matrix(
+    model,
+    T=1,
+    max_frequency=None,
+    max_recency=None
+):
+    """
+    Compute the expected number of purchases in the next T units of time by frequency and recency.
+
+    The model's ``conditional_expected_number_of_purchases_up_to_time()`` is evaluated once on
+    the broadcast (recency, frequency) grid. Results are cached per model class, fitted
+    parameters, T and grid size, so repeated calls for the same fitted model are free. The
+    cache holds at most ``_FREQUENCY_RECENCY_MATRIX_CACHE_BYTES`` of matrices, evicting the
+    least recently used, and is emptied by ``clear_frequency_recency_matrix_cache()``.
+
+    Parameters
+    ----------
+    model:
+        A fitted BTYD model.
+    T: float or array_like, optional
+        Next units of time to make predictions for. An array must broadcast against the
+        (max_recency + 1, max_frequency + 1) grid.
+    max_frequency: int, optional
+        The maximum frequency of the grid. Default is max observed frequency.
+    max_recency: int, optional
+        The maximum recency of the grid. This also determines the age of the customer.
+        Default to max observed age.
+
+    Returns
+    -------
+    array:
+        A read-only matrix of the form [t_x: historical recency, x: historical frequency]
+    """
+
+    if max_frequency is None:
+        max_frequency = int(model.data["frequency"].max())
+
+    if max_recency is None:
+        max_recency = int(model.data["T"].max())
+
+    T_array = numpy.asarray(T, dtype=float)
+    key = (
+        type(model).__name__,
+        tuple(model.params_.index),
+        tuple(model.params_.values),
+        T_array.shape,
+        T_array.tobytes(),
+        max_frequency,
+        max_recency,
     )
+    if key in _FREQUENCY_RECENCY_MATRIX_CACHE:
+        _FREQUENCY_RECENCY_MATRIX_CACHE.move_to_end(key)
+        return _FREQUENCY_RECENCY_MATRIX_CACHE[key]
+
+    frequency = numpy.arange(max_frequency + 1)[numpy.newaxis, :]
+    recency = numpy.arange(max_recency + 1)[:, numpy.newaxis]
+    Z = numpy.array(
+        numpy.broadcast_to(
+            model.conditional_expected_number_of_purchases_up_to_time(T, frequency, recency, max_recency),
+            (max_recency + 1, max_frequency + 1),
+        ),
+        dtype=float,
+    )
+    Z.setflags(write=False)
+
+    _FREQUENCY_RECENCY_MATRIX_CACHE[key] = Z
+    cached_bytes = sum(cached.nbytes for cached in _FREQUENCY_RECENCY_MATRIX_CACHE.values())
+    while cached_bytes > _FREQUENCY_RECENCY_MATRIX_CACHE_BYTES:
+        cached_bytes -= _FREQUENCY_RECENCY_MATRIX_CACHE.popitem(last=False)[1].nbytes
+    return Z
+
+
+def clear_frequency_recency_matrix_cache():
+    """
+    Drop every matrix cached by ``frequency_recency_matrix``.
+    """
+
+    _FREQUENCY_RECENCY_MATRIX_CACHE.clear()
+
+
+_FREQUENCY_RECENCY_MATRIX_CACHE = OrderedDict()
+_FREQUENCY_RECENCY_MATRIX_CACHE_BYTES = 64 * 2**20
 
 
 def _scale_time(
@@ -400,6 +1693,27 @@ def _scale_time(
     return 1.0 / age.max()
 
 
+def _log_hyp2f1(a, b, c, z):
+    """
+    Log of the Gauss hypergeometric function 2F1(a, b; c; z) for z in [0, 1).
+
+    2F1 is evaluated once. Only the elements where it overflowed (its log is not finite)
+    are recomputed with the Euler transformation
+    2F1(a, b; c; z) = (1 - z)^(c - a - b) 2F1(c - a, c - b; c; z), in log space.
+    """
+
+    a, b, c, z = numpy.broadcast_arrays(*(numpy.asarray(arg, dtype=float) for arg in (a, b, c, z)))
+    shape = a.shape
+    a, b, c, z = (numpy.atleast_1d(arg) for arg in (a, b, c, z))
+    with numpy.errstate(divide="ignore"):
+        log_hyp = numpy.log(hyp2f1(a, b, c, z))
+    overflow = ~numpy.isfinite(log_hyp)
+    if overflow.any():
+        a, b, c, z = a[overflow], b[overflow], c[overflow], z[overflow]
+        log_hyp[overflow] = numpy.log(hyp2f1(c - a, c - b, c, z)) + (c - a - b) * numpy.log1p(-z)
+    return log_hyp.reshape(shape)
+
+
 def _check_inputs(
     frequency,
     recency=None,
@@ -457,14 +1771,17 @@ def _customer_lifetime_value(
     monetary_value,
     time=12,
     discount_rate=0.01,
-    freq="D"
+    freq="D",
+    chunksize=None
 ):
     """
     Compute the average lifetime value for a group of one or more customers.
 
     This method computes the average lifetime value for a group of one or more customers.
 
-    It also applies Discounted Cash Flow.
+    It also applies Discounted Cash Flow. The cumulative expected purchases of a chunk of
+    customers are predicted for every month at once, differenced into monthly purchases and
+    discounted with a single matrix product.
 
     Parameters
     ----------
@@ -480,8 +1797,14 @@ def _customer_lifetime_value(
         the monetary value vector of customer's purchases (denoted m in literature).
     time: int, optional
         the lifetime expected for the user in months. Default: 12
-    discount_rate: float, optional
-        the monthly adjusted discount rate. Default: 1
+    discount_rate: float or array_like, optional
+        the monthly adjusted discount rate. An array of one rate per month gives an arbitrary
+        discount schedule, compounded month over month. Default: 0.01
+    freq: string, optional
+        {"D", "H", "M", "W"} for day, hour, month, week. This represents what unit of time your T is measure in.
+    chunksize: int, optional
+        number of customers evaluated at a time, to bound the memory of the
+        (months x customers) arrays. Default is all customers at once.
 
     Returns
     -------
@@ -489,21 +1812,30 @@ def _customer_lifetime_value(
         series with customer ids as index and the estimated customer lifetime values as values
     """
 
-    df = pd.DataFrame(index=range(len(frequency)))
-    df["clv"] = 0  # initialize the clv column to zeros
+    frequency, recency, T, monetary_value = (
+        numpy.asarray(column, dtype=float) for column in (frequency, recency, T, monetary_value)
+    )
+    n_customers = len(frequency)
+    chunksize = chunksize or max(n_customers, 1)
 
-    steps = np.arange(1, time + 1)
+    steps = numpy.arange(1, time + 1)
     factor = {"W": 4.345, "M": 1.0, "D": 30, "H": 30 * 24}[freq]
 
-    for i in steps * factor:
-        # since the prediction of number of transactions is cumulative, we have to subtract off the previous periods
-        expected_number_of_transactions = transaction_prediction_model.predict(
-            i, frequency, recency, T
-        ) - transaction_prediction_model.predict(i - factor, frequency, recency, T)
-        # sum up the CLV estimates of all of the periods and apply discounted cash flow
-        df["clv"] += (monetary_value * expected_number_of_transactions) / (1 + discount_rate) ** (i / factor)
+    # since the prediction of number of transactions is cumulative, the curve is evaluated
+    # from 0 and differenced to get the transactions of each month
+    horizons = numpy.append(0, steps * factor)[:, None]
+    discount_rate = numpy.broadcast_to(discount_rate, steps.shape)
+    discount = numpy.cumprod(1.0 / (1.0 + discount_rate))
+
+    clv = numpy.zeros(n_customers)
+    for start in range(0, n_customers, chunksize):
+        rows = slice(start, start + chunksize)
+        expected_number_of_transactions = numpy.diff(
+            transaction_prediction_model.predict(horizons, frequency[rows], recency[rows], T[rows]), axis=0
+        )
+        clv[rows] = monetary_value[rows] * (discount @ expected_number_of_transactions)
 
-    return df["clv"] # return as a series
+    return pd.Series(clv, name="clv")
 
 
 def expected_cumulative_transactions(
@@ -592,41 +1924,25 @@ def expected_cumulative_transactions(
     date_range = pd.date_range(start_date, periods=t + 1, freq=freq)
     date_periods = date_range.to_period(freq)
 
-    pred_cum_transactions = []
-
-    # First Transactions on Each Day/Freq
+    # First Transactions on Each Day/Freq, as cohort sizes by periods since the start
     first_trans_size = first_transactions.groupby(datetime_col).size()
-
-    # In the loop below, we calculate the expected number of purchases for the
-    # customers who have made their first purchases on a date before the one being
-    # evaluated.
-    # Then we sum them to get the cumulative sum up to the specific period.
-    for i, period in enumerate(date_periods): # index of period and its date
-
-        if i % freq_multiplier == 0 and i > 0:
-
-            # Periods before the one being evaluated
-            times = np.array([d.n for d in period - first_trans_size.index])
-            times = times[times > 0].astype(float) / freq_multiplier
-
-            # Array of different expected number of purchases for different times
-            expected_trans_agg = model.expected_number_of_purchases_up_to_time(times)
-
-            # Mask for the number of customers with 1st transactions up to the period
-            mask = first_trans_size.index < period
-
-            # ``expected_trans`` is a float with the cumulative sum of expected transactions
-            expected_trans = sum(expected_trans_agg * first_trans_size[mask])
-
-            pred_cum_transactions.append(expected_trans)
+    cohort_offsets = pd.PeriodIndex(first_trans_size.index).asi8 - start_period.ordinal
+    cohort_sizes = numpy.bincount(cohort_offsets, weights=first_trans_size.values, minlength=t + 1)[: t + 1]
+
+    # The expected cumulative purchases at period i are
+    #     sum over cohorts d < i of size[d] * E[N((i - d) / freq_multiplier)],
+    # i.e. the convolution of the cohort sizes with the expected-purchases curve
+    # evaluated once on the grid of period lags.
+    expected_purchases = numpy.zeros(t + 1)
+    expected_purchases[1:] = model.expected_number_of_purchases_up_to_time(
+        numpy.arange(1, t + 1, dtype=float) / freq_multiplier
+    )
+    evaluated_periods = numpy.arange(1, t // freq_multiplier + 1) * freq_multiplier
+    pred_cum_transactions = convolve(cohort_sizes, expected_purchases)[evaluated_periods]
 
     act_trans = repeated_transactions.groupby(datetime_col).size()
     act_tracking_transactions = act_trans.reindex(date_periods, fill_value=0)
-
-    act_cum_transactions = []
-    for j in range(1, t // freq_multiplier + 1):
-        sum_trans = sum(act_tracking_transactions.iloc[: j * freq_multiplier])
-        act_cum_transactions.append(sum_trans)
+    act_cum_transactions = numpy.cumsum(act_tracking_transactions.values)[evaluated_periods - 1]
 
     if set_index_date:
         index = date_periods[freq_multiplier - 1 : -1 : freq_multiplier]
@@ -111,6 +111,27 @@ class TestBetaGeoModel:
         expected = '[BetaGeoModel::alpha, BetaGeoModel::r, BetaGeoModel::phi, BetaGeoModel::kappa, BetaGeoModel::a, BetaGeoModel::b]'
         assert str(model.unobserved_RVs) == expected
     
+    def test_compressed_log_likelihood(self, cdnow_customers):
+        """
+        GIVEN an RFM dataframe with repeated (frequency, recency, T) rows,
+        WHEN the BetaGeoModel log-likelihood is built from weighted patterns instead of individual customers,
+        THEN there should be fewer rows and the model log-probability should be unchanged.
+        """
+
+        bgm = btyd.BetaGeoModel()
+        bgm._frequency, bgm._recency, bgm._T, _, _ = bgm._dataframe_parser(cdnow_customers)
+
+        bgm._compress_rfm(compress=False)
+        full_model = bgm._model()
+        point = full_model.initial_point()
+        full_logp = full_model.compile_logp()(point)
+
+        bgm._compress_rfm(compress=True)
+        frequency, _, _, weights = bgm._patterns
+        assert len(frequency) < len(cdnow_customers)
+        assert weights.sum() == len(cdnow_customers)
+        np.testing.assert_allclose(bgm._model().compile_logp()(point), full_logp)
+
     def test_fit(self,fitted_bgm):
         """
         GIVEN a BetaGeoModel() object,
@@ -127,6 +148,97 @@ class TestBetaGeoModel:
             )
         assert isinstance(summary,pd.DataFrame)
     
+    def test_fit_sampling_stats(self, fitted_bgm):
+        """
+        GIVEN a fitted BetaGeoModel,
+        WHEN its sampling statistics are checked,
+        THEN the backend, chain count, wall-clock time and effective samples per second should be reported.
+        """
+
+        stats = fitted_bgm._sampling_stats
+        assert stats["method"] == "nuts"
+        assert stats["chains"] == 4
+        assert stats["wall_time"] > 0
+        assert stats["ess_per_second"] == pytest.approx(stats["min_ess"] / stats["wall_time"])
+
+    def test_fit_advi(self, cdnow_customers):
+        """
+        GIVEN an RFM dataframe,
+        WHEN a BetaGeoModel is fitted with the ADVI variational backend,
+        THEN the requested number of posterior draws should be returned with parameters close to the MLE.
+        """
+
+        bgm = btyd.BetaGeoModel().fit(cdnow_customers, draws=500, method="advi", random_seed=42, n=20000, progressbar=False)
+
+        assert bgm._sampling_stats["method"] == "advi"
+        assert bgm._idata.posterior.dims["draw"] == 500
+        np.testing.assert_allclose(bgm._unload_params(), [4.414, 0.243, 0.793, 2.426], rtol=0.2)
+
+    def test_fit_minibatch_advi(self, cdnow_customers):
+        """
+        GIVEN an RFM dataframe,
+        WHEN a BetaGeoModel is fitted with mini-batch ADVI over a subset of RFM patterns per iteration,
+        THEN the model log-likelihood should be built on minibatches and parameters should be close to the MLE.
+        """
+
+        bgm = btyd.BetaGeoModel().fit(
+            cdnow_customers, draws=500, method="minibatch_advi", batch_size=200, random_seed=42, n=20000, progressbar=False
+        )
+
+        frequency, _, _, weights = bgm._likelihood_data()
+        assert frequency.eval().shape == (200,)
+        assert bgm._idata.posterior.dims["draw"] == 500
+        np.testing.assert_allclose(bgm._unload_params(), [4.414, 0.243, 0.793, 2.426], rtol=0.2)
+
+    def test_refit_after_minibatch_advi(self, cdnow_customers):
+        """
+        GIVEN a BetaGeoModel fitted with mini-batch ADVI,
+        WHEN it is refitted on the same instance with a full-data method, or a refit fails,
+        THEN the model log-likelihood should no longer be built on minibatches.
+        """
+
+        bgm = btyd.BetaGeoModel().fit(
+            cdnow_customers, draws=50, method="minibatch_advi", batch_size=200, random_seed=42, n=100, progressbar=False
+        )
+        with pytest.raises(ValueError, match="method must be one of"):
+            bgm.fit(cdnow_customers, method="gibbs")
+        assert bgm._batch_size is None
+
+        bgm.fit(cdnow_customers, method="minibatch_advi", batch_size=200, draws=50, random_seed=42, n=100, progressbar=False)
+        bgm.fit(cdnow_customers, method="map", laplace=False, random_seed=42, progressbar=False)
+        frequency, _, _, _ = bgm._likelihood_data()
+        assert frequency.shape == (len(bgm._patterns[0]),)
+
+    def test_fit_map(self, cdnow_customers):
+        """
+        GIVEN an RFM dataframe,
+        WHEN a BetaGeoModel is fitted by MAP estimation with and without a Laplace approximation,
+        THEN the posterior should hold the mode or the requested number of draws around it, in the usual layout.
+        """
+
+        point_bgm = btyd.BetaGeoModel().fit(cdnow_customers, method="map", laplace=False, random_seed=42, progressbar=False)
+        assert point_bgm._idata.posterior.dims["draw"] == 1
+        np.testing.assert_allclose(point_bgm._unload_params(), [4.414, 0.243, 0.793, 2.426], rtol=0.2)
+
+        laplace_bgm = btyd.BetaGeoModel().fit(cdnow_customers, method="map", draws=2000, random_seed=42, progressbar=False)
+        assert laplace_bgm._idata.posterior.dims["draw"] == 2000
+        assert set(point_bgm._idata.posterior.data_vars) == set(laplace_bgm._idata.posterior.data_vars)
+        np.testing.assert_allclose(laplace_bgm._unload_params(), point_bgm._unload_params(), rtol=0.1)
+
+        alpha_draws = laplace_bgm._unload_params(posterior=True, n_samples=200)[0]
+        assert alpha_draws.shape == (200,)
+        assert alpha_draws.std() > 0
+
+    def test_fit_invalid_method(self, cdnow_customers):
+        """
+        GIVEN an RFM dataframe,
+        WHEN a BetaGeoModel is fitted with an unknown backend,
+        THEN a ValueError should be raised.
+        """
+
+        with pytest.raises(ValueError, match="method must be one of"):
+            btyd.BetaGeoModel().fit(cdnow_customers, method="gibbs")
+
     def test_unload_params(self, fitted_bgm):
         """
         GIVEN a Bayesian BetaGeoModel fitted on the CDNOW dataset,
@@ -150,6 +262,40 @@ class TestBetaGeoModel:
         assert sampled_posterior_params[0].shape == (100,)
 
 
+    def test_unload_params_cache(self, fitted_bgm):
+        """
+        GIVEN a fitted BetaGeoModel,
+        WHEN its parameters are unloaded repeatedly and its InferenceData is then reassigned,
+        THEN cached arrays should be reused, seeded subsamples should be reproducible, and the cache should be cleared.
+        """
+
+        assert fitted_bgm._unload_params() is fitted_bgm._unload_params()
+
+        seeded = fitted_bgm._unload_params(posterior=True, n_samples=50, random_seed=1)
+        assert seeded is fitted_bgm._unload_params(posterior=True, n_samples=50, random_seed=1)
+        assert not seeded[0].flags.writeable
+
+        unseeded = fitted_bgm._unload_params(posterior=True, n_samples=50)
+        assert unseeded is not fitted_bgm._unload_params(posterior=True, n_samples=50)
+
+        # Only the latest seeded subsample is kept, so fresh seeds do not grow the cache.
+        cache_size = len(fitted_bgm._param_cache)
+        for seed in range(2, 7):
+            fitted_bgm._unload_params(posterior=True, n_samples=50, random_seed=seed)
+        fitted_bgm.predict_summary("cond_prob_alive", posterior_draws=20)
+        assert len(fitted_bgm._param_cache) == cache_size
+
+        # The same draws are taken for every parameter.
+        posterior = fitted_bgm._idata.posterior
+        alpha_draws = posterior["BetaGeoModel::alpha"].values.ravel()
+        r_draws = posterior["BetaGeoModel::r"].values.ravel()
+        draw_idx = [np.flatnonzero(alpha_draws == alpha)[0] for alpha in seeded[0]]
+        np.testing.assert_array_equal(r_draws[draw_idx], seeded[1])
+
+        fitted_bgm._idata = fitted_bgm._idata
+        assert fitted_bgm._param_cache == {}
+        np.testing.assert_array_equal(seeded[0], fitted_bgm._unload_params(posterior=True, n_samples=50, random_seed=1)[0])
+
     def test_conditional_expected_number_of_purchases_up_to_time(self, fitted_bgm):
         """
         GIVEN a Bayesian BetaGeoModel fitted on the CDNOW dataset,
@@ -166,6 +312,21 @@ class TestBetaGeoModel:
         actual = fitted_bgm._conditional_expected_number_of_purchases_up_to_time(t)
         np.testing.assert_allclose(expected, actual,rtol=1e-02)
 
+    def test_conditional_expected_number_of_purchases_up_to_time_overflow(self, fitted_bgm):
+        """
+        GIVEN a Bayesian BetaGeoModel fitted on the CDNOW dataset,
+        WHEN self._conditional_expected_number_of_purchases_up_to_time() is called with scalars for which hyp2f1 overflows,
+        THEN it should return a finite scalar equal to the prediction for the same customer given as an array.
+        """
+
+        actual = fitted_bgm._conditional_expected_number_of_purchases_up_to_time(100, None, False, 20, 1000, 38., 39.)
+        expected = fitted_bgm._conditional_expected_number_of_purchases_up_to_time(
+            100, None, False, 20, np.array([1000]), np.array([38.]), np.array([39.])
+        )
+        assert np.ndim(actual) == 0
+        assert np.isfinite(actual)
+        np.testing.assert_allclose(actual, expected[0])
+
     def test_expected_number_of_purchases_up_to_time(self, fitted_bgm):
         """
         GIVEN a Bayesian BetaGeoModel fitted on the CDNOW dataset,
@@ -191,6 +352,94 @@ class TestBetaGeoModel:
                     assert 0 <= fitted_bgm._conditional_probability_alive(None, None, False, 100, i, j, k) <= 1.0
         assert fitted_bgm._conditional_probability_alive(None, None, False, 100, 0, 1, 1) == 1.0
 
+    def test_posterior_predictions_by_customer(self, fitted_bgm, cdnow_customers):
+        """
+        GIVEN a fitted BetaGeoModel and arrays of customer RFM data,
+        WHEN conditional quantities of interest are computed over posterior draws,
+        THEN they should return a (draws x customers) array whose rows match predictions for each drawn parameter set.
+        """
+
+        frequency, recency, T, _, _ = fitted_bgm._dataframe_parser(cdnow_customers)
+        draws = 30
+
+        p_alive = fitted_bgm._conditional_probability_alive(None, None, True, draws, frequency, recency, T, random_seed=7)
+        purchases = fitted_bgm._conditional_expected_number_of_purchases_up_to_time(
+            10, None, True, draws, frequency, recency, T, random_seed=7
+        )
+        assert p_alive.shape == purchases.shape == (draws, len(frequency))
+
+        alpha, r, a, b = fitted_bgm._unload_params(posterior=True, n_samples=draws, random_seed=7)
+        point_bgm = btyd.BetaGeoModel()
+        point_bgm._idata = az.from_dict(
+            posterior={f"BetaGeoModel::{name}": np.array([[value[3]]]) for name, value in zip(fitted_bgm._param_list, (alpha, r, a, b))}
+        )
+        np.testing.assert_allclose(p_alive[3], point_bgm._conditional_probability_alive(None, None, False, 100, frequency, recency, T))
+
+    def test_posterior_predictions_over_a_grid_of_t(self, fitted_bgm, cdnow_customers):
+        """
+        GIVEN a fitted BetaGeoModel and arrays of customer RFM data,
+        WHEN the conditional expected number of purchases is computed over posterior draws and a grid of t,
+        THEN it should return a (draws x horizons x customers) array whose slices match predictions for each t.
+        """
+
+        frequency, recency, T, _, _ = fitted_bgm._dataframe_parser(cdnow_customers)
+        t = np.array([1., 13., 52.])
+        draws = 20
+
+        actual = fitted_bgm._conditional_expected_number_of_purchases_up_to_time(
+            t[:, None], None, True, draws, frequency, recency, T, random_seed=7
+        )
+        assert actual.shape == (draws, len(t), len(frequency))
+        for i, t_ in enumerate(t):
+            np.testing.assert_allclose(
+                actual[:, i],
+                fitted_bgm._conditional_expected_number_of_purchases_up_to_time(
+                    t_, None, True, draws, frequency, recency, T, random_seed=7
+                ),
+            )
+
+    def test_draws_by_customers(self):
+        """
+        GIVEN 1-D posterior draws, customer arrays and a 2-D grid of times,
+        WHEN the draws are padded with self._draws_by_customers(),
+        THEN they should broadcast against every operand into a (draws, times, customers) result.
+        """
+
+        draws = np.arange(5.)
+        frequency, recency, T = np.ones(4), np.ones(4), np.ones(4)
+        t = np.arange(3.)[:, None]
+
+        (padded,) = btyd.BetaGeoModel._draws_by_customers((draws,), frequency, recency, T, t)
+        assert padded.shape == (5, 1, 1)
+        assert (padded + t + frequency).shape == (5, 3, 4)
+
+        (padded,) = btyd.BetaGeoModel._draws_by_customers((draws,), frequency, recency, T)
+        assert padded.shape == (5, 1)
+
+    def test_predict_summary(self, fitted_bgm, cdnow_customers):
+        """
+        GIVEN a fitted BetaGeoModel,
+        WHEN posterior summaries of a conditional quantity of interest are computed within a small memory budget,
+        THEN they should match the summaries of the full (draws x customers) array.
+        """
+
+        frequency, recency, T, _, _ = fitted_bgm._dataframe_parser(cdnow_customers)
+        samples = fitted_bgm._conditional_probability_alive(None, None, True, 200, frequency, recency, T, random_seed=3)
+
+        summary = fitted_bgm.predict_summary(
+            "cond_prob_alive", posterior_draws=200, rfm_df=cdnow_customers, max_bytes=200 * 8 * 100, random_seed=3
+        )
+
+        assert list(summary.columns) == ["mean", "quantile_0.025", "quantile_0.5", "quantile_0.975", "hdi_lower", "hdi_upper"]
+        assert len(summary) == len(cdnow_customers)
+        np.testing.assert_allclose(summary["mean"], samples.mean(axis=0))
+        np.testing.assert_allclose(summary.filter(like="quantile").T, np.quantile(samples, [0.025, 0.5, 0.975], axis=0))
+        hdi = np.array([az.hdi(samples[:, i], hdi_prob=0.94) for i in range(50)])
+        np.testing.assert_allclose(summary[["hdi_lower", "hdi_upper"]].iloc[:50], hdi)
+
+        with pytest.raises(ValueError, match="method must be one of"):
+            fitted_bgm.predict_summary("n_prchs_to_time", t=10)
+
     def test_probability_of_n_purchases_up_to_time(self,fitted_bgm):
         """ 
         GIVEN a fitted BetaGeoModel object,
@@ -228,6 +477,26 @@ class TestBetaGeoModel:
         actual = np.array([fitted_bgm._probability_of_n_purchases_up_to_time(30, n) for n in range(11, 21)]).flatten()
         np.testing.assert_allclose(expected, actual,rtol=1e-02)
     
+    def test_probability_of_n_purchases_up_to_time_grid(self, fitted_bgm):
+        """
+        GIVEN a fitted BetaGeoModel object,
+        WHEN self._probability_of_n_purchases_up_to_time() is called with arrays of n and t over posterior draws,
+        THEN it should return a (draws x n x t) grid of PMFs matching scalar calls and stay finite for large n.
+        """
+
+        n = np.arange(0, 500)
+        t = np.array([10., 39.])
+        pmf = fitted_bgm._probability_of_n_purchases_up_to_time(t, n, True, 50, random_seed=5)
+
+        assert pmf.shape == (50, 500, 2)
+        np.testing.assert_allclose(pmf.sum(axis=1), 1.0)
+
+        scalar = fitted_bgm._probability_of_n_purchases_up_to_time(39, 20, True, 50, random_seed=5)
+        np.testing.assert_allclose(pmf[:, 20, 1], scalar)
+
+        large_n = fitted_bgm._probability_of_n_purchases_up_to_time(39, 300)
+        assert np.isfinite(large_n).all() and (large_n > 0).all()
+
     def test_quantities_of_interest(self):
         """
         GIVEN the _quantities_of_interest BaseModel attribute,
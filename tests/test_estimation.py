@@ -116,6 +116,38 @@ class TestBetaGeoBetaBinomFitter:
         estimated = bbtf.expected_number_of_transactions_in_first_n_periods(6).loc[[0, 6]].values.flatten()
         npt.assert_almost_equal(expected, estimated, decimal=0)
 
+    def test_expected_purchases_in_many_n_periods(self, donations):
+        bbtf = lt.BetaGeoBetaBinomFitter()
+        bbtf.fit(donations["frequency"], donations["recency"], donations["periods"], donations["weights"])
+        n = [0, 1, 6, 11]
+        estimated = bbtf.expected_number_of_transactions_in_first_n_periods(n)
+
+        assert list(estimated.columns) == n
+        npt.assert_allclose(estimated[0].values, [donations["weights"].sum()] + [0] * 6)
+        for n_ in n[1:]:
+            expected = bbtf.expected_number_of_transactions_in_first_n_periods(n_)["model"]
+            npt.assert_allclose(estimated[n_].values, expected.values)
+        npt.assert_allclose(estimated[6].sum(), donations["weights"].sum())
+
+    def test_loglikelihood_matches_direct_sum(self, donations):
+        from scipy.special import betaln, logsumexp
+
+        params = np.array([1.204, 0.750, 0.657, 2.783])
+        alpha, beta, gamma, delta = params
+        x, tx, T = donations["frequency"].values, donations["recency"].values, donations["periods"].values
+
+        expected = []
+        for x_, tx_, T_ in zip(x, tx, T):
+            terms = [
+                betaln(alpha + x_, beta + T_ - x_) + betaln(gamma, delta + T_)
+            ] + [
+                betaln(alpha + x_, beta + tx_ - x_ + j) + betaln(gamma + 1, delta + tx_ + j) for j in range(T_ - tx_)
+            ]
+            expected.append(logsumexp(terms) - betaln(alpha, beta) - betaln(gamma, delta))
+
+        npt.assert_allclose(lt.BetaGeoBetaBinomFitter._loglikelihood(params, x, tx, T), expected)
+        npt.assert_allclose(lt.BetaGeoBetaBinomFitter._loglikelihood(params, x[3], tx[3], T[3]), expected[3])
+
     def test_fit_with_index(self, donations):
 
         bbtf = lt.BetaGeoBetaBinomFitter()
@@ -260,6 +292,16 @@ class TestGammaGammaFitter:
         )
         assert not (ggf.data.index == index).all()
 
+    def test_fit_with_compress(self, cdnow_customers_with_monetary_value):
+        returning_customers = cdnow_customers_with_monetary_value[cdnow_customers_with_monetary_value["frequency"] > 0]
+        args = returning_customers["frequency"], returning_customers["monetary_value"]
+
+        ggf = lt.GammaGammaFitter().fit(*args)
+        compressed = lt.GammaGammaFitter().fit(*args, compress=True)
+        assert compressed.compressed_data_.shape[0] < returning_customers.shape[0]
+        assert compressed.data.shape[0] == returning_customers.shape[0]
+        npt.assert_allclose(compressed.params_, ggf.params_, rtol=1e-6)
+
     def test_params_out_is_close_to_Hardie_paper_with_q_constraint(self, cdnow_customers_with_monetary_value):
 
         returning_cdnow_customers_with_monetary_value = cdnow_customers_with_monetary_value[
@@ -334,6 +376,66 @@ class TestParetoNBDFitter:
         expected = np.array([0.553, 10.578, 0.606, 11.669])
         npt.assert_array_almost_equal(expected, np.array(ptf._unload_params("r", "alpha", "s", "beta")), decimal=2)
 
+    def test_log_A_0_quadrature_matches_hyp2f1_form(self, cdnow_customers):
+        x, t_x, t = cdnow_customers["frequency"].values, cdnow_customers["recency"].values, cdnow_customers["T"].values
+        params = [0.553, 10.578, 0.606, 11.669]
+        expected = lt.ParetoNBDFitter._log_A_0(params, x, t_x, t)
+        actual = lt.ParetoNBDFitter._log_A_0_quadrature(params, x, t_x, t)
+        finite = np.isfinite(expected)
+        npt.assert_allclose(actual[finite], expected[finite], rtol=1e-8)
+        assert np.isneginf(actual[~finite]).all()
+
+    def test_gradient_based_fit_matches_nelder_mead_and_reports_standard_errors(self, cdnow_customers):
+        args = cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"]
+        nelder_mead = lt.ParetoNBDFitter().fit(*args, tol=1e-6)
+        bfgs = lt.ParetoNBDFitter().fit(*args, fit_method="BFGS", tol=1e-6)
+
+        npt.assert_allclose(bfgs.params_, nelder_mead.params_, rtol=1e-3)
+        assert bfgs.fit_diagnostics_["function_evaluations"].iloc[0] < nelder_mead.fit_diagnostics_[
+            "function_evaluations"
+        ].iloc[0]
+        assert np.all(np.isfinite(bfgs._hessian_))
+        assert (bfgs.standard_errors_ > 0).all()
+
+    def test_derivative_free_fit_method_is_case_insensitive(self, cdnow_customers):
+        args = cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"]
+        initial_params = np.ones(4)
+        expected = lt.ParetoNBDFitter().fit(*args, fit_method="Nelder-Mead", initial_params=initial_params)
+        actual = lt.ParetoNBDFitter().fit(*args, fit_method="nelder-mead", initial_params=initial_params)
+
+        npt.assert_allclose(actual.params_, expected.params_)
+
+    def test_singular_hessian_gives_nan_standard_errors(self, cdnow_customers, monkeypatch):
+        import btyd.fitters.pareto_nbd_fitter as pareto_nbd_fitter
+
+        monkeypatch.setattr(pareto_nbd_fitter, "hessian", lambda function: lambda *args: np.zeros((4, 4)))
+        ptf = lt.ParetoNBDFitter().fit(cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"])
+
+        assert ptf.params_.notna().all()
+        assert ptf.standard_errors_.isna().all()
+        assert ptf.confidence_intervals_.isna().all().all()
+
+    def test_parallel_iterative_fitting_matches_sequential(self, cdnow_customers):
+        args = cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"]
+
+        np.random.seed(0)
+        sequential = lt.ParetoNBDFitter().fit(*args, iterative_fitting=3)
+        np.random.seed(0)
+        parallel = lt.ParetoNBDFitter().fit(*args, iterative_fitting=3, n_jobs=2)
+
+        npt.assert_allclose(sequential.params_, parallel.params_)
+        assert parallel.fit_diagnostics_.shape[0] == 3
+        best = parallel.fit_diagnostics_["negative_log_likelihood"].idxmin()
+        npt.assert_allclose(parallel.fit_diagnostics_.loc[best, ["r", "alpha", "s", "beta"]].astype(float), parallel.params_)
+
+    def test_iterative_fitting_with_cobyla_keeps_diagnostics(self, cdnow_customers):
+        args = cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"]
+        ptf = lt.ParetoNBDFitter().fit(*args, iterative_fitting=2, fit_method="COBYLA")
+
+        assert ptf.fit_diagnostics_.shape[0] == 2
+        assert (ptf.fit_diagnostics_["function_evaluations"] > 0).all()
+        assert ptf.fit_diagnostics_["iterations"].isna().all()
+
     def test_expectation_returns_same_value_as_R_BTYD(self, cdnow_customers):
         """ From https://cran.r-project.org/web/packages/BTYD/BTYD.pdf """
         ptf = lt.ParetoNBDFitter()
@@ -428,6 +530,15 @@ class TestParetoNBDFitter:
             for x in range(Z.shape[1]):
                 assert Z[t_x][x] == ptf.conditional_probability_alive(x, t_x, max_t)
 
+    def test_conditional_probability_alive_matrix_in_chunks(self, cdnow_customers):
+        ptf = lt.ParetoNBDFitter()
+        ptf.fit(cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"])
+        Z = ptf.conditional_probability_alive_matrix(max_frequency=300, max_recency=2000)
+
+        assert Z.shape == (2001, 301)
+        assert np.isfinite(Z).all()
+        npt.assert_array_equal(Z, ptf.conditional_probability_alive_matrix(max_frequency=300, max_recency=2000, chunksize=64))
+
     def test_fit_with_index(self, cdnow_customers):
         ptf = lt.ParetoNBDFitter()
         index = range(len(cdnow_customers), 0, -1)
@@ -533,6 +644,31 @@ class TestBetaGeoFitter:
         actual = bfg.conditional_expected_number_of_purchases_up_to_time(t, x, t_x, T)
         assert abs(expected - actual) < 0.001
 
+    def test_conditional_expectation_over_a_grid_of_t(self, cdnow_customers):
+        bfg = lt.BetaGeoFitter()
+        bfg.fit(cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"])
+        args = cdnow_customers["frequency"].values, cdnow_customers["recency"].values, cdnow_customers["T"].values
+        t = np.array([1.0, 13.0, 52.0])
+
+        actual = bfg.conditional_expected_number_of_purchases_up_to_time(t[:, None], *args)
+        assert actual.shape == (3, cdnow_customers.shape[0])
+        for i, t_ in enumerate(t):
+            npt.assert_allclose(actual[i], bfg.conditional_expected_number_of_purchases_up_to_time(t_, *args))
+
+    def test_conditional_expectation_with_scalar_inputs_that_overflow_hyp2f1(self, cdnow_customers):
+        bfg = lt.BetaGeoFitter()
+        bfg.fit(cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"])
+
+        actual = bfg.conditional_expected_number_of_purchases_up_to_time(100, 1000, 38.0, 39.0)
+        assert np.ndim(actual) == 0
+        npt.assert_allclose(
+            actual,
+            bfg.conditional_expected_number_of_purchases_up_to_time(
+                np.array([100.0]), np.array([1000]), np.array([38.0]), np.array([39.0])
+            )[0],
+        )
+        assert np.isfinite(actual) and actual > 0
+
     def test_expectation_returns_same_value_Hardie_excel_sheet(self, cdnow_customers):
         bfg = lt.BetaGeoFitter()
         bfg.fit(cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"], tol=1e-6)
@@ -725,6 +861,36 @@ class TestBetaGeoFitter:
         bgf.fit(cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"], index=None)
         assert (bgf.data.index == index).all() == False
 
+    def test_fit_with_compress(self, cdnow_customers):
+        args = cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"]
+        index = range(len(cdnow_customers), 0, -1)
+        bgf = lt.BetaGeoFitter().fit(*args)
+        compressed = lt.BetaGeoFitter().fit(*args, compress=True, index=index)
+
+        assert compressed.compressed_data_.shape[0] < cdnow_customers.shape[0]
+        assert compressed.compressed_data_["weights"].sum() == cdnow_customers.shape[0]
+        assert (compressed.data.index == index).all()
+        pd.testing.assert_frame_equal(compressed.data, bgf.data.set_axis(compressed.data.index))
+        npt.assert_allclose(compressed.params_, bgf.params_, rtol=1e-6)
+        npt.assert_allclose(compressed.standard_errors_, bgf.standard_errors_, rtol=1e-6)
+
+        assert (compressed.compression_index_.index == index).all()
+        data = compressed.compressed_data_
+        p_alive = compressed.conditional_probability_alive(data["frequency"], data["recency"], data["T"])
+        npt.assert_allclose(
+            np.asarray(p_alive)[compressed.compression_index_.values],
+            bgf.conditional_probability_alive(*args),
+        )
+
+    def test_fit_with_compress_onto_a_grid(self, cdnow_customers):
+        args = cdnow_customers["frequency"], cdnow_customers["recency"], cdnow_customers["T"]
+        exact = lt.BetaGeoFitter().fit(*args, compress=True)
+        gridded = lt.BetaGeoFitter().fit(*args, compress=1.0)
+
+        assert gridded.compressed_data_.shape[0] < exact.compressed_data_.shape[0]
+        assert (gridded.compressed_data_["T"] % 1 == 0).all()
+        npt.assert_allclose(gridded.params_, exact.params_, rtol=0.05)
+
     def test_no_runtime_warnings_high_frequency(self, cdnow_customers):
         old_settings = np.seterr(all="raise")
         bgf = lt.BetaGeoFitter(penalizer_coef=0.0)
@@ -7,7 +7,8 @@ import numpy.testing as npt
 
 import scipy.stats as stats
 
-from btyd import BetaGeoBetaBinomFitter
+from btyd import BetaGeoBetaBinomFitter, BetaGeoFitter, ParetoNBDFitter
+from btyd.datasets import load_cdnow_summary
 from btyd.generate_data import (
     beta_geometric_nbd_model,
     pareto_nbd_model,
@@ -25,16 +26,39 @@ def setup_module(module):
 class TestBetaGeoGeneration:
     params = [0.243, 4.414, 0.793, 2.426]
 
+    def test_random_state_makes_output_reproducible(self):
+        first = beta_geometric_nbd_model(30, *self.params, size=1000, random_state=42)
+        second = beta_geometric_nbd_model(30, *self.params, size=1000, random_state=np.random.default_rng(42))
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_recency_bounded_by_T_and_frequency_by_recency(self):
+        sim_data = beta_geometric_nbd_model(np.arange(1, 1001), *self.params, size=1000, random_state=0)
+        assert (sim_data["recency"] < sim_data["T"]).all()
+        assert (sim_data["frequency"] <= np.floor(sim_data["recency"]) + 1).all()
+        assert ((sim_data["frequency"] == 0) == (sim_data["recency"] == 0)).all()
+
 
 class TestParetoNBDGeneration:
     params = [0.553, 10.578, 0.606, 11.669]
 
+    def test_dead_customers_stop_purchasing(self):
+        sim_data = pareto_nbd_model(100, *self.params, size=5000, random_state=0)
+        assert (sim_data["recency"] < sim_data["T"]).all()
+        assert sim_data["alive"].isin([0.0, 1.0]).all()
+        dead, alive = sim_data["alive"] == 0, sim_data["alive"] == 1
+        assert sim_data.loc[dead, "frequency"].mean() < sim_data.loc[alive, "frequency"].mean()
+
 
 class TestModifiedBetaGeoNBDGeneration:
     params = [0.525, 6.183, 0.891, 1.614]
     times = np.array([0.1429, 1.0, 3.00, 31.8571, 32.00, 78.00])
     expected = np.array([0.0078, 0.0532, 0.1506, 1.0405, 1.0437, 1.8576])
 
+    def test_customers_dead_before_first_purchase_never_buy(self):
+        sim_data = modified_beta_geometric_nbd_model(30, *self.params, size=5000, random_state=0)
+        assert (sim_data.loc[sim_data["frequency"] > 0, "recency"] > 0).all()
+        assert ((sim_data["frequency"] == 0) & (sim_data["alive"] == 0)).any()
+
 
 class TestBetaGeoBetaBinomGeneration:
     @pytest.fixture()
@@ -107,3 +131,51 @@ def test_beta_geometric_nbd_model_transactional_data(T, r, alpha, a, b, observat
     expected = expected.reset_index(drop=True)
     actual = actual.reset_index(drop=True)
     assert expected.equals(actual)
+
+
+def test_beta_geometric_nbd_model_transactional_data_chunks():
+    chunks = list(
+        beta_geometric_nbd_model_transactional_data(
+            T=100, r=0.24, alpha=4.41, a=0.79, b=2.43, size=250, random_state=0, chunksize=100
+        )
+    )
+    assert len(chunks) == 3
+    transaction_data = pd.concat(chunks, ignore_index=True)
+    assert transaction_data["customer_id"].unique().tolist() == list(range(250))
+    assert transaction_data["date"].max() < pd.Timestamp("2019-1-2")
+    first_purchases = transaction_data.groupby("customer_id")["date"].min()
+    assert (first_purchases == pd.Timestamp("2019-1-1") - pd.Timedelta(100, "D")).all()
+
+
+@pytest.mark.parametrize(
+    "generator,params",
+    [
+        (beta_geometric_nbd_model, TestBetaGeoGeneration.params),
+        (pareto_nbd_model, TestParetoNBDGeneration.params),
+        (modified_beta_geometric_nbd_model, TestModifiedBetaGeoNBDGeneration.params),
+    ],
+)
+def test_array_T_longer_than_size_uses_its_first_values(generator, params):
+    T = np.arange(1, 501)
+    sim_data = generator(T, *params, size=100, random_state=0)
+    npt.assert_array_equal(sim_data["T"], T[:100])
+
+    with pytest.raises(ValueError, match="fewer than size"):
+        generator(T, *params, size=501)
+
+
+def test_generate_new_data_with_fewer_customers_than_fitted():
+    cdnow = load_cdnow_summary()
+    for fitter in (BetaGeoFitter(), ParetoNBDFitter()):
+        fitter.fit(cdnow["frequency"], cdnow["recency"], cdnow["T"])
+        sim_data = fitter.generate_new_data(size=100)
+        npt.assert_array_equal(sim_data["T"], cdnow["T"].values[:100])
+
+
+def test_beta_geometric_nbd_model_transactional_data_with_array_T_longer_than_size():
+    transaction_data = beta_geometric_nbd_model_transactional_data(
+        T=[400, 200, 5, 103], r=0.24, alpha=4.41, a=0.79, b=2.43, size=2, random_state=0
+    )
+    first_purchases = transaction_data.groupby("customer_id")["date"].min()
+    assert first_purchases.index.tolist() == [0, 1]
+    assert (first_purchases == pd.Timestamp("2019-1-1") - pd.to_timedelta([400, 200], "D")).all()
@@ -56,7 +56,7 @@ class TestPlotting:
         np.random.seed(123456789)  # static random seed for this test class
 
     def test_plot_period_transactions(self, bgf):
-        expected = [1411, 439, 214, 100, 62, 38, 29, 1411, 439, 214, 100, 62, 38, 29]
+        expected = [1411, 439, 214, 100, 62, 38, 29, 1441, 448, 193, 116, 53, 39, 13]
 
         ax = plotting.plot_period_transactions(bgf)
 
@@ -2239,3 +2239,18 @@ class TestPlotting:
         assert_equal(ax.xaxis.get_label().get_text(), "Time since user made last purchase")
         assert_equal(ax.yaxis.get_label().get_text(), "Average of Purchases in Holdout Period")
         plt.close()
+
+    def test_plots_from_a_compressed_fit(self, cd_data):
+        compressed = BetaGeoFitter().fit(cd_data["frequency"], cd_data["recency"], cd_data["T"], compress=True)
+        assert compressed.data.shape[0] == cd_data.shape[0]
+        assert "fitted with {:d} subjects".format(cd_data.shape[0]) in repr(compressed)
+        assert compressed.generate_new_data(size=cd_data.shape[0]).shape[0] == cd_data.shape[0]
+
+        ax = plotting.plot_period_transactions(compressed)
+        assert_allclose([p.get_height() for p in ax.patches][:7], [1411, 439, 214, 100, 62, 38, 29])
+        plt.close()
+
+        plotting.plot_frequency_recency_matrix(compressed)
+        plt.close()
+        plotting.plot_probability_alive_matrix(compressed)
+        plt.close()
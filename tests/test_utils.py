@@ -333,6 +333,142 @@ def test_summary_date_from_transaction_with_monetary_values(large_transaction_le
     assert_frame_equal(actual, expected)
 
 
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"freq": "W"},
+        {"freq": "h", "freq_multiplier": 24},
+        {"monetary_value_col": "spent"},
+        {"monetary_value_col": "spent", "include_first_transaction": True, "freq": "W"},
+        {"observation_period_end": "19970301"},
+    ],
+)
+def test_summary_data_from_transaction_data_numpy_engine_matches_pandas_engine(kwargs):
+    df = load_dataset("CDNOW_sample.txt", header=None, sep=r"\s+", names=["_id", "id", "date", "cds_bought", "spent"])
+    expected = utils.summary_data_from_transaction_data(df, "id", "date", datetime_format="%Y%m%d", **kwargs)
+    actual = utils.summary_data_from_transaction_data(
+        df, "id", "date", datetime_format="%Y%m%d", engine="numpy", **kwargs
+    )
+    assert_frame_equal(actual, expected)
+
+
+def test_summary_data_from_transaction_data_numpy_engine_with_string_ids_and_monetary_values(
+    large_transaction_level_data_with_monetary_value
+):
+    transactions = large_transaction_level_data_with_monetary_value
+    transactions["id"] = "c" + transactions["id"].astype(str)
+    expected = utils.summary_data_from_transaction_data(
+        transactions, "id", "date", "monetary_value", observation_period_end="2015-02-07", freq="W"
+    )
+    actual = utils.summary_data_from_transaction_data(
+        transactions, "id", "date", "monetary_value", observation_period_end="2015-02-07", freq="W", engine="numpy"
+    )
+    assert_frame_equal(actual, expected)
+
+
+def test_summary_data_from_transaction_data_numpy_engine_skips_missing_monetary_values():
+    df = load_dataset("CDNOW_sample.txt", header=None, sep=r"\s+", names=["_id", "id", "date", "cds_bought", "spent"])
+    df.loc[::7, "spent"] = np.nan
+    expected = utils.summary_data_from_transaction_data(df, "id", "date", "spent", datetime_format="%Y%m%d")
+    actual = utils.summary_data_from_transaction_data(
+        df, "id", "date", "spent", datetime_format="%Y%m%d", engine="numpy"
+    )
+    assert expected["monetary_value"].notnull().all()
+    assert_frame_equal(actual, expected)
+
+
+def test_summary_data_from_transaction_data_raises_on_unknown_engine(transaction_level_data):
+    with pytest.raises(ValueError, match="engine"):
+        utils.summary_data_from_transaction_data(transaction_level_data, "id", "date", engine="polars")
+
+
+@pytest.fixture()
+def cdnow_sample_transactions():
+    df = load_dataset("CDNOW_sample.txt", header=None, sep=r"\s+", names=["_id", "id", "date", "cds_bought", "spent"])
+    df["date"] = pd.to_datetime(df["date"], format="%Y%m%d")
+    return df.sort_values("date")
+
+
+def _chunks(df, size=500):
+    return (df.iloc[i : i + size] for i in range(0, df.shape[0], size))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"monetary_value_col": "spent"},
+        {"monetary_value_col": "spent", "include_first_transaction": True, "freq": "W"},
+        {"observation_period_end": "1997-03-01"},
+    ],
+)
+def test_summary_data_from_transaction_chunks_matches_in_memory_summary(cdnow_sample_transactions, kwargs):
+    expected = utils.summary_data_from_transaction_data(cdnow_sample_transactions, "id", "date", **kwargs)
+    actual = utils.summary_data_from_transaction_chunks(_chunks(cdnow_sample_transactions), "id", "date", **kwargs)
+    assert_frame_equal(actual, expected)
+
+
+def test_summary_data_from_transaction_chunks_reads_csv_files(cdnow_sample_transactions, tmp_path):
+    path = tmp_path / "transactions.csv"
+    cdnow_sample_transactions[["id", "date", "spent"]].to_csv(path, index=False)
+    expected = utils.summary_data_from_transaction_data(cdnow_sample_transactions, "id", "date", "spent")
+    actual = utils.summary_data_from_transaction_chunks(str(path), "id", "date", "spent", chunksize=1000)
+    assert_frame_equal(actual, expected)
+
+
+def test_summary_data_from_transaction_chunks_raises_if_chunks_are_out_of_order(cdnow_sample_transactions):
+    chunks = [cdnow_sample_transactions.iloc[3000:], cdnow_sample_transactions.iloc[:3000]]
+    with pytest.raises(ValueError, match="chronological order"):
+        utils.summary_data_from_transaction_chunks(chunks, "id", "date")
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"freq": "W", "monetary_value_col": "spent", "observation_period_end": "1997-12-01"}])
+def test_calibration_and_holdout_data_from_chunks_matches_in_memory_split(cdnow_sample_transactions, kwargs):
+    expected = utils.calibration_and_holdout_data(cdnow_sample_transactions, "id", "date", "1997-09-30", **kwargs)
+    actual = utils.calibration_and_holdout_data_from_chunks(
+        _chunks(cdnow_sample_transactions), "id", "date", "1997-09-30", **kwargs
+    )
+    assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_calibration_and_holdout_data_from_chunks_raises_without_calibration_transactions(cdnow_sample_transactions):
+    with pytest.raises(ValueError, match="calibration_period_end"):
+        utils.calibration_and_holdout_data_from_chunks(
+            _chunks(cdnow_sample_transactions), "id", "date", "1996-12-31", monetary_value_col="spent"
+        )
+
+
+def test_rfm_state_updates_match_full_recomputation(cdnow_sample_transactions):
+    rfm = utils.RFMState("id", "date", "spent")
+    for _, batch in cdnow_sample_transactions.groupby(cdnow_sample_transactions["date"].dt.to_period("M")):
+        rfm.update(batch)
+
+    expected = utils.summary_data_from_transaction_data(cdnow_sample_transactions, "id", "date", "spent")
+    assert_frame_equal(rfm.to_frame(), expected)
+
+    rfm.advance_to("1998-12-31")
+    expected = utils.summary_data_from_transaction_data(
+        cdnow_sample_transactions, "id", "date", "spent", observation_period_end="1998-12-31"
+    )
+    assert_frame_equal(rfm.to_frame(), expected)
+
+    with pytest.raises(ValueError, match="moved forward"):
+        rfm.advance_to("1998-01-01")
+
+
+def test_rfm_state_merge_and_save_load(cdnow_sample_transactions, tmp_path):
+    early = cdnow_sample_transactions["date"] < "1997-06-01"
+    rfm = utils.RFMState("id", "date").update(cdnow_sample_transactions[early])
+    rfm.merge(utils.RFMState("id", "date").update(cdnow_sample_transactions[~early]))
+
+    path = str(tmp_path / "rfm_state.pkl")
+    rfm.save(path)
+    loaded = utils.RFMState("id", "date").load(path)
+
+    expected = utils.summary_data_from_transaction_data(cdnow_sample_transactions, "id", "date")
+    assert_frame_equal(loaded.to_frame(), expected)
+
+
 def test_summary_data_from_transaction_data_will_choose_the_correct_first_order_to_drop_in_monetary_transactions():
     # this is the correct behaviour. See https://github.com/CamDavidsonPilon/lifetimes/issues/85
     # and test_summary_statistics_are_indentical_to_hardies_paper_confirming_correct_aggregations
@@ -471,6 +607,70 @@ def test_calibration_and_holdout_data_with_monetary_value(large_transaction_leve
     assert (actual["monetary_value_holdout"] == [2, 0, 0, 3, 0]).all()
 
 
+@pytest.mark.parametrize("kwargs", [{}, {"freq": "W", "monetary_value_col": "spent"}])
+def test_calibration_and_holdout_splits_matches_calibration_and_holdout_data(cdnow_sample_transactions, kwargs):
+    cutoffs = ["1997-03-31", "1997-06-30", "1997-09-30"]
+    splits = utils.calibration_and_holdout_splits(cdnow_sample_transactions, "id", "date", cutoffs, **kwargs)
+    assert list(splits) == [pd.Timestamp(c) for c in cutoffs]
+    for cutoff in cutoffs:
+        expected = utils.calibration_and_holdout_data(cdnow_sample_transactions, "id", "date", cutoff, **kwargs)
+        assert_frame_equal(splits[pd.Timestamp(cutoff)], expected)
+
+
+def test_calibration_and_holdout_splits_accepts_one_observation_period_end_per_cutoff(cdnow_sample_transactions):
+    cutoffs = ["1997-03-31", "1997-06-30"]
+    ends = ["1997-04-30", "1997-07-31"]
+    splits = utils.calibration_and_holdout_splits(
+        cdnow_sample_transactions, "id", "date", cutoffs, observation_period_end=ends
+    )
+    for cutoff, end in zip(cutoffs, ends):
+        expected = utils.calibration_and_holdout_data(
+            cdnow_sample_transactions, "id", "date", cutoff, observation_period_end=end
+        )
+        assert_frame_equal(splits[pd.Timestamp(cutoff)], expected)
+
+    with pytest.raises(ValueError, match="one date per calibration cutoff"):
+        utils.calibration_and_holdout_splits(
+            cdnow_sample_transactions, "id", "date", cutoffs, observation_period_end=ends[:1]
+        )
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"freq": "W", "monetary_value_col": "spent"},
+        {"monetary_value_col": "spent", "include_first_transaction": True, "freq_multiplier": 7},
+    ],
+)
+def test_rolling_calibration_holdout_matches_calibration_and_holdout_data(cdnow_sample_transactions, kwargs):
+    cutoffs = ["1997-02-15", "1997-03-31", "1997-06-30", "1997-09-30"]
+    actual = utils.rolling_calibration_holdout(cdnow_sample_transactions, "id", "date", cutoffs, **kwargs)
+    assert actual.index.names == ["cutoff", "id"]
+    for cutoff in cutoffs:
+        expected = utils.calibration_and_holdout_data(cdnow_sample_transactions, "id", "date", cutoff, **kwargs)
+        assert_frame_equal(actual.loc[pd.Timestamp(cutoff)], expected)
+
+
+def test_rolling_calibration_holdout_handles_cutoffs_inside_a_period():
+    transactions = pd.DataFrame(
+        [
+            [1, "2015-01-01 09:00"],
+            [1, "2015-01-07 10:00"],
+            [1, "2015-01-07 18:00"],
+            [1, "2015-01-20 12:00"],
+            [2, "2015-01-07 11:00"],
+            [2, "2015-01-08 11:00"],
+        ],
+        columns=["id", "date"],
+    )
+    cutoffs = ["2015-01-07 12:00", "2015-01-08"]
+    actual = utils.rolling_calibration_holdout(transactions, "id", "date", cutoffs, freq="W")
+    for cutoff in cutoffs:
+        expected = utils.calibration_and_holdout_data(transactions, "id", "date", cutoff, freq="W")
+        assert_frame_equal(actual.loc[pd.Timestamp(cutoff)], expected, check_dtype=False)
+
+
 def test_summary_data_from_transaction_data_squashes_period_purchases_to_one_purchase():
     transactions = pd.DataFrame([[1, "2015-01-01"], [1, "2015-01-01"]], columns=["id", "t"])
     actual = utils.summary_data_from_transaction_data(transactions, "id", "t", freq="W")
@@ -485,6 +685,16 @@ def test_calculate_alive_path(example_transaction_data, example_summary_data, fi
     assert alive_path[T] == fitted_bg.conditional_probability_alive(frequency, recency, T)
 
 
+@pytest.mark.parametrize("freq", ["D", "W"])
+def test_calculate_alive_paths_matches_calculate_alive_path(example_transaction_data, fitted_bg, freq):
+    transactions = example_transaction_data[example_transaction_data["id"] < 40]
+    paths = utils.calculate_alive_paths(fitted_bg, transactions, "id", "date", 30, freq=freq, chunksize=7)
+    assert paths.shape == (transactions["id"].nunique(), 31)
+    for customer_id, customer_transactions in transactions.groupby("id"):
+        expected = utils.calculate_alive_path(fitted_bg, customer_transactions, "date", 30, freq=freq)
+        assert_allclose(paths.loc[customer_id].values, expected.values[:31])
+
+
 def test_check_inputs():
     frequency = np.array([0, 1, 2])
     recency = np.array([0, 1, 10])
@@ -526,6 +736,78 @@ def test_scale_time():
     assert utils._scale_time(T) == 1.0 / (max_T - 1)
 
 
+def test_frequency_recency_matrix_matches_per_cell_predictions(fitted_bg):
+    Z = utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40)
+
+    assert Z.shape == (41, 11)
+    for recency in range(0, 41, 8):
+        for frequency in range(11):
+            assert_allclose(
+                Z[recency, frequency],
+                fitted_bg.conditional_expected_number_of_purchases_up_to_time(2, frequency, recency, 40),
+            )
+
+
+def test_frequency_recency_matrix_is_cached_per_model_params_and_grid(fitted_bg):
+    Z = utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40)
+
+    assert utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40) is Z
+    assert utils.frequency_recency_matrix(fitted_bg, T=3, max_frequency=10, max_recency=40) is not Z
+    assert not Z.flags.writeable
+
+    refitted = BetaGeoFitter()
+    refitted.params_ = fitted_bg.params_ * 1.1
+    refitted.data = fitted_bg.data
+    assert not np.allclose(utils.frequency_recency_matrix(refitted, T=2, max_frequency=10, max_recency=40), Z)
+
+
+def test_frequency_recency_matrix_cache_is_bounded_in_bytes_and_can_be_cleared(fitted_bg, monkeypatch):
+    utils.clear_frequency_recency_matrix_cache()
+    Z = utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40)
+    monkeypatch.setattr(utils, "_FREQUENCY_RECENCY_MATRIX_CACHE_BYTES", Z.nbytes)
+
+    utils.frequency_recency_matrix(fitted_bg, T=3, max_frequency=10, max_recency=40)
+    assert utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40) is not Z
+
+    Z = utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40)
+    utils.clear_frequency_recency_matrix_cache()
+    assert utils.frequency_recency_matrix(fitted_bg, T=2, max_frequency=10, max_recency=40) is not Z
+
+
+def test_frequency_recency_matrix_with_array_T(fitted_bg):
+    T = np.arange(1.0, 12.0)
+    Z = utils.frequency_recency_matrix(fitted_bg, T=T, max_frequency=10, max_recency=40)
+
+    assert utils.frequency_recency_matrix(fitted_bg, T=T.copy(), max_frequency=10, max_recency=40) is Z
+    for frequency in range(11):
+        assert_allclose(
+            Z[:, frequency],
+            utils.frequency_recency_matrix(fitted_bg, T=T[frequency], max_frequency=10, max_recency=40)[:, frequency],
+        )
+
+
+def test_log_hyp2f1_falls_back_to_euler_transformation_only_on_overflow():
+    from scipy.special import hyp2f1
+
+    a, b, c = np.array([2.0, 1000.0]), np.array([3.0, 1000.0]), np.array([4.0, 1500.0])
+    z = np.array([0.5, 0.9])
+
+    actual = utils._log_hyp2f1(a, b, c, z)
+    assert np.isfinite(actual).all()
+    assert_allclose(actual[0], np.log(hyp2f1(2.0, 3.0, 4.0, 0.5)))
+    assert np.isinf(hyp2f1(1000.0, 1000.0, 1500.0, 0.9))
+    assert_allclose(actual[1], np.log(hyp2f1(500.0, 500.0, 1500.0, 0.9)) - 500.0 * np.log(0.1))
+    assert utils._log_hyp2f1(2.0, 3.0, 4.0, 0.5).shape == ()
+
+
+def test_log_hyp2f1_falls_back_to_euler_transformation_for_scalar_inputs():
+    from scipy.special import hyp2f1
+
+    actual = utils._log_hyp2f1(1000.0, 1000.0, 1500.0, 0.9)
+    assert actual.shape == ()
+    assert_allclose(actual, np.log(hyp2f1(500.0, 500.0, 1500.0, 0.9)) - 500.0 * np.log(0.1))
+
+
 def test_customer_lifetime_value_with_known_values(fitted_bg):
     """
     >>> print fitted_bg
@@ -594,6 +876,32 @@ def test_customer_lifetime_value_with_known_values(fitted_bg):
     assert_allclose(clv_t2_d1.values, expected / 2.0 + expected / 4.0, rtol=0.1)
 
 
+def test_customer_lifetime_value_with_discount_schedule_and_chunks(fitted_bg):
+    t = fitted_bg.data.head(50)
+    monetary_value = np.linspace(1, 10, 50)
+    clv = utils._customer_lifetime_value(
+        fitted_bg, t["frequency"], t["recency"], t["T"], monetary_value, time=3, discount_rate=0.1
+    )
+
+    # a constant schedule is the same as a scalar rate
+    clv_schedule = utils._customer_lifetime_value(
+        fitted_bg, t["frequency"], t["recency"], t["T"], monetary_value, time=3, discount_rate=[0.1] * 3, chunksize=7
+    )
+    assert_allclose(clv_schedule.values, clv.values)
+
+    # no discount in the first month, then halving
+    month_1 = utils._customer_lifetime_value(
+        fitted_bg, t["frequency"], t["recency"], t["T"], monetary_value, time=1, discount_rate=0.0
+    )
+    months_1_2 = utils._customer_lifetime_value(
+        fitted_bg, t["frequency"], t["recency"], t["T"], monetary_value, time=2, discount_rate=0.0
+    )
+    clv_schedule = utils._customer_lifetime_value(
+        fitted_bg, t["frequency"], t["recency"], t["T"], monetary_value, time=2, discount_rate=[0.0, 1.0]
+    )
+    assert_allclose(clv_schedule.values, month_1.values + (months_1_2.values - month_1.values) / 2.0)
+
+
 def test_expected_cumulative_transactions_dedups_inside_a_time_period(fitted_bg, example_transaction_data):
     by_week = utils.expected_cumulative_transactions(fitted_bg, example_transaction_data, "date", "id", 10, freq="W")
     by_day = utils.expected_cumulative_transactions(fitted_bg, example_transaction_data, "date", "id", 10, freq="D")